@@ -25,8 +25,8 @@ cpdef int _check_placement(int[::1] operation, int[:, ::1] parent_operation_bloc
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.nonecheck(False)
-cpdef crossover(parent1, parent2, double probability_mutate, int[:, ::1] dependency_matrix_index_encoding,
-                int[:, ::1] usable_machines_matrix, int reschedule, int preschedule_idle):
+cpdef crossover_operation_2d_array(parent1, parent2, double probability_mutate,
+                                   int[:, ::1] dependency_matrix_index_encoding, int[:, ::1] usable_machines_matrix):
 
     cdef int[:, ::1] p1_operation_array = np.copy(parent1.operation_2d_array)
     cdef int[:, ::1] p2_operation_array = np.copy(parent2.operation_2d_array)
@@ -65,4 +65,12 @@ cpdef crossover(parent1, parent2, double probability_mutate, int[:, ::1] depende
                                              result[random_operation_index, 1]]
         result[random_operation_index, 3] = np.random.choice(usable_machines_matrix[i])
 
-    return Solution(parent1.data, np.array(result), reschedule=reschedule, preschedule_idle=preschedule_idle)
+    return np.array(result)
+
+
+cpdef crossover(parent1, parent2, double probability_mutate, int[:, ::1] dependency_matrix_index_encoding,
+                int[:, ::1] usable_machines_matrix, int reschedule, int preschedule_idle):
+    return Solution(parent1.data, crossover_operation_2d_array(parent1, parent2, probability_mutate,
+                                                               dependency_matrix_index_encoding,
+                                                               usable_machines_matrix),
+                    reschedule=reschedule, preschedule_idle=preschedule_idle)
@@ -1,12 +1,16 @@
+import pickle
+import queue
 import random
 import statistics
-import pandas as pd
+import numpy as np
 from enum import Enum
-from ..exception import InfeasibleSolutionException
-from ..solution import SolutionFactory, Solution
+from ..solution import Solution
+from ..solution.evaluation import evaluate_operation_2d_arrays, EvaluationCache
 from ..utility import get_stop_condition
-from ._ga_helpers import crossover
-from ..pareto_front import get_multi_objective_optimal_sol, dominates
+from ..data import register_data
+from ._ga_helpers import crossover_operation_2d_array
+from ..pareto_front import Population
+from ..pareto_archive import ParetoArchive
 
 
 def _tournament_selection(*args):
@@ -82,11 +86,14 @@ class GASelectionEnum(Enum):
 
 
 class GeneticAlgorithmAgent:
+    
+    alg_type = "genetic" # name of the search in plots and reports
 
     def __init__(self, stopping_condition, population, time_condition=False,
                  selection_method_enum=GASelectionEnum.FITNESS_PROPORTIONATE, mutation_probability=0.8,
                  selection_size=8, benchmark=False, objective_params=None, reschedule=False,
-                 preschedule_idle=False):     
+                 preschedule_idle=False, visualize=False, migration_interval=5, migration_size=2,
+                 evaluation_pool=None, cache_size=4096):     
         """
         GeneticAlgorithmAgent constructor
         
@@ -99,6 +106,12 @@ class GeneticAlgorithmAgent:
         mutation_probability : probability value for performing mutation on offsprings
         selection_size : parent selection size
         benchmark : flag for plotting benchmark results
+        visualize : flag to plot the final population and store it as excel file at the end of the search
+        migration_interval : number of generations between two migrations (island model)
+        migration_size : number of Pareto optimal solutions sent to the next island per migration
+        evaluation_pool : EvaluationPool which evaluates the offspring of a generation in parallel (offspring
+                          are evaluated in this process if None)
+        cache_size : number of evaluated offspring kept in the evaluation cache (0 disables the cache)
         
         Returns
         ---------------
@@ -124,6 +137,14 @@ class GeneticAlgorithmAgent:
         self.result_population = []
         self.best_solution = None
         self.memory = None
+        self.archive = None
+        self.visualize = visualize
+        self._ranking_cache = None
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.evaluation_pool = evaluation_pool
+        self.cache_size = cache_size
+        self.evaluation_cache = None
         self.objective_params = objective_params
         self.reschedule = 0
         self.preschedule_idle = 0
@@ -141,13 +162,17 @@ class GeneticAlgorithmAgent:
             self.min_makespan_coordinates = []
 
 
-    def start(self):
+    def start(self, multi_process_queue=None, data=None, migration_channel=None):
         """
         function to perform GA search
         
         Paramters
         --------------------------
-        self: class instance
+        multi_process_queue : multi process queue object to store the agent when it runs as an island
+        data : instance data, registered in this process so that solutions can resolve it
+        migration_channel : (inbox, outbox) queues of the island, Pareto optimal solutions are sent to the
+                            outbox and solutions from the inbox join the population every migration_interval
+                            generations
         
         Returns
         ---------------
@@ -155,9 +180,13 @@ class GeneticAlgorithmAgent:
         
         """          
         
+        if data is not None:
+            register_data(data)
+        
         population = self.initial_population[:]
-        pareto_solutions, best_solution = get_multi_objective_optimal_sol(population, self.objective_params, self.reschedule, visualize=True, rank=3)
-        self.memory = pareto_solutions
+        if self.cache_size:
+            self.evaluation_cache = EvaluationCache(self.cache_size)
+        self.archive = ParetoArchive(self.objective_params, self.reschedule, max_rank=3, solutions=population)
         
         
         iterations = 0
@@ -174,81 +203,173 @@ class GeneticAlgorithmAgent:
                 avg_population_makespan_v_iter.append(statistics.mean([sol.makespan for sol in population]))
 
             next_population = []
-            pareto_solutions, best_solution = get_multi_objective_optimal_sol(population, self.objective_params, self.reschedule, visualize=False, rank=3)
+            pareto_solutions = self.rank_population(population).get_fronts(rank=3)
             
             parents = self.parent_selection_moo(pareto_solutions, self.selection_size)
-            selection_size = self.selection_size 
+            selection_size = len(parents) # smaller than self.selection_size when the fronts are small
 
+            offspring = []
             while selection_size > 0:
                 parent1 = random.choice(parents) # selects randomly one parent
                 parent2 = random.choice(parents)
-                feasible_child = False
-                while not feasible_child:
-                    try:
-                        child1 = crossover(parent1, parent2,
-                                           self.mutation_probability, 
-                                           dependency_matrix_index_encoding,
-                                           required_machine_matrix,
-                                           reschedule=self.reschedule,
-                                           preschedule_idle=self.preschedule_idle)
-                        if child1 != parent1 and child1 != parent2:
-                            feasible_child = True
-                    except InfeasibleSolutionException:
-                        break
-                        
-                feasible_child = False
-                while not feasible_child:
-                    try:
-                        child2 = crossover(parent2, parent1,
-                                           self.mutation_probability, 
-                                           dependency_matrix_index_encoding,
-                                           required_machine_matrix,
-                                           reschedule=self.reschedule,
-                                           preschedule_idle=self.preschedule_idle)
-                        if child2 != parent1 and child2 != parent2:
-                            feasible_child = True
-                    except InfeasibleSolutionException:
-                        break
-                
-                if self.child_dominates(child1):
-                    next_population.append(child1)
-                
-                if self.child_dominates(child2):
-                    next_population.append(child2)
+                offspring.append(self._get_child_operation_2d_array(parent1, parent2, dependency_matrix_index_encoding,
+                                                                    required_machine_matrix))
+                offspring.append(self._get_child_operation_2d_array(parent2, parent1, dependency_matrix_index_encoding,
+                                                                    required_machine_matrix))
                     
                 selection_size -= 2
                 parents.remove(parent1)
-                parents.remove(parent2)
+                if parent2 in parents: # both parents can be the same solution
+                    parents.remove(parent2)
+            
+            # offspring of the generation are decoded and costed in one batch
+            for child in evaluate_operation_2d_arrays(data, offspring, self.reschedule, self.preschedule_idle,
+                                                      self.evaluation_pool, self.evaluation_cache):
+                if self.child_dominates(child):
+                    next_population.append(child)
    
             population = self.elitism(population, next_population) # next generation
-
-        self.memory, best_solution = get_multi_objective_optimal_sol(population, self.objective_params, self.reschedule, visualize=True, rank=3) # final generation results
-        
-        self.best_solution = best_solution        
-        for index, row in self.memory.iterrows():
-                sol_obj = Solution(row.data, row.operation_2d_array, dict_to_obj=True,
-                                   makespan=row.makespan, stock_cost=row.stock_cost, 
-                                   machine_makespans=row.machine_makespans,
-                                   due_date=row.due_date,
-                                   tardiness_cost=row.tardiness_cost,
-                                   stability=row.stability,
-                                   reschedule=self.reschedule,
-                                   preschedule_idle=self.preschedule_idle,
-                                   job_operation_runtime_matrix=row.job_operation_runtime_matrix,
-                                   operations=row.operations)
-                self.result_population.append(sol_obj)
+            iterations += 1
             
+            if migration_channel is not None and iterations % self.migration_interval == 0:
+                population = self.migrate(population, *migration_channel)
+
+        self.set_results(population) # final generation results
+        
         if self.benchmark:
             self.benchmark_iterations = iterations
             self.best_solution_makespan_v_iter = best_solution_makespan_v_iter
             self.avg_population_makespan_v_iter = avg_population_makespan_v_iter
-            self.min_makespan_coordinates = (best_solution_iteration, best_solution.makespan)
+            self.min_makespan_coordinates = (best_solution_iteration, self.best_solution.makespan)
+        
+        if migration_channel is not None:
+            # emigrants which were not received by the next island are dropped
+            migration_channel[1].cancel_join_thread()
+        
+        if multi_process_queue is not None:
+            self._ranking_cache = None
+            multi_process_queue.put(pickle.dumps(self, protocol=-1))
+        
+        return self.best_solution
+
+
+    def _get_child_operation_2d_array(self, parent1, parent2, dependency_matrix_index_encoding, required_machine_matrix):
+        """
+        function to create the chromosome of a child which differs from both parents
+        
+        Paramters
+        --------------------------
+        parent1 : first parent (solution)
+        parent2 : second parent (solution)
+        dependency_matrix_index_encoding : job operation matrix
+        required_machine_matrix : required machine matrix of all operations of all jobs
+        
+        Returns
+        ---------------
+        child_operation_2d_array : 2d array of operations of the child
+        
+        """ 
+        while True:
+            child_operation_2d_array = crossover_operation_2d_array(parent1, parent2,
+                                                                    self.mutation_probability,
+                                                                    dependency_matrix_index_encoding,
+                                                                    required_machine_matrix)
+            if not np.array_equal(child_operation_2d_array, parent1.operation_2d_array) and \
+               not np.array_equal(child_operation_2d_array, parent2.operation_2d_array):
+                return child_operation_2d_array
+
+
+    def set_results(self, population):
+        """
+        function to set the results of the search (Pareto fronts up to rank 3 of the final population)
         
-        self.solution_df = self.best_solution 
-        self.best_solution = self.convert_to_solution_obj(self.best_solution)[0]
+        Paramters
+        --------------------------
+        population : list of solutions of the final population
+        
+        Returns
+        ---------------
+        best_solution : best solution of the final population
+        
+        """ 
+        population = self.rank_population(population)
+        if self.visualize:
+            population.visualize(self.alg_type)
+        fronts = population.get_fronts(rank=3)
+        if not len(fronts):
+            # every solution has a negative objective value (e.g. all jobs finish before their due dates)
+            fronts = population.get_fronts(rank=3, non_negative=False)
+        best_index = fronts.get_best_index()
+        self.result_population = fronts.solutions
+        
+        # dataframes of the final generation for reporting
+        self.memory = fronts.to_dataframe()
+        self.solution_df = self.memory.loc[self.memory.index==best_index]
+        
+        self.best_solution = fronts.solutions[best_index]
         return self.best_solution
 
 
+    def migrate(self, population, inbox, outbox):
+        """
+        function to exchange Pareto optimal solutions with the other islands, the immigrants replace the
+        solutions with the highest Pareto rank
+        
+        Paramters
+        --------------------------
+        population : list of solutions
+        inbox : queue of the solutions sent to this island
+        outbox : queue of the next island
+        
+        Returns
+        ---------------
+        population : list of solutions after the migration
+        
+        """ 
+        ranked_population = self.rank_population(population)
+        pareto_fronts = ranked_population.get_front(0)
+        emigrants = random.sample(pareto_fronts, min(self.migration_size, len(pareto_fronts)))
+        outbox.put(pickle.dumps(emigrants, protocol=-1))
+        
+        immigrants = []
+        while True:
+            try:
+                immigrants += pickle.loads(inbox.get_nowait())
+            except queue.Empty:
+                break
+        
+        immigrants = [solution for solution in immigrants if solution not in population][:len(population)]
+        if not immigrants:
+            return population
+        
+        self.archive.merge(immigrants)
+        worst = np.argsort(ranked_population.ranks, kind='stable')[::-1][:len(immigrants)]
+        population = population[:]
+        for index, immigrant in zip(worst, immigrants):
+            population[index] = immigrant
+        return population
+
+
+    def rank_population(self, population):
+        """
+        function to evaluate the Pareto ranking of a population, the ranking of the last population is
+        cached so that every generation is ranked only once
+        
+        Paramters
+        --------------------------
+        population : list of solutions
+        
+        Returns
+        ---------------
+        ranked_population : population with Pareto ranks (see Population)
+        
+        """ 
+        key = tuple(solution.fingerprint for solution in population)
+        if self._ranking_cache is None or self._ranking_cache[0] != key:
+            self._ranking_cache = (key, Population(population, self.objective_params, self.reschedule))
+        return self._ranking_cache[1]
+
+
     def child_dominates(self, new_solution):
         """
         function to evaluate if a solution dominates
@@ -262,11 +383,7 @@ class GeneticAlgorithmAgent:
         flag 
         
         """ 
-        if dominates(self.memory, new_solution=new_solution, objective_params=self.objective_params, reschedule=self.reschedule):
-            self.memory = pd.concat([self.memory, pd.DataFrame([new_solution.as_dict()])])
-            self.memory = self.memory.loc[self.memory['rank']<=3] # drop solutions whose Pareto rank is above 3
-            return True
-        return False
+        return self.archive.insert(new_solution) # solutions whose Pareto rank rises above 3 are dropped
     
     
     def convert_to_solution_obj(self, df):
@@ -292,7 +409,8 @@ class GeneticAlgorithmAgent:
                                    reschedule=self.reschedule,
                                    preschedule_idle=self.preschedule_idle,
                                    job_operation_runtime_matrix=row.job_operation_runtime_matrix,
-                                   operations=row.operations)
+                                   operations=row.operations,
+                                   decoded_schedule=row.decoded_schedule)
                 result_population.append(sol_obj)
         return result_population
     
@@ -303,7 +421,7 @@ class GeneticAlgorithmAgent:
         
         Paramters
         --------------------------
-        pareto_solutions : dataframe of pareto solutions
+        pareto_solutions : population of pareto solutions (see Population)
         selection_size : parent selection size
         
         Returns
@@ -312,11 +430,10 @@ class GeneticAlgorithmAgent:
         
         """ 
         parents = []
-        pareto_fronts = pareto_solutions.loc[pareto_solutions['rank']==0] # Pareto optimal solution
-        pareto_fronts_solution_objects = self.convert_to_solution_obj(pareto_fronts)
+        pareto_fronts_solution_objects = pareto_solutions.get_front(0) # Pareto optimal solution
         
-        non_front_pareto_solutions = pareto_solutions.loc[pareto_solutions['rank'] != 0] # Non pareto optimal solutions
-        non_front_pareto_solution_objects = self.convert_to_solution_obj(non_front_pareto_solutions)
+        non_front_pareto_solution_objects = [solution for solution, rank in zip(pareto_solutions.solutions, pareto_solutions.ranks)
+                                             if rank != 0] # Non pareto optimal solutions
 
         
         size_fittest = int(selection_size/2)
@@ -327,6 +444,7 @@ class GeneticAlgorithmAgent:
             size_random = selection_size - size_fittest
         
         parents += random.sample(pareto_fronts_solution_objects, size_fittest) # selection of fittest members
+        size_random = min(size_random, len(non_front_pareto_solution_objects))
         parents += random.sample(non_front_pareto_solution_objects, size_random) # selection of random members
         
         return parents
@@ -349,10 +467,9 @@ class GeneticAlgorithmAgent:
         population_size = self.population_size
         population_size = population_size - len(next_population)
         
-        pareto_solutions, best_solution = get_multi_objective_optimal_sol(population, self.objective_params, self.reschedule, visualize=True, rank=3) 
+        pareto_solutions = self.rank_population(population) # same population as at the start of the generation
         
-        pareto_solutions_objects = self.convert_to_solution_obj(pareto_solutions)
-        next_population += pareto_solutions_objects
+        next_population += pareto_solutions.get_fronts(rank=3).solutions
         
         size = self.population_size - len(next_population)
         
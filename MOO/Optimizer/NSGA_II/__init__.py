@@ -0,0 +1 @@
+from .nsga_ii import NSGAIIAgent
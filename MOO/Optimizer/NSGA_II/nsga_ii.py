@@ -0,0 +1,193 @@
+import numpy as np
+from ..solution.evaluation import evaluate_operation_2d_arrays, EvaluationCache
+from ..utility import get_stop_condition
+from ..data import register_data
+from ..Genetic_alg import GeneticAlgorithmAgent
+from ..Genetic_alg._ga_helpers import crossover_operation_2d_array
+from ..Simulated_Annealing._generate_neighbor import generate_neighbor_operation_2d_array
+from ..pareto_front import Population, get_crowding_distances
+
+
+class NSGAIIAgent(GeneticAlgorithmAgent):
+
+    alg_type = "nsga"
+
+    def __init__(self, stopping_condition, population, time_condition=False, mutation_probability=0.8,
+                 probability_change_machine=0.25, benchmark=False, objective_params=None, reschedule=False,
+                 preschedule_idle=False, visualize=False, evaluation_pool=None, cache_size=4096):
+        """
+        NSGAIIAgent constructor, NSGA-II search (fast non-dominated sorting and crowding distance) with the
+        crossover of the GA and the neighbor generation of SA as mutation. Ranks, crowding distances and
+        selections are evaluated on the objective matrix of the whole population, the results are reported
+        like the ones of the GA (see GeneticAlgorithmAgent.set_results)
+
+        Paramters
+        --------------------------
+        stopping_condition : stopping condition for the search
+        population : initial population of solutions
+        time_condition : flag for time based search
+        mutation_probability : probability of moving an operation of an offspring (mutation)
+        probability_change_machine : probability of assigning another machine to the changed operation
+        benchmark : benchmark flag
+        objective_params : objective functions with weights
+        reschedule : reschedule flag
+        preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
+        visualize : flag to plot the final population and store it as excel file at the end of the search
+        evaluation_pool : EvaluationPool which evaluates the offspring of a generation in parallel (offspring
+                          are evaluated in this process if None)
+        cache_size : number of evaluated offspring kept in the evaluation cache (0 disables the cache)
+
+        Returns
+        ---------------
+        None
+        """
+
+        super().__init__(stopping_condition, population, time_condition, None, mutation_probability,
+                         benchmark=benchmark, objective_params=objective_params, reschedule=reschedule,
+                         preschedule_idle=preschedule_idle, visualize=visualize, evaluation_pool=evaluation_pool,
+                         cache_size=cache_size)
+        self.probability_change_machine = probability_change_machine
+
+
+    def start(self, multi_process_queue=None, data=None, migration_channel=None):
+        """
+        function to perform NSGA-II search
+
+        Paramters
+        --------------------------
+        multi_process_queue : not used (same signature as GeneticAlgorithmAgent.start)
+        data : instance data, registered in this process so that solutions can resolve it
+        migration_channel : not used
+
+        Returns
+        ---------------
+        best_solution : best solution of the final population
+
+        """
+
+        if data is not None:
+            register_data(data)
+        if self.cache_size:
+            self.evaluation_cache = EvaluationCache(self.cache_size)
+
+        population, crowding_distances = self.select_survivors(self.initial_population[:])
+
+        iterations = 0
+        data = self.initial_population[0].data
+        best_solution_makespan_v_iter = []
+        avg_population_makespan_v_iter = []
+        best_solution_iteration = 0
+        stop_condition = get_stop_condition(self.time_condition, self.runtime, self.iterations)
+
+        while not stop_condition(iterations):
+            if self.benchmark:
+                makespans = np.array([solution.makespan for solution in population.solutions])
+                avg_population_makespan_v_iter.append(makespans.mean())
+                best_solution_makespan_v_iter.append(makespans.min())
+                if makespans.min() < best_solution_makespan_v_iter[best_solution_iteration]:
+                    best_solution_iteration = iterations
+
+            parents = self.tournament_selection(population.ranks, crowding_distances)
+            offspring = self.generate_offspring(population.solutions, parents, data)
+            offspring = evaluate_operation_2d_arrays(data, offspring, self.reschedule, self.preschedule_idle,
+                                                     self.evaluation_pool, self.evaluation_cache)
+
+            population, crowding_distances = self.select_survivors(population.solutions + offspring) # next generation
+            iterations += 1
+
+        self.set_results(population.solutions) # final generation results
+
+        if self.benchmark:
+            self.benchmark_iterations = iterations
+            self.best_solution_makespan_v_iter = best_solution_makespan_v_iter
+            self.avg_population_makespan_v_iter = avg_population_makespan_v_iter
+            self.min_makespan_coordinates = (best_solution_iteration, self.best_solution.makespan)
+
+        return self.best_solution
+
+
+    def select_survivors(self, solutions):
+        """
+        function to select the next population: solutions are ordered by Pareto rank and, within a front, by
+        decreasing crowding distance (duplicates are removed first)
+
+        Paramters
+        --------------------------
+        solutions : list of solutions (current population and offspring)
+
+        Returns
+        ---------------
+        population : population of population_size solutions with their Pareto ranks
+        crowding_distances : crowding distances of the solutions of the population
+
+        """
+        unique_solutions = []
+        fingerprints = set()
+        for solution in solutions:
+            if solution.fingerprint not in fingerprints:
+                fingerprints.add(solution.fingerprint)
+                unique_solutions.append(solution)
+
+        population = Population(unique_solutions, self.objective_params, self.reschedule)
+        crowding_distances = get_crowding_distances(population.objective_values, population.ranks)
+        survivors = np.lexsort((-crowding_distances, population.ranks))[:self.population_size]
+
+        population = Population([population.solutions[i] for i in survivors], self.objective_params,
+                                self.reschedule, ranks=population.ranks[survivors])
+        return population, crowding_distances[survivors]
+
+
+    def tournament_selection(self, ranks, crowding_distances):
+        """
+        binary tournament selection (crowded comparison) of as many parents as there are solutions
+
+        Paramters
+        --------------------------
+        ranks : Pareto ranks of the solutions of the population
+        crowding_distances : crowding distances of the solutions of the population
+
+        Returns
+        ---------------
+        parents : indices of the selected parents
+
+        """
+        candidates = np.random.randint(0, len(ranks), size=(2, len(ranks)))
+        ranks = ranks[candidates]
+        crowding_distances = crowding_distances[candidates]
+        first_wins = (ranks[0] < ranks[1]) | ((ranks[0] == ranks[1]) & (crowding_distances[0] > crowding_distances[1]))
+        return np.where(first_wins, candidates[0], candidates[1])
+
+
+    def generate_offspring(self, solutions, parents, data):
+        """
+        function to create the chromosomes of the offspring, every pair of parents creates two children by
+        crossover which are mutated with mutation_probability
+
+        Paramters
+        --------------------------
+        solutions : list of solutions of the population
+        parents : indices of the selected parents
+        data : data object of the instance
+
+        Returns
+        ---------------
+        offspring : list of 2d arrays of operations
+
+        """
+        dependency_matrix_index_encoding = data.job_operation_index_matrix
+        required_machine_matrix = data.required_machine_matrix
+        mutations = np.random.random_sample(len(parents)) < self.mutation_probability
+
+        offspring = []
+        for parent1, parent2 in zip(parents[0::2], parents[1::2]):
+            for first, second in ((parent1, parent2), (parent2, parent1)):
+                offspring.append(crossover_operation_2d_array(solutions[first], solutions[second],
+                                                              self.probability_change_machine,
+                                                              dependency_matrix_index_encoding,
+                                                              required_machine_matrix))
+
+        for i in np.flatnonzero(mutations[:len(offspring)]):
+            offspring[i] = generate_neighbor_operation_2d_array(offspring[i], self.probability_change_machine,
+                                                                dependency_matrix_index_encoding,
+                                                                required_machine_matrix)[0]
+        return offspring
@@ -1,4 +1,5 @@
 from ..solution import Solution
+from ..solution._fingerprint import update_fingerprint
 cimport cython
 import numpy as np
 cimport numpy as np
@@ -7,8 +8,10 @@ cimport numpy as np
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.nonecheck(False)
-cpdef generate_neighbor(solution, double probability_change_machine, int[:, ::1] dependency_matrix_index_encoding, int[:, ::1] required_machine_matrix):
-    cdef int[:, ::1] result_operation_2d_array = np.copy(solution.operation_2d_array)
+cpdef tuple generate_neighbor_operation_2d_array(operation_2d_array, double probability_change_machine,
+                                                 int[:, ::1] dependency_matrix_index_encoding,
+                                                 int[:, ::1] required_machine_matrix):
+    cdef int[:, ::1] result_operation_2d_array = np.copy(operation_2d_array)
     cdef int[::1] operation, usable_machines
     cdef Py_ssize_t random_index, lower_index, upper_index, placement_index, min_machine_makespan, i
     cdef int job_id, sequence
@@ -47,4 +50,17 @@ cpdef generate_neighbor(solution, double probability_change_machine, int[:, ::1]
         i = dependency_matrix_index_encoding[operation[0], operation[1]]
         operation[3] = np.random.choice(required_machine_matrix[i])
 
-    return Solution(solution.data, np.insert(result_operation_2d_array, placement_index, operation, axis=0))
+    return np.insert(result_operation_2d_array, placement_index, operation, axis=0), random_index, placement_index
+
+
+cpdef generate_neighbor(solution, double probability_change_machine, int[:, ::1] dependency_matrix_index_encoding, int[:, ::1] required_machine_matrix):
+    neighbor_operation_2d_array, random_index, placement_index = generate_neighbor_operation_2d_array(
+        solution.operation_2d_array, probability_change_machine, dependency_matrix_index_encoding,
+        required_machine_matrix)
+    neighbor = Solution(solution.data, neighbor_operation_2d_array)
+
+    # only the rows between the old and the new position of the operation changed
+    neighbor.fingerprint = update_fingerprint(solution.fingerprint, solution.operation_2d_array,
+                                              neighbor.operation_2d_array, min(random_index, placement_index),
+                                              max(random_index, placement_index))
+    return neighbor
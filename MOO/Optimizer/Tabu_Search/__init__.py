@@ -1 +1,2 @@
 from .tabu_search import TabuSearchAgent
+from .elite_pool import ElitePool
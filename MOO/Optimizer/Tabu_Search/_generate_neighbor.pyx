@@ -1,4 +1,3 @@
-from ..solution import Solution
 cimport cython
 import numpy as np
 cimport numpy as np
@@ -6,49 +5,239 @@ cimport numpy as np
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-@cython.nonecheck(False)
-cpdef generate_neighbor(solution, double probability_change_machine,
-                        int[:, ::1] dependency_matrix_index_encoding, int[:, ::1] required_machine_matrix,
-                        int reschedule, int preschedule_idle):
-    cdef int[:, ::1] result_operation_2d_array = np.copy(solution.operation_2d_array)
-    cdef int[::1] operation, usable_machines
-    cdef Py_ssize_t random_index, lower_index, upper_index, placement_index, min_machine_makespan, i
-    cdef int job_id, sequence
-    cdef double[::1] makespans
-    lower_index = 0
-    upper_index = 0
-
-    while lower_index >= upper_index:
-
-        random_index = np.random.randint(0, result_operation_2d_array.shape[0])
-        operation = result_operation_2d_array[random_index]
-        job_id = operation[0]
-        sequence = operation[2]
-        lower_index = random_index - 1
-        while lower_index >= 0 and not (
-                result_operation_2d_array[lower_index, 0] == job_id and result_operation_2d_array[lower_index, 2] == sequence - 1):
-            lower_index -= 1
-
-        lower_index = 0 if lower_index < 0 else lower_index + 1
-        upper_index = random_index + 1
-        while upper_index < result_operation_2d_array.shape[0] and not (
-                result_operation_2d_array[upper_index, 0] == job_id and result_operation_2d_array[upper_index, 2] == sequence + 1):
-            upper_index += 1
-
-        if upper_index >= result_operation_2d_array.shape[0] - 1:
-            upper_index = upper_index - 2
+cdef inline void _move_operation(int[:, ::1] neighbor, const int[:, ::1] operation_2d_array, Py_ssize_t from_row,
+                                 Py_ssize_t to_row, int machine) nogil:
+    """
+    writes operation_2d_array to neighbor with the operation of from_row moved to to_row and assigned to machine
+    """
+    cdef Py_ssize_t row, column, i
+    for row in range(operation_2d_array.shape[0]):
+        if row < from_row and row < to_row or row > from_row and row > to_row:
+            i = row
+        elif row == to_row:
+            i = from_row
+        elif to_row < from_row:
+            i = row - 1
         else:
-            upper_index = upper_index - 1
+            i = row + 1
+        for column in range(4):
+            neighbor[row, column] = operation_2d_array[i, column]
+    neighbor[to_row, 3] = machine
 
-    result_operation_2d_array = np.delete(result_operation_2d_array, random_index, axis=0)
-    placement_index = random_index
-    while placement_index == random_index:
-        placement_index = np.random.randint(lower_index, upper_index + 1)
 
-    if np.random.random_sample() < probability_change_machine:
-        i = dependency_matrix_index_encoding[operation[0], operation[1]]
-        operation[3] = np.random.choice(required_machine_matrix[i])
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef tuple generate_neighborhood_block(const int[:, ::1] operation_2d_array, Py_ssize_t neighborhood_size,
+                                        double probability_change_machine,
+                                        const int[:, ::1] dependency_matrix_index_encoding,
+                                        const int[:, ::1] required_machine_matrix, Py_ssize_t max_attempts=0):
+    """
+    generates up to neighborhood_size neighbors of operation_2d_array in one call (same insertion and machine
+    change move as the neighbor of simulated annealing). A move whose operation can not be moved within the
+    positions allowed by the previous and next operation of its job is skipped, at most max_attempts moves are
+    drawn (4 times neighborhood_size if 0).
+
+    Returns
+    ---------------
+    neighborhood_block : 3d array of the operations of the neighbors (one 2d array of operations per neighbor)
+    first_rows : first row in which each neighbor differs from operation_2d_array
+    last_rows : last row in which each neighbor differs from operation_2d_array
+    """
+    cdef Py_ssize_t num_rows = operation_2d_array.shape[0]
+    cdef Py_ssize_t num_machines = required_machine_matrix.shape[1]
+    if max_attempts <= 0:
+        max_attempts = 4 * neighborhood_size
+
+    cdef double[:, ::1] random_values = np.random.random_sample((max_attempts, 4))
+    neighborhood_block = np.empty((neighborhood_size, num_rows, 4), dtype=np.intc)
+    first_rows = np.empty(neighborhood_size, dtype=np.intp)
+    last_rows = np.empty(neighborhood_size, dtype=np.intp)
+    cdef int[:, :, ::1] block = neighborhood_block
+    cdef Py_ssize_t[::1] first_rows_view = first_rows
+    cdef Py_ssize_t[::1] last_rows_view = last_rows
+
+    cdef Py_ssize_t attempt, count = 0, random_index, lower_index, upper_index, placement_index, num_positions, i
+    cdef int job_id, sequence, machine
+
+    with nogil:
+        for attempt in range(max_attempts):
+            if count == neighborhood_size:
+                break
+
+            random_index = <Py_ssize_t> (random_values[attempt, 0] * num_rows)
+            job_id = operation_2d_array[random_index, 0]
+            sequence = operation_2d_array[random_index, 2]
+            lower_index = random_index - 1
+            while lower_index >= 0 and not (
+                    operation_2d_array[lower_index, 0] == job_id and operation_2d_array[lower_index, 2] == sequence - 1):
+                lower_index -= 1
+
+            lower_index = 0 if lower_index < 0 else lower_index + 1
+            upper_index = random_index + 1
+            while upper_index < num_rows and not (
+                    operation_2d_array[upper_index, 0] == job_id and operation_2d_array[upper_index, 2] == sequence + 1):
+                upper_index += 1
+
+            if upper_index >= num_rows - 1:
+                upper_index = upper_index - 2
+            else:
+                upper_index = upper_index - 1
+
+            if lower_index >= upper_index:
+                continue
+
+            # position in lower_index..upper_index other than random_index
+            num_positions = upper_index - lower_index + 1
+            if lower_index <= random_index <= upper_index:
+                num_positions -= 1
+            placement_index = lower_index + <Py_ssize_t> (random_values[attempt, 1] * num_positions)
+            if lower_index <= random_index <= placement_index:
+                placement_index += 1
+
+            machine = operation_2d_array[random_index, 3]
+            if random_values[attempt, 2] < probability_change_machine:
+                i = dependency_matrix_index_encoding[job_id, operation_2d_array[random_index, 1]]
+                machine = required_machine_matrix[i, <Py_ssize_t> (random_values[attempt, 3] * num_machines)]
+
+            _move_operation(block[count], operation_2d_array, random_index, placement_index, machine)
+
+            first_rows_view[count] = min(random_index, placement_index)
+            last_rows_view[count] = max(random_index, placement_index)
+            count += 1
+
+    return neighborhood_block[:count], first_rows[:count], last_rows[:count]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bint _keeps_job_order(const int[:, ::1] operation_2d_array, Py_ssize_t from_row, Py_ssize_t to_row) nogil:
+    """
+    True if moving the operation of from_row to to_row does not move it before a previous or after a next
+    operation of its job
+    """
+    cdef int job_id = operation_2d_array[from_row, 0]
+    cdef int sequence = operation_2d_array[from_row, 2]
+    cdef Py_ssize_t row
+    if to_row < from_row:
+        for row in range(to_row, from_row):
+            if operation_2d_array[row, 0] == job_id and operation_2d_array[row, 2] < sequence:
+                return False
+    else:
+        for row in range(from_row + 1, to_row + 1):
+            if operation_2d_array[row, 0] == job_id and operation_2d_array[row, 2] > sequence:
+                return False
+    return True
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef list get_critical_blocks(const int[:, ::1] operation_2d_array, const double[::1] wait_times,
+                               const double[::1] machine_makespans, Py_ssize_t num_jobs):
+    """
+    critical path of the decoded schedule split into critical blocks. The path starts with the last operation
+    of the machine with the highest makespan and follows the previous operation on the machine, or the previous
+    operation of the job when the operation waited for its job.
+
+    Returns
+    ---------------
+    critical_blocks : list of critical blocks, a block is the list of rows of consecutive operations of the
+                      critical path on one machine (in schedule order)
+    """
+    cdef Py_ssize_t num_rows = operation_2d_array.shape[0]
+    cdef Py_ssize_t[::1] machine_previous_row = np.empty(num_rows, dtype=np.intp)
+    cdef Py_ssize_t[::1] job_previous_row = np.empty(num_rows, dtype=np.intp)
+    cdef Py_ssize_t[::1] machine_last_row = np.full(machine_makespans.shape[0], -1, dtype=np.intp)
+    cdef Py_ssize_t[::1] job_last_row = np.full(num_jobs, -1, dtype=np.intp)
+    cdef Py_ssize_t[::1] job_previous_sequence_row = np.full(num_jobs, -1, dtype=np.intp)
+    cdef Py_ssize_t row, critical_machine = 0, m
+    cdef int job_id, machine
+
+    # previous operation on the machine and previous operation of the job (see decode_operations)
+    for row in range(num_rows):
+        job_id = operation_2d_array[row, 0]
+        machine = operation_2d_array[row, 3]
+        machine_previous_row[row] = machine_last_row[machine]
+        machine_last_row[machine] = row
+        if job_last_row[job_id] != -1 and operation_2d_array[job_last_row[job_id], 2] < operation_2d_array[row, 2]:
+            job_previous_sequence_row[job_id] = job_last_row[job_id]
+        job_previous_row[row] = job_previous_sequence_row[job_id]
+        job_last_row[job_id] = row
+
+    for m in range(machine_makespans.shape[0]):
+        if machine_makespans[m] > machine_makespans[critical_machine]:
+            critical_machine = m
+
+    critical_path = []
+    row = machine_last_row[critical_machine]
+    while row != -1:
+        critical_path.append(row)
+        row = job_previous_row[row] if wait_times[row] > 0 else machine_previous_row[row]
+    critical_path.reverse()
+
+    critical_blocks = []
+    block = None
+    for row in critical_path:
+        if block is not None and machine_previous_row[row] == block[len(block) - 1]:
+            block.append(row)
+        else:
+            block = [row]
+            critical_blocks.append(block)
+    return critical_blocks
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef tuple generate_critical_neighborhood_block(const int[:, ::1] operation_2d_array, const double[::1] wait_times,
+                                                 const double[::1] machine_makespans,
+                                                 const int[:, ::1] dependency_matrix_index_encoding,
+                                                 const int[:, ::1] required_machine_matrix):
+    """
+    generates the critical path neighborhood of operation_2d_array (see get_critical_blocks): every operation
+    of a critical block is moved to the start and to the end of its block (N7 moves, the N5 swaps of the first
+    and last two operations of a block are included) and every critical operation is assigned to each of its
+    alternative machines. Moves which would break the operation order of a job are skipped.
+
+    Returns
+    ---------------
+    neighborhood_block : 3d array of the operations of the neighbors (one 2d array of operations per neighbor)
+    first_rows : first row in which each neighbor differs from operation_2d_array
+    last_rows : last row in which each neighbor differs from operation_2d_array
+    """
+    critical_blocks = get_critical_blocks(operation_2d_array, wait_times, machine_makespans,
+                                          dependency_matrix_index_encoding.shape[0])
+
+    cdef Py_ssize_t from_row, first_row, last_row, i, column, k, num_moves
+    cdef int machine
+    moves = []
+    for block in critical_blocks:
+        first_row = block[0]
+        last_row = block[len(block) - 1]
+        for from_row in block:
+            if from_row != first_row and _keeps_job_order(operation_2d_array, from_row, first_row):
+                moves.append((from_row, first_row, operation_2d_array[from_row, 3]))
+            if from_row != last_row and _keeps_job_order(operation_2d_array, from_row, last_row):
+                moves.append((from_row, last_row, operation_2d_array[from_row, 3]))
+
+        for from_row in block:
+            i = dependency_matrix_index_encoding[operation_2d_array[from_row, 0], operation_2d_array[from_row, 1]]
+            machines = {operation_2d_array[from_row, 3]}
+            for column in range(required_machine_matrix.shape[1]):
+                machine = required_machine_matrix[i, column]
+                if machine not in machines:
+                    machines.add(machine)
+                    moves.append((from_row, from_row, machine))
+
+    num_moves = len(moves)
+    moves = np.array(moves, dtype=np.intp).reshape(num_moves, 3)
+    cdef Py_ssize_t[:, ::1] move_array = moves
+    neighborhood_block = np.empty((num_moves, operation_2d_array.shape[0], 4), dtype=np.intc)
+    first_rows = np.minimum(moves[:, 0], moves[:, 1])
+    last_rows = np.maximum(moves[:, 0], moves[:, 1])
+    cdef int[:, :, ::1] block_view = neighborhood_block
 
-    return Solution(solution.data, np.insert(result_operation_2d_array, 
-                                             placement_index, operation, axis=0),
-                                             reschedule=reschedule, preschedule_idle=preschedule_idle)
+    with nogil:
+        for k in range(num_moves):
+            _move_operation(block_view[k], operation_2d_array, move_array[k, 0], move_array[k, 1],
+                            <int> move_array[k, 2])
+    return neighborhood_block, first_rows, last_rows
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Elite pool shared by the tabu search agents of a cooperative search
+"""
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8, no cooperative tabu search
+    shared_memory = None
+
+
+class ElitePool:
+
+    def __init__(self, num_agents, num_operations, slots_per_agent=8):
+        """
+        Constructor of ElitePool class, bounded pool of elite solutions in shared memory. Every agent owns a
+        ring buffer of slots_per_agent slots which only it writes (the oldest elite of the agent is replaced),
+        so no lock is needed: a slot is written between two increments of its sequence number and readers
+        skip slots whose sequence number is odd or changed while they were copied.
+        The pool is pickled by the name of its shared memory block, receiving processes attach it.
+
+        Paramters
+        --------------------------
+        num_agents : number of tabu search agents
+        num_operations : number of operations of the instance (rows of a chromosome)
+        slots_per_agent : number of elite solutions kept per agent
+
+        Returns
+        ---------------
+        None
+        """
+
+        if shared_memory is None:
+            raise RuntimeError("The elite pool of a cooperative tabu search needs multiprocessing.shared_memory "
+                               "(Python 3.8 or later)")
+
+        self.num_agents = num_agents
+        self.num_operations = num_operations
+        self.slots_per_agent = slots_per_agent
+        self._block = shared_memory.SharedMemory(create=True, size=self._get_size())
+        self._owner = True
+        self._attach()
+        self.sequences[:] = 0
+        self.write_counts[:] = 0
+
+
+    def _get_size(self):
+        num_slots = self.num_agents * self.slots_per_agent
+        return 8 * (num_slots + self.num_agents) + 4 * num_slots * self.num_operations * 4
+
+
+    def _attach(self):
+        shape = (self.num_agents, self.slots_per_agent)
+        offset = 0
+        self.sequences = np.ndarray(shape, dtype=np.int64, buffer=self._block.buf, offset=offset)
+        offset += self.sequences.nbytes
+        self.write_counts = np.ndarray(self.num_agents, dtype=np.int64, buffer=self._block.buf, offset=offset)
+        offset += self.write_counts.nbytes
+        self.chromosomes = np.ndarray(shape + (self.num_operations, 4), dtype=np.intc, buffer=self._block.buf,
+                                      offset=offset)
+
+
+    def __getstate__(self):
+        return {'name': self._block.name, 'num_agents': self.num_agents, 'num_operations': self.num_operations,
+                'slots_per_agent': self.slots_per_agent}
+
+
+    def __setstate__(self, state):
+        self.num_agents = state['num_agents']
+        self.num_operations = state['num_operations']
+        self.slots_per_agent = state['slots_per_agent']
+        self._block = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._attach()
+
+
+    def publish(self, agent_index, solution):
+        """
+        function to write a solution into the next slot of the agent (the oldest elite of the agent is replaced)
+
+        Paramters
+        --------------------------
+        agent_index : index of the publishing agent
+        solution : solution object
+
+        Returns
+        ---------------
+        None
+        """
+        slot = self.write_counts[agent_index] % self.slots_per_agent
+        self.sequences[agent_index, slot] += 1 # odd while the slot is written
+        self.chromosomes[agent_index, slot] = solution.operation_2d_array
+        self.sequences[agent_index, slot] += 1
+        self.write_counts[agent_index] += 1
+
+
+    def sample(self, agent_index=None):
+        """
+        function to copy a random elite solution published by another agent
+
+        Paramters
+        --------------------------
+        agent_index : index of the requesting agent, its own elites are not sampled
+
+        Returns
+        ---------------
+        operation_2d_array : chromosome of the elite or None if no other agent published a solution yet
+        """
+        sequences = self.sequences.copy()
+        if agent_index is not None:
+            sequences[agent_index] = 0
+        candidates = np.flatnonzero((sequences > 0) & (sequences % 2 == 0))
+        for slot in np.random.permutation(candidates):
+            agent, slot = divmod(slot, self.slots_per_agent)
+            sequence = self.sequences[agent, slot]
+            operation_2d_array = self.chromosomes[agent, slot].copy()
+            if sequence % 2 == 0 and self.sequences[agent, slot] == sequence:
+                return operation_2d_array
+        return None
+
+
+    def __len__(self):
+        return int(np.minimum(self.write_counts, self.slots_per_agent).sum())
+
+
+    def close(self):
+        """
+        function to detach the pool, the owner also frees the shared memory block
+        """
+        self.sequences = self.write_counts = self.chromosomes = None
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
@@ -6,15 +6,16 @@ Created on Thu Dec 17 08:45:00 2020
 @author: chandan
 """
 import pickle
-import time
-from queue import Queue
-import pandas as pd
+import numpy as np
+from collections import deque
 
-from ._generate_neighbor import generate_neighbor
-from ..exception import InfeasibleSolutionException
+from ._generate_neighbor import generate_neighborhood_block, generate_critical_neighborhood_block
 from ..utility import get_stop_condition, Heap
-from ..pareto_front import get_multi_objective_optimal_sol, dominates, dominates_2
-from ..solution import Solution
+from ..pareto_front import Population, dominates_2
+from ..pareto_archive import ParetoArchive
+from ..solution import Solution, DeltaEvaluator, EvaluationCache
+from ..solution._fingerprint import update_fingerprints
+from ..data import register_data
 
 
 #standalone function
@@ -28,7 +29,8 @@ class TabuSearchAgent:
     def __init__(self, stopping_condition, time_condition, initial_solution, num_solutions_to_find=1,
                  tabu_list_size=50, neighborhood_size=300, neighborhood_wait=0.1, probability_change_machine=0.8,
                  reset_threshold=100, benchmark=False, memory=None, population=None, objective_params=None, 
-                 reschedule=False, preschedule_idle=False):
+                 reschedule=False, preschedule_idle=False, checkpoint_interval=16, cache_size=4096,
+                 neighborhood="random", agent_index=0):
         """
         Constructor for TabuSearchAgent
         
@@ -40,16 +42,25 @@ class TabuSearchAgent:
         initial_solution : initial solution candidate for the search
         num_solutions_to_find : number of best solutions to obtain per process
             
-        tabu_list_size :  size of the tabu list 
-        neighbourhood_size : size of the neighbourhood
+        tabu_list_size :  tenure of the tabu list, number of iterations during which a move back to the
+                          previous row and machine of a moved operation is tabu
+        neighbourhood_size : size of the neighbourhood (number of moves generated per iteration)
+        neighborhood_wait : not used, the neighbourhood is generated in one batch (see generate_neighborhood_block)
         probability_change_machine : probability of machine change (FJSSP)
-        reset_threshold : reset threshold for the search        
+        reset_threshold : number of iterations without a new solution in the Pareto memory after which the
+                          search restarts from a solution of the elite pool (cooperative search only)
         benchmark : Flag to store benchmark results
         memory : Pareto memory from GA
         population : population from GA (not used)
         objective_params : objective functions list
         reschedule : Flag to set reschedule mode
         preschedule_idle : Flag to set preschedule_idle mode
+        checkpoint_interval : rows between decoder checkpoints of the seed solution for the delta evaluation
+                              of neighbors (0 decodes every neighbor from scratch)
+        cache_size : number of evaluated neighbors kept in the evaluation cache (0 disables the cache)
+        neighborhood : "random" (random insertion and machine change moves) or "critical_path" (moves of the
+                       operations of the critical blocks of the seed solution, see generate_critical_neighborhood_block)
+        agent_index : index of the agent in the elite pool of a cooperative search
         
         Returns
         ------------------------------
@@ -73,6 +84,11 @@ class TabuSearchAgent:
         self.probability_change_machine = probability_change_machine
         self.reset_threshold = reset_threshold
         self.benchmark = benchmark
+        self.checkpoint_interval = checkpoint_interval
+        self.cache_size = cache_size
+        self.neighborhood = neighborhood
+        self.agent_index = agent_index
+        self.evaluation_cache = None
 
         # uninitialized ts results
         self.all_solutions = []
@@ -88,6 +104,7 @@ class TabuSearchAgent:
         
         self.memory = memory
         self.population = population
+        self.archive = None
 
         if benchmark:
             # uninitialized ts benchmark results
@@ -98,47 +115,99 @@ class TabuSearchAgent:
             self.min_makespan_coordinates = (0, 0)
 
 
-    def _generate_neighborhood(self, seed_solution, dependency_matrix_index_encoding, required_machine_matrix):
+    def _generate_neighborhood(self, seed_solution, dependency_matrix_index_encoding, required_machine_matrix,
+                               critical_path=False):
         """
-        function to generate neighbourhood of seed solution
+        function to generate neighbourhood of seed solution, all moves are generated in one call of the
+        neighborhood kernel and the new neighbors are decoded in one call of the delta evaluator
         
         Parameter
         --------------------------------------------
         seed_solution :  solution candidate whom's neighbourhood has to be found
         dependency_matrix_index_encoding : job operation matrix
         required_machine_matrix : required machine matrix of all operations of all jobs
+        critical_path : flag to generate the moves of the critical blocks instead of random moves
         
         Returns
         ------------------------------
         neighborhood : neighbourhood of seed solution        
+        moves : move attributes (see _get_move_attributes) of the neighbors by fingerprint
         
         """
         
-        stop_time = time.time() + self.neighborhood_wait
         neighborhood = _SolutionSet()
-        while neighborhood.size < self.neighborhood_size and time.time() < stop_time:
-            try:
-                
-                neighbor = generate_neighbor(seed_solution, self.probability_change_machine,
-                                             dependency_matrix_index_encoding, required_machine_matrix,
-                                             reschedule=self.reschedule,
-                                             preschedule_idle=self.preschedule_idle)
-
-                if neighbor not in neighborhood:
-                    neighborhood.add(neighbor)
-
-            except InfeasibleSolutionException:
-                pass
-        return neighborhood
+        neighborhood_block = None
+        if critical_path:
+            seed_solution.get_decoded_schedule()
+            neighborhood_block, first_rows, last_rows = generate_critical_neighborhood_block(
+                seed_solution.operation_2d_array, seed_solution.wait_times,
+                np.asarray(seed_solution.machine_makespans, dtype=np.float64), dependency_matrix_index_encoding,
+                required_machine_matrix)
+            if len(neighborhood_block) > self.neighborhood_size:
+                moves = np.sort(np.random.choice(len(neighborhood_block), self.neighborhood_size, replace=False))
+                neighborhood_block, first_rows, last_rows = neighborhood_block[moves], first_rows[moves], last_rows[moves]
+        
+        if neighborhood_block is None or len(neighborhood_block) == 0:
+            # random moves (also when the critical path has no feasible move)
+            neighborhood_block, first_rows, last_rows = generate_neighborhood_block(seed_solution.operation_2d_array,
+                                                                                    self.neighborhood_size,
+                                                                                    self.probability_change_machine,
+                                                                                    dependency_matrix_index_encoding,
+                                                                                    required_machine_matrix)
+        fingerprints = update_fingerprints(seed_solution.fingerprint, seed_solution.operation_2d_array,
+                                           neighborhood_block, first_rows, last_rows).tolist()
+        moves = dict(zip(fingerprints, zip(*_get_move_attributes(seed_solution.operation_2d_array, neighborhood_block,
+                                                                  first_rows, last_rows))))
+        
+        # duplicate moves and neighbors evaluated before are not decoded again
+        unique_fingerprints = set()
+        missing = []
+        for k, fingerprint in enumerate(fingerprints):
+            if fingerprint in unique_fingerprints:
+                continue
+            unique_fingerprints.add(fingerprint)
+            
+            neighbor = None
+            if self.evaluation_cache is not None:
+                neighbor = self.evaluation_cache.get(fingerprint, neighborhood_block[k], self.reschedule,
+                                                     self.preschedule_idle)
+            if neighbor is None:
+                missing.append(k)
+            else:
+                neighborhood.add(neighbor)
+        
+        if self.checkpoint_interval:
+            # rows before the moved operations are unchanged, only the tails of the schedules are decoded again
+            delta_evaluator = DeltaEvaluator(seed_solution, checkpoint_interval=self.checkpoint_interval,
+                                             reschedule=self.reschedule, preschedule_idle=self.preschedule_idle)
+            neighbors = delta_evaluator.get_neighbors(neighborhood_block[missing], first_rows[missing])
+        else:
+            neighbors = [Solution(seed_solution.data, neighborhood_block[k].copy(), reschedule=self.reschedule,
+                                  preschedule_idle=self.preschedule_idle) for k in missing]
+        
+        for k, neighbor in zip(missing, neighbors):
+            neighbor.fingerprint = fingerprints[k]
+            if self.evaluation_cache is not None:
+                self.evaluation_cache.put(neighbor, self.reschedule, self.preschedule_idle)
+            neighborhood.add(neighbor)
+        return neighborhood, moves
 
 
-    def start(self, multi_process_queue=None):
+    def start(self, multi_process_queue=None, data=None, result_channel=None, stop_event=None, elite_pool=None):
         """
         function to execute tabu search
         
         Parameter
         --------------------------------------------
         multi_process_queue : multi process queue object to store the best solution of the current process
+        data : instance data, registered in this process so that solutions can resolve it (needed when the
+               process is spawned instead of forked)
+        result_channel : queue which receives the solutions that entered the Pareto memory in an iteration
+                         (pickled list of solutions, only chromosome and objective values are sent)
+        stop_event : event which ends the search after the current iteration when it is set
+        elite_pool : ElitePool of a cooperative search, the solutions which enter the Pareto memory are
+                     published to it and the search restarts from an elite of another agent after
+                     reset_threshold iterations without a new solution in the Pareto memory
         
         Returns
         ------------------------------
@@ -146,67 +215,99 @@ class TabuSearchAgent:
         
         """
         
+        if data is not None:
+            register_data(data)
+        
         dependency_matrix_index_encoding = self.initial_solution.data.job_operation_index_matrix
         required_machine_matrix = self.initial_solution.data.required_machine_matrix
 
-        tabu_list = _TabuList()
+        tabu_list = _TabuList(self.tabu_list_size)
+        if self.cache_size:
+            self.evaluation_cache = EvaluationCache(self.cache_size)
         seed_solution = self.initial_solution
         
+        # Pareto memory (Pareto rank 1 at most) seeded with the memory of the GA
+        self.archive = ParetoArchive(self.objective_params, self.reschedule, max_rank=1,
+                                     solutions=self.convert_to_solution_obj(self.memory))
+        
         best_solutions_heap = Heap(max_heap=True)
         for _ in range(self.num_solutions_to_find):
             best_solutions_heap.push(self.initial_solution)
 
         iterations = 0
+        iterations_without_improvement = 0
+        seed_kept = False
         stop_condition = get_stop_condition(self.time_condition, self.runtime, self.iterations)
 
-        while not stop_condition(iterations):
-            neighborhood = self._generate_neighborhood(seed_solution,
-                                                       dependency_matrix_index_encoding,
-                                                       required_machine_matrix)
+        while not stop_condition(iterations) and not (stop_event is not None and stop_event.is_set()):
+            # the critical path neighborhood of a kept seed is the same again and the critical moves alone cycle
+            # once the search stagnates, random moves are used instead
+            critical_path = (self.neighborhood == "critical_path" and not seed_kept
+                             and iterations_without_improvement < 3)
+            neighborhood, moves = self._generate_neighborhood(seed_solution,
+                                                              dependency_matrix_index_encoding,
+                                                              required_machine_matrix,
+                                                              critical_path)
+            seed_kept = False
 
             sorted_neighborhood = sorted(neighborhood.solutions.items())
             neighbourhood = [ neighbor[0] for _, neighbor in sorted_neighborhood]
             
-            neighbourhood_pareto, best_solution = get_multi_objective_optimal_sol(neighbourhood, self.objective_params, self.reschedule, visualize=False, rank=1) 
-            
-            neighbourhood_pareto = neighbourhood_pareto.loc[neighbourhood_pareto['rank'] == 0] # Pareto Optimal solutions from Neighburhood
-            
-            neighbourhood_pareto = self.convert_to_solution_obj(neighbourhood_pareto)
+            # Pareto Optimal solutions from Neighburhood
+            neighbourhood_pareto = list(Population(neighbourhood, self.objective_params, self.reschedule).get_fronts(rank=0).solutions)
             
+            archive_delta = []
             for neighbor in neighbourhood_pareto:
-                if neighbor not in tabu_list and neighbor not in self.memory and self.neighbor_dominates(neighbor):
-                    tabu_list.put(neighbor)
+                if neighbor not in self.archive and self.neighbor_dominates(neighbor):
+                    archive_delta.append(neighbor)
             
+            if result_channel is not None and archive_delta:
+                result_channel.put(pickle.dumps(archive_delta, protocol=-1))
+            if elite_pool is not None:
+                for solution in archive_delta:
+                    elite_pool.publish(self.agent_index, solution)
+            iterations_without_improvement = 0 if archive_delta else iterations_without_improvement + 1
             
             neighbour_best_flag = True
             while neighbour_best_flag:
-                _, neighbor_best = get_multi_objective_optimal_sol(neighbourhood_pareto, self.objective_params, self.reschedule, visualize=False, rank=1)           
+                neighbor_best = Population(neighbourhood_pareto, self.objective_params, self.reschedule).get_fronts(rank=1).get_best_solution()
                 
-                if neighbor_best in tabu_list:
-                    # if neighbor dominates seed solution
-                     if dominates_2(neighbor_best, seed_solution, self.objective_params, self.reschedule):
-                         neighbour_best_flag = False
-                     else:
-                         neighbourhood_pareto.remove(neighbor_best)
+                if neighbor_best is None:
+                    # every Pareto optimal neighbor is tabu, the seed solution is kept
+                    neighbor_best = seed_solution
+                    neighbour_best_flag = False
+                    seed_kept = True
+                elif moves[neighbor_best.fingerprint][0] in tabu_list:
+                    # aspiration: a tabu move is accepted if the neighbor dominates the seed solution
+                    if dominates_2(neighbor_best, seed_solution, self.objective_params, self.reschedule):
+                        neighbour_best_flag = False
+                    else:
+                        neighbourhood_pareto.remove(neighbor_best)
                 else:
                     neighbour_best_flag = False
                     
             
+            if not seed_kept:
+                # moving the operation back to its previous row and machine is tabu
+                tabu_list.put(moves[neighbor_best.fingerprint][1])
+            tabu_list.step()
             seed_solution = neighbor_best
             
-            if seed_solution not in tabu_list:
-                tabu_list.put(seed_solution)
-                
-            if len(tabu_list) > self.tabu_list_size:
-                tabu_list.get() 
+            if elite_pool is not None and iterations_without_improvement >= self.reset_threshold:
+                # stagnation: restart from an elite solution of another agent
+                elite = elite_pool.sample(self.agent_index)
+                if elite is not None:
+                    seed_solution = Solution(seed_solution.data, elite, reschedule=self.reschedule,
+                                             preschedule_idle=self.preschedule_idle)
+                    seed_kept = False
+                iterations_without_improvement = 0
             
-        self.memory = self.memory.loc[self.memory['rank'] == 0] # Pareto front (Pareto optimal solutions)
+        self.memory = self.archive.get_front(0) # Pareto front (Pareto optimal solutions)
+        self.archive = None
             
         if multi_process_queue is not None:
             multi_process_queue.put(pickle.dumps(self, protocol=-1))
         
-        # Convert solutions from dataframe to list of solution objects 
-        self.memory = self.convert_to_solution_obj(self.memory)
         return self.memory
     
     
@@ -224,10 +325,7 @@ class TabuSearchAgent:
         
         """
         
-        if dominates(self.memory, new_solution=new_solution, objective_params=self.objective_params, reschedule=self.reschedule, rank=1):
-            self.memory = pd.concat([self.memory, pd.DataFrame([new_solution.as_dict()])])
-            return True
-        return False        
+        return self.archive.insert(new_solution)
     
  
     def convert_to_solution_obj(self, df):
@@ -253,7 +351,8 @@ class TabuSearchAgent:
                                    reschedule=self.reschedule,
                                    preschedule_idle=self.preschedule_idle,
                                    job_operation_runtime_matrix=row.job_operation_runtime_matrix,
-                                   operations=row.operations)
+                                   operations=row.operations,
+                                   decoded_schedule=row.decoded_schedule)
                 result_population.append(sol_obj)
         return result_population
 
@@ -264,32 +363,69 @@ Tabu list in queue format (FIFO) or least recently used (LRU)
 """
     
 
-class _TabuList(Queue):
-
-    def __init__(self, max_size=0):
-        super().__init__(max_size)
-        self.solutions = _SolutionSet()
-
-    def put(self, solution, block=True, timeout=None):
-        super().put(solution, block, timeout)
-        self.solutions.add(solution)
-
-    def get(self, block=True, timeout=None):
-        result = super().get(block, timeout)
-        self.solutions.remove(result)
-        return result
-
-    def __contains__(self, solution):
-        return solution in self.solutions
+def _get_move_attributes(operation_2d_array, neighborhood_block, first_rows, last_rows):
+    """
+    helper function to get the attributes of the moves of a neighborhood block, the operation of a move is
+    inserted at one end of the changed rows (first_rows[k], last_rows[k]) of neighbor k and comes from the other
+    end (a machine change keeps the row). When two adjacent operations are swapped, the moved operation is the
+    one whose machine changed
+
+    Returns
+    ---------------
+    attributes : (job, operation, row, machine) of the moved operations in the neighbors
+    reverse_attributes : (job, operation, row, machine) of the moved operations in the seed solution
+    """
+    neighbors = np.arange(len(neighborhood_block))
+    moved_down = np.all(neighborhood_block[neighbors, last_rows, :2] == operation_2d_array[first_rows, :2], axis=1)
+    moved_up = (np.all(neighborhood_block[neighbors, first_rows, :2] == operation_2d_array[last_rows, :2], axis=1)
+                & (neighborhood_block[neighbors, first_rows, 3] != operation_2d_array[last_rows, 3]))
+    moved_down &= ~moved_up | (first_rows == last_rows)
+    rows = np.where(moved_down, last_rows, first_rows)
+    previous_rows = np.where(moved_down, first_rows, last_rows)
+    moved_operations = neighborhood_block[neighbors, rows]
+
+    attributes = np.column_stack((moved_operations[:, :2], rows, moved_operations[:, 3]))
+    reverse_attributes = np.column_stack((moved_operations[:, :2], previous_rows, operation_2d_array[previous_rows, 3]))
+    return map(tuple, attributes.tolist()), map(tuple, reverse_attributes.tolist())
+
+
+class _TabuList:
+
+    def __init__(self, tenure):
+        """
+        tabu move attributes (job, operation, row, machine), an attribute stays tabu for 'tenure' iterations.
+        The attributes are kept in a deque ordered by expiry next to a hash map for the membership test.
+        """
+        self.tenure = tenure
+        self.iteration = 0
+        self.expiries = deque()     # (expiry iteration, attribute) in insertion order
+        self.attributes = {}        # attribute -> expiry iteration
+
+    def put(self, attribute):
+        expiry = self.iteration + self.tenure
+        self.attributes[attribute] = expiry
+        self.expiries.append((expiry, attribute))
+
+    def step(self):
+        # an attribute put again later keeps its newer expiry
+        self.iteration += 1
+        while self.expiries and self.expiries[0][0] <= self.iteration:
+            expiry, attribute = self.expiries.popleft()
+            if self.attributes.get(attribute) == expiry:
+                del self.attributes[attribute]
+
+    def __contains__(self, attribute):
+        return attribute in self.attributes
 
     def __len__(self):
-        return self.solutions.size
+        return len(self.attributes)
 
 
 class _SolutionSet:
     def __init__(self):
         self.size = 0
-        self.solutions = {}
+        self.solutions = {}     # solutions bucketed by makespan (ordering of the neighborhood)
+        self.members = set()    # hash set on the chromosome fingerprint (membership)
 
     def add(self, solution):
         if solution.makespan not in self.solutions:
@@ -297,6 +433,7 @@ class _SolutionSet:
         else:
             self.solutions[solution.makespan].append(solution)
 
+        self.members.add(solution)
         self.size += 1
 
     def remove(self, solution):
@@ -305,7 +442,8 @@ class _SolutionSet:
         else:
             self.solutions[solution.makespan].remove(solution)
 
+        self.members.discard(solution)
         self.size -= 1
 
     def __contains__(self, solution):
-        return solution.makespan in self.solutions and solution in self.solutions[solution.makespan]
+        return solution in self.members
@@ -0,0 +1,141 @@
+cimport cython
+import numpy as np
+cimport numpy as np
+
+
+# Pareto ranking without the n x n dominance matrix. Solutions are visited in lexicographic order of their
+# objective values, a solution can then only be dominated by solutions visited before it and the fronts
+# found so far are ordered: if front f dominates a solution, every front before f dominates it too.
+# The front of a solution is therefore found by a binary search over the fronts.
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline bint _dominates(const double[:, ::1] objective_values, Py_ssize_t i, Py_ssize_t j):
+    """
+    True if solution i dominates solution j (no worse in all objectives and better in at least one)
+    """
+    cdef Py_ssize_t k
+    cdef bint better = False
+    for k in range(objective_values.shape[1]):
+        if objective_values[i, k] > objective_values[j, k]:
+            return False
+        if objective_values[i, k] < objective_values[j, k]:
+            better = True
+    return better
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bint _front_dominates(const double[:, ::1] objective_values, Py_ssize_t[::1] front_last,
+                           Py_ssize_t[::1] previous_member, Py_ssize_t front, Py_ssize_t j):
+    """
+    True if a member of 'front' dominates solution j, members are checked from the last one inserted
+    (closest in lexicographic order)
+    """
+    cdef Py_ssize_t i = front_last[front]
+    while i != -1:
+        if _dominates(objective_values, i, j):
+            return True
+        i = previous_member[i]
+    return False
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _sort_2d(const double[:, ::1] objective_values, const Py_ssize_t[::1] order,
+                         Py_ssize_t[::1] ranks):
+    """
+    sweep for two objectives, every front is represented by its last member which has the smallest
+    second objective of the front
+    """
+    cdef Py_ssize_t n = order.shape[0]
+    cdef Py_ssize_t[::1] front_last = np.empty(n, dtype=np.intp)
+    cdef Py_ssize_t num_fronts = 0, position, i, j, low, high, middle
+    cdef double f1, f2
+
+    for position in range(n):
+        j = order[position]
+        f1 = objective_values[j, 0]
+        f2 = objective_values[j, 1]
+
+        # first front whose last member does not dominate j
+        low = 0
+        high = num_fronts
+        while low < high:
+            middle = (low + high) // 2
+            i = front_last[middle]
+            if objective_values[i, 1] < f2 or (objective_values[i, 1] == f2 and objective_values[i, 0] < f1):
+                low = middle + 1
+            else:
+                high = middle
+
+        ranks[j] = low
+        front_last[low] = j
+        if low == num_fronts:
+            num_fronts += 1
+    return num_fronts
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _sort_kd(const double[:, ::1] objective_values, const Py_ssize_t[::1] order,
+                         Py_ssize_t[::1] ranks):
+    """
+    efficient non-dominated sort with binary search (ENS-BS) for any number of objectives
+    """
+    cdef Py_ssize_t n = order.shape[0]
+    cdef Py_ssize_t[::1] front_last = np.empty(n, dtype=np.intp)
+    cdef Py_ssize_t[::1] previous_member = np.empty(n, dtype=np.intp)
+    cdef Py_ssize_t num_fronts = 0, position, j, low, high, middle
+
+    for position in range(n):
+        j = order[position]
+
+        low = 0
+        high = num_fronts
+        while low < high:
+            middle = (low + high) // 2
+            if _front_dominates(objective_values, front_last, previous_member, middle, j):
+                low = middle + 1
+            else:
+                high = middle
+
+        ranks[j] = low
+        if low == num_fronts:
+            previous_member[j] = -1
+            num_fronts += 1
+        else:
+            previous_member[j] = front_last[low]
+        front_last[low] = j
+    return num_fronts
+
+
+def non_dominated_sort(objective_values):
+    """
+    Pareto rank (index of the non-dominated front, starting at 0) of every solution
+
+    Paramters
+    --------------------------
+    objective_values : 2d array of objective values (one row per solution, minimization)
+
+    Returns
+    ---------------
+    ranks : array of Pareto ranks
+    """
+    objective_values = np.ascontiguousarray(objective_values, dtype=np.float64)
+    cdef Py_ssize_t n = objective_values.shape[0]
+    ranks = np.zeros(n, dtype=np.intp)
+    if n == 0 or objective_values.shape[1] == 0:
+        return ranks
+
+    if objective_values.shape[1] == 1:
+        # single objective: every distinct value is a front
+        return np.unique(objective_values[:, 0], return_inverse=True)[1].astype(np.intp)
+
+    order = np.ascontiguousarray(np.lexsort(objective_values.T[::-1]), dtype=np.intp)
+    if objective_values.shape[1] == 2:
+        _sort_2d(objective_values, order, ranks)
+    else:
+        _sort_kd(objective_values, order, ranks)
+    return ranks
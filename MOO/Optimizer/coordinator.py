@@ -5,27 +5,35 @@ Created on Thu Dec 17 08:45:00 2020
 
 @author: chandan
 """
+import time
+import queue
 import pickle
 import datetime
+import threading
 import multiprocessing as mp
 
+from .data import unregister_data
 from .utility import _run_progress_bar
 from . import benchmark_plotter
 from . import Genetic_alg
 from . import Tabu_Search
-from .solution import SolutionFactory
+from . import NSGA_II
+from .solution import SolutionFactory, BaselineSchedule, EvaluationPool
 from .pareto_front import get_multi_objective_optimal_sol
+from .pareto_archive import ParetoArchive
 
 
 class CoOrdinator:
 
-    def __init__(self, data, objective_params, reschedule=False, preschedule_idle=False):
+    def __init__(self, data, objective_params, reschedule=False, preschedule_idle=False, scheduler_service=None):
         """    
        constructor of CoOrdinator  class
         
         Paramters
         --------------------------
         data : data object contains information of demand, jobs, machines
+        scheduler_service : SchedulerService whose worker processes run the TS agents, the GA islands and the
+                            offspring evaluations (new processes are started for every run if None)
  
     
         Returns
@@ -34,10 +42,17 @@ class CoOrdinator:
         """  
         
         self.data = data
+        if reschedule:
+            # old schedule is read once per rescheduling run and shared through the data object
+            self.data.baseline_schedule = BaselineSchedule.from_hdf(data)
         self.solution = None
         self.ts_agent_list = None
         self.ga_agent = None
         self.sa_agent = None
+        self.evaluation_pool = None
+        self.scheduler_service = scheduler_service
+        self.ts_live_front = None
+        self.ts_stop_event = None
         self.solution_factory = SolutionFactory(data, reschedule=reschedule, preschedule_idle=preschedule_idle)
         self.objective_params = objective_params
         self.reschedule = reschedule
@@ -48,7 +63,8 @@ class CoOrdinator:
     
     def tabu_search_time(self, runtime, num_solutions_per_process=1, num_processes=4, tabu_list_size=50,
                          neighborhood_size=300, neighborhood_wait=0.1, probability_change_machine=0.8,
-                         reset_threshold=100, initial_solutions=None, benchmark=False, verbose=False, progress_bar=False):
+                         reset_threshold=100, initial_solutions=None, benchmark=False, verbose=False, progress_bar=False,
+                         neighborhood="random", deadline=None, cooperative=False):
         """
        Tabu search initiator (time as constraint)
        """
@@ -63,12 +79,14 @@ class CoOrdinator:
                                  neighborhood_size=neighborhood_size, neighborhood_wait=neighborhood_wait,
                                  probability_change_machine=probability_change_machine,
                                  reset_threshold=reset_threshold, initial_solutions=initial_solutions,
-                                 benchmark=benchmark, verbose=verbose, progress_bar=progress_bar)
+                                 benchmark=benchmark, verbose=verbose, progress_bar=progress_bar,
+                                 neighborhood=neighborhood, deadline=deadline, cooperative=cooperative)
 
 
     def tabu_search_iter(self, iterations, num_solutions_per_process=1, num_processes=4, tabu_list_size=50,
                          neighborhood_size=300, neighborhood_wait=0.1, probability_change_machine=0.8,
-                         reset_threshold=100, initial_solutions=None, benchmark=False, verbose=False):
+                         reset_threshold=100, initial_solutions=None, benchmark=False, verbose=False,
+                         neighborhood="random", deadline=None, cooperative=False):
         
         """
        Tabu search initiator (no of iterations as constraint)
@@ -79,11 +97,13 @@ class CoOrdinator:
                                  neighborhood_size=neighborhood_size, neighborhood_wait=neighborhood_wait,
                                  probability_change_machine=probability_change_machine,
                                  reset_threshold=reset_threshold, initial_solutions=initial_solutions,
-                                 benchmark=benchmark, verbose=verbose, progress_bar=False)
+                                 benchmark=benchmark, verbose=verbose, progress_bar=False,
+                                 neighborhood=neighborhood, deadline=deadline, cooperative=cooperative)
 
 
     def _tabu_search(self, stopping_condition, time_condition, num_solutions_per_process, num_processes, tabu_list_size, neighborhood_size, neighborhood_wait, probability_change_machine, reset_threshold,
-                     initial_solutions, benchmark, verbose, progress_bar):
+                     initial_solutions, benchmark, verbose, progress_bar, neighborhood="random", deadline=None,
+                     cooperative=False):
         """    
         Tabu search builder function
         
@@ -98,8 +118,16 @@ class CoOrdinator:
         tabu_list_size :  size of the tabu list 
         neighbourhood_size : size of the neighbourhood
         probability_change_machine : probability of machine change (FJSSP)
-        reset_threshold : reset threshold for the search
+        reset_threshold : iterations without improvement after which an agent of a cooperative search restarts
+                          from the elite pool
         initial_solutions : list of initial solution candidates
+        neighborhood : "random" (random insertion moves) or "critical_path" (moves of critical operations)
+        deadline : seconds after which the tabu search processes are stopped (they return their Pareto memory
+                   after their current iteration), no deadline if None. The search can also be stopped from
+                   another thread with cancel_tabu_search, the solutions found so far are merged into
+                   ts_live_front while the processes run
+        cooperative : flag for a cooperative search, the agents publish their new Pareto optimal solutions
+                      to a shared elite pool and restart from the elites of the other agents when they stagnate
         
         
         Returns
@@ -128,8 +156,10 @@ class CoOrdinator:
                                                      self.ga_agent.result_population,
                                                      self.objective_params,
                                                      self.reschedule,
-                                                     self.preschedule_idle)
-                         for initial_solution in initial_solutions]
+                                                     self.preschedule_idle,
+                                                     neighborhood=neighborhood,
+                                                     agent_index=agent_index)
+                         for agent_index, initial_solution in enumerate(initial_solutions)]
 
         if verbose:
             if benchmark:
@@ -144,8 +174,10 @@ class CoOrdinator:
             print("tabu_list_size =", tabu_list_size)
             print("neighborhood_size =", neighborhood_size)
             print("neighborhood_wait =", neighborhood_wait)
+            print("neighborhood =", neighborhood)
             print("probability_change_machine =", probability_change_machine)
             print("reset_threshold =", reset_threshold)
+            print("cooperative =", cooperative)
             print()
             print("Initial Solution's makespans:")
             print([round(x.makespan) for x in initial_solutions])
@@ -153,33 +185,32 @@ class CoOrdinator:
         '''
         For multi agent
         '''
-        # create tabu instances to run tabu search
-        child_results_queue = mp.Queue()
-        processes = [
-            mp.Process(target=ts_agent.start, args=[child_results_queue])
-            for ts_agent in ts_agent_list
-        ]
-
-        # start execution of tabu instances
-        for p in processes:
-            p.start()
-            if verbose:
-                print(f"child TS process started. pid = {p.pid}")
-
-
         if progress_bar and time_condition:
-            mp.Process(target=_run_progress_bar, args=[stopping_condition]).start()
-
-        # collect results from Queue and wait for all tabu search processes to finish
-        self.ts_agent_list = []
-        for p in processes:
-            self.ts_agent_list.append(pickle.loads(child_results_queue.get()))
-
-            if verbose:
-                print(f"child TS process finished. pid = {p.pid}")
+            threading.Thread(target=_run_progress_bar, args=[stopping_condition], daemon=True).start()
+
+        # live Pareto front of the search, updated with the archive deltas streamed by the processes
+        self.ts_live_front = ParetoArchive(self.objective_params, self.reschedule, solutions=initial_solutions)
+        if deadline is not None:
+            deadline = time.time() + deadline
+        elite_pool = None
+        if cooperative:
+            elite_pool = Tabu_Search.ElitePool(len(ts_agent_list), self.data.total_number_of_operations)
+
+        if self.scheduler_service is not None:
+            self.ts_stop_event = self.scheduler_service.stop_event
+            self.ts_agent_list = self.scheduler_service.run_agents(ts_agent_list, self.data, stream=True,
+                                                                   on_progress=self._merge_ts_progress,
+                                                                   deadline=deadline, elite_pool=elite_pool)
+        else:
+            self.ts_stop_event = mp.Event()
+            self.ts_agent_list = self._run_ts_processes(ts_agent_list, verbose, deadline, elite_pool)
+        self.ts_stop_event = None
+        if elite_pool is not None:
+            elite_pool.close()
  
         # Find overall best solution from all the tabu instances or processes
         memory = [pareto_solution for ts_agent in self.ts_agent_list  for pareto_solution in ts_agent.memory]
+        self.ts_live_front.merge(memory)
         fronts, best_solution = get_multi_objective_optimal_sol(memory, self.objective_params, self.reschedule, visualize=False, rank=1) 
         
         return best_solution
@@ -196,9 +227,90 @@ class CoOrdinator:
 #         return best_solution
 # =============================================================================
 
-    
-    
-    
+
+    def _run_ts_processes(self, ts_agent_list, verbose, deadline=None, elite_pool=None):
+        """
+        Runs every tabu search agent in a new process and returns the agents after their search, the archive
+        deltas of the processes are merged into ts_live_front while waiting for them
+        """
+        # the instance matrices are placed in shared memory once and attached by every tabu search process
+        shared_data = self.data.to_shared_memory()
+
+        # create tabu instances to run tabu search
+        child_results_queue = mp.Queue()
+        progress_queue = mp.Queue()
+        processes = [
+            mp.Process(target=ts_agent.start,
+                       args=[child_results_queue, self.data, progress_queue, self.ts_stop_event, elite_pool])
+            for ts_agent in ts_agent_list
+        ]
+
+        # start execution of tabu instances
+        for p in processes:
+            p.start()
+            if verbose:
+                print(f"child TS process started. pid = {p.pid}")
+
+        try:
+            # collect results from Queue and wait for all tabu search processes to finish
+            ts_agent_list = []
+            while len(ts_agent_list) < len(processes):
+                self._merge_ts_progress(progress_queue)
+                if deadline is not None and time.time() >= deadline:
+                    self.ts_stop_event.set()
+                try:
+                    ts_agent_list.append(pickle.loads(child_results_queue.get(timeout=0.1)))
+                except queue.Empty:
+                    self._check_processes(processes, "TS")
+                    continue
+
+                if verbose:
+                    print(f"child TS process finished. {len(ts_agent_list)}/{len(processes)}")
+
+            # a process ends once its archive deltas are flushed to the queue
+            for p in processes:
+                while p.is_alive():
+                    self._merge_ts_progress(progress_queue)
+                    p.join(0.1)
+            self._merge_ts_progress(progress_queue)
+        finally:
+            if shared_data:
+                self.data.release_shared_memory()
+        return ts_agent_list
+
+
+    def _merge_ts_progress(self, progress_queue):
+        """
+        Merges the archive deltas waiting in progress_queue into the live Pareto front of the tabu search
+        """
+        while True:
+            try:
+                archive_delta = pickle.loads(progress_queue.get_nowait())
+            except queue.Empty:
+                return
+            # deltas of an earlier search on another instance are dropped
+            self.ts_live_front.merge([solution for solution in archive_delta
+                                      if solution.instance_id == self.data.instance_id])
+
+
+    def cancel_tabu_search(self):
+        """
+        Stops the running tabu search processes after their current iteration (to be called from another
+        thread), the tabu search then returns the best solution found so far
+        """
+        if self.ts_stop_event is not None:
+            self.ts_stop_event.set()
+
+
+    def get_ts_live_best_solution(self):
+        """
+        Returns the best solution of the live Pareto front of the tabu search, it can be called from another
+        thread while the search is running
+        """
+        fronts, best_solution = get_multi_objective_optimal_sol(list(self.ts_live_front), self.objective_params,
+                                                                self.reschedule, visualize=False, rank=1)
+        return best_solution
+
 
 
     ############################GENETIC ALG SEARCH#############################################
@@ -207,7 +319,8 @@ class CoOrdinator:
     def genetic_algorithm_time(self, runtime, population=None, population_size=200,
                                selection_method_enum=Genetic_alg.GASelectionEnum.TOURNAMENT,
                                mutation_probability=0.8, selection_size=10, benchmark=False, verbose=False,
-                               progress_bar=False):
+                               progress_bar=False, visualize=False, num_islands=1, migration_interval=5,
+                               migration_size=2, evaluation_processes=0):
         """
         Genetic algorithm (time constraint)
         """
@@ -219,12 +332,15 @@ class CoOrdinator:
                                        population_size=population_size,                 selection_method_enum=selection_method_enum,
                                        mutation_probability=mutation_probability,
                                        selection_size=selection_size, benchmark=benchmark, verbose=verbose,
-                                       progress_bar=progress_bar)
+                                       progress_bar=progress_bar, visualize=visualize, num_islands=num_islands,
+                                       migration_interval=migration_interval, migration_size=migration_size,
+                                       evaluation_processes=evaluation_processes)
 
     def genetic_algorithm_iter(self, iterations, population=None, population_size=200,
                                selection_method_enum=Genetic_alg.GASelectionEnum.TOURNAMENT,
                                mutation_probability=0.8,
-                               selection_size=10, benchmark=False, verbose=False):
+                               selection_size=10, benchmark=False, verbose=False, visualize=False, num_islands=1,
+                               migration_interval=5, migration_size=2, evaluation_processes=0):
         """
         Genetic algorithm (iterations constraint)
         """
@@ -233,12 +349,15 @@ class CoOrdinator:
                                        population_size=population_size, selection_method_enum=selection_method_enum,
                                        mutation_probability=mutation_probability,
                                        selection_size=selection_size, benchmark=benchmark, verbose=verbose,
-                                       progress_bar=False)
+                                       progress_bar=False, visualize=visualize, num_islands=num_islands,
+                                       migration_interval=migration_interval, migration_size=migration_size,
+                                       evaluation_processes=evaluation_processes)
 
 
     def _genetic_algorithm(self, stopping_condition, time_condition, population=None, population_size=200,
                            selection_method_enum=Genetic_alg.GASelectionEnum.TOURNAMENT, mutation_probability=0.8,
-                           selection_size=5, benchmark=False, verbose=False, progress_bar=False):
+                           selection_size=5, benchmark=False, verbose=False, progress_bar=False, visualize=False,
+                           num_islands=1, migration_interval=5, migration_size=2, evaluation_processes=0):
         """
         Genetic Algorithm builder function
         
@@ -252,6 +371,12 @@ class CoOrdinator:
         mutation_probability : probability value for performing mutation on offsprings
         selection_size : parent selection size
         benchmark : flag for plotting benchmark results
+        visualize : flag to plot and store (excel) the final GA population
+        num_islands : number of GA populations evolving in parallel processes (island model)
+        migration_interval : number of generations between two migrations of Pareto optimal solutions
+        migration_size : number of solutions sent to the next island per migration
+        evaluation_processes : number of worker processes evaluating the offspring of a generation (single
+                               island only, 0 evaluates them in the GA process)
 
 
         Returns
@@ -264,16 +389,31 @@ class CoOrdinator:
         else:
             population = population[:] + [self.solution_factory.get_solution() for _ in range(max(0, population_size - len(population)))]
         
-        self.ga_agent = Genetic_alg.GeneticAlgorithmAgent(stopping_condition,
-                                                                population,
-                                                                time_condition,
-                                                                selection_method_enum,
-                                                                mutation_probability,
-                                                                selection_size,
-                                                                benchmark,
-                                                                self.objective_params,
-                                                                self.reschedule,
-                                                                self.preschedule_idle)
+        # every further island starts from its own random population
+        island_populations = [population] + [[self.solution_factory.get_solution() for _ in range(population_size)]
+                                              for _ in range(num_islands - 1)]
+        
+        # the pool is kept by the coordinator and reused by later runs on the same instance
+        evaluation_pool = None
+        if evaluation_processes and num_islands == 1:
+            evaluation_pool = self.get_evaluation_pool(evaluation_processes)
+        
+        island_agents = [Genetic_alg.GeneticAlgorithmAgent(stopping_condition,
+                                                           island_population,
+                                                           time_condition,
+                                                           selection_method_enum,
+                                                           mutation_probability,
+                                                           selection_size,
+                                                           benchmark,
+                                                           self.objective_params,
+                                                           self.reschedule,
+                                                           self.preschedule_idle,
+                                                           visualize and num_islands == 1,
+                                                           migration_interval,
+                                                           migration_size,
+                                                           evaluation_pool)
+                         for island_population in island_populations]
+        self.ga_agent = island_agents[0]
         if verbose:
             if benchmark:
                 print("Running benchmark of GA")
@@ -287,17 +427,206 @@ class CoOrdinator:
             print("mutation_probability =", mutation_probability)
             if selection_method_enum is Genetic_alg.GASelectionEnum.TOURNAMENT:
                 print("selection_size =", selection_size)
+            if evaluation_pool is not None:
+                print("evaluation_processes =", evaluation_processes)
+            if num_islands > 1:
+                print("num_islands =", num_islands)
+                print("migration_interval =", migration_interval)
+                print("migration_size =", migration_size)
 
         if progress_bar and time_condition:
-            mp.Process(target=_run_progress_bar, args=[stopping_condition]).start()
+            threading.Thread(target=_run_progress_bar, args=[stopping_condition], daemon=True).start()
 
         # Genetic algorithm search execution 
+        if num_islands == 1:
+            self.solution = self.ga_agent.start()
+            return self.solution
+        
+        # island model: ring of islands, every island sends its emigrants to the inbox of the next one
+        if self.scheduler_service is not None:
+            island_agents = self.scheduler_service.run_agents(island_agents, self.data, migration=True)
+            return self._merge_islands(island_agents, visualize)
+        
+        inboxes = [mp.Queue() for _ in range(num_islands)]
+        island_results_queue = mp.Queue()
+        processes = [
+            mp.Process(target=ga_agent.start,
+                       args=[island_results_queue, self.data, (inboxes[i], inboxes[(i + 1) % num_islands])])
+            for i, ga_agent in enumerate(island_agents)
+        ]
+        
+        for p in processes:
+            p.start()
+            if verbose:
+                print(f"GA island process started. pid = {p.pid}")
+        
+        island_agents = []
+        while len(island_agents) < len(processes):
+            try:
+                island_agents.append(pickle.loads(island_results_queue.get(timeout=0.1)))
+            except queue.Empty:
+                self._check_processes(processes, "GA island")
+        
+        for p in processes:
+            p.join()
+        return self._merge_islands(island_agents, visualize)
+
+
+    def _check_processes(self, processes, name):
+        """
+        Raises a RuntimeError (after terminating the other processes) if one of the processes died without
+        sending its result
+        """
+        failed = [p for p in processes if p.exitcode not in (None, 0)]
+        if failed:
+            for p in processes:
+                p.terminate()
+            raise RuntimeError(f"{name} process {failed[0].pid} exited with code {failed[0].exitcode}")
+
+
+    def _merge_islands(self, island_agents, visualize):
+        """
+        Sets the results of the GA from the final populations of all islands
+        """
+        # merged archive of the final populations of all islands
+        archive = ParetoArchive(self.objective_params, self.reschedule, max_rank=3)
+        for ga_agent in island_agents:
+            archive.merge(ga_agent.result_population)
+        
+        self.ga_agent = island_agents[0]
+        self.ga_agent.visualize = visualize
+        self.solution = self.ga_agent.set_results(archive.solutions)
+        return self.solution
+
+
+    ############################NSGA-II#############################################
+
+    def nsga_2_time(self, runtime, population=None, population_size=100, mutation_probability=0.8,
+                    probability_change_machine=0.25, benchmark=False, verbose=False, progress_bar=False,
+                    visualize=False, evaluation_processes=0):
+        """
+        NSGA-II (time constraint)
+        """
+        if isinstance(runtime, datetime.timedelta):
+            runtime_seconds = runtime.total_seconds()
+        else:
+            runtime_seconds = runtime
+        return self._nsga_2(runtime_seconds, time_condition=True, population=population,
+                            population_size=population_size, mutation_probability=mutation_probability,
+                            probability_change_machine=probability_change_machine, benchmark=benchmark,
+                            verbose=verbose, progress_bar=progress_bar, visualize=visualize,
+                            evaluation_processes=evaluation_processes)
+
+    def nsga_2_iter(self, iterations, population=None, population_size=100, mutation_probability=0.8,
+                    probability_change_machine=0.25, benchmark=False, verbose=False, visualize=False,
+                    evaluation_processes=0):
+        """
+        NSGA-II (iterations constraint)
+        """
+        return self._nsga_2(iterations, time_condition=False, population=population,
+                            population_size=population_size, mutation_probability=mutation_probability,
+                            probability_change_machine=probability_change_machine, benchmark=benchmark,
+                            verbose=verbose, progress_bar=False, visualize=visualize,
+                            evaluation_processes=evaluation_processes)
+
+
+    def _nsga_2(self, stopping_condition, time_condition, population=None, population_size=100,
+                mutation_probability=0.8, probability_change_machine=0.25, benchmark=False, verbose=False,
+                progress_bar=False, visualize=False, evaluation_processes=0):
+        """
+        NSGA-II builder function, the agent is kept as ga_agent (its results are reported like the GA results)
+        
+        Parameters
+        -------------------------
+        stopping_condition : stopping condition for the search
+        time_condition : flag for time based search
+        population : population of solutions
+        population_size : size of the population
+        mutation_probability : probability value for performing mutation on offsprings
+        probability_change_machine : probability of assigning another machine to a changed operation
+        benchmark : flag for plotting benchmark results
+        visualize : flag to plot and store (excel) the final population
+        evaluation_processes : number of worker processes evaluating the offspring of a generation (0 evaluates
+                               them in this process)
+
+
+        Returns
+        ------------------
+        best solution from NSGA-II search
+        """
+        
+        if population is None:
+            population = [self.solution_factory.get_solution() for _ in range(population_size)]
+        else:
+            population = population[:] + [self.solution_factory.get_solution() for _ in range(max(0, population_size - len(population)))]
+        
+        evaluation_pool = None
+        if evaluation_processes:
+            evaluation_pool = self.get_evaluation_pool(evaluation_processes)
+        
+        self.ga_agent = NSGA_II.NSGAIIAgent(stopping_condition,
+                                            population,
+                                            time_condition,
+                                            mutation_probability,
+                                            probability_change_machine,
+                                            benchmark,
+                                            self.objective_params,
+                                            self.reschedule,
+                                            self.preschedule_idle,
+                                            visualize,
+                                            evaluation_pool)
+        if verbose:
+            if benchmark:
+                print("Running benchmark of NSGA-II")
+            else:
+                print("Running NSGA-II")
+            print("Parameters:")
+            print(f"stopping_condition = {stopping_condition} {'seconds' if time_condition else 'iterations'}")
+            print("time_condition =", time_condition)
+            print("population_size =", population_size)
+            print("mutation_probability =", mutation_probability)
+            print("probability_change_machine =", probability_change_machine)
+            if evaluation_pool is not None:
+                print("evaluation_processes =", evaluation_processes)
+
+        if progress_bar and time_condition:
+            threading.Thread(target=_run_progress_bar, args=[stopping_condition], daemon=True).start()
+
         self.solution = self.ga_agent.start()
         return self.solution
 
 
     ############################ Utility functions #############################################
 
+    def get_evaluation_pool(self, num_processes):
+        """
+        Returns the persistent evaluation pool of the instance, a new pool is started when there is no pool
+        or when the number of processes changed (the workers of the scheduler service are used if there is one)
+        """
+        if self.scheduler_service is not None:
+            return self.scheduler_service.get_evaluation_pool(self.data)
+        if self.evaluation_pool is not None and self.evaluation_pool.num_processes != num_processes:
+            self.close_evaluation_pool()
+        if self.evaluation_pool is None:
+            self.evaluation_pool = EvaluationPool(self.data, num_processes)
+        return self.evaluation_pool
+
+    def close_evaluation_pool(self):
+        """
+        Stops the worker processes of the evaluation pool
+        """
+        if self.evaluation_pool is not None:
+            self.evaluation_pool.close()
+            self.evaluation_pool = None
+
+    def close(self):
+        """
+        Stops the evaluation pool and removes the data of the instance from the registry of this process once
+        the runs of the coordinator are done (the solutions found keep their data)
+        """
+        self.close_evaluation_pool()
+        unregister_data(self.data.instance_id)
+
     def iplot_benchmark_results(self):
         self._check_agents()
         benchmark_plotter.iplot_benchmark_results(ts_agent_list=self.ts_agent_list, 
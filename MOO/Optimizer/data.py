@@ -7,13 +7,59 @@ Created on Wed Dec 16 17:56:30 2020
 """
 
 import re
+import uuid
+import numpy as np
 from abc import ABC
 from pathlib import Path
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8, the matrices are pickled with the data object
+    shared_memory = None
+
+
+# per process registry of instance data, solutions only keep the instance id of their data
+_data_registry = {}
+
+# matrices of the instance data which can be placed in shared memory (see Data.to_shared_memory)
+SHARED_MATRICES = ('sequence_dependency_matrix', 'job_operation_index_matrix', 'required_machine_matrix',
+                   'operation_processing_times_matrix', 'machine_speed_matrix', 'machine_setup_time_matrix',
+                   'machine_threshold_list', 'machine_avg_process_list', 'machine_repair_duration_list')
+
+
+def register_data(data):
+    """
+    Registers the data object in the registry of the current process
+    """
+    _data_registry.setdefault(data.instance_id, data)
+    return _data_registry[data.instance_id]
+
+
+def unregister_data(instance_id):
+    """
+    Removes the data object with id 'instance_id' from the registry of the current process. Called when an
+    instance is released, solutions which were already bound to the data object keep it.
+    """
+    _data_registry.pop(instance_id, None)
+
+
+def get_registered_data(instance_id):
+    """
+    Returns the data object with id 'instance_id' from the registry of the current process
+    """
+    try:
+        return _data_registry[instance_id]
+    except KeyError:
+        raise KeyError(f"Instance data {instance_id} is not registered in this process") from None
+
 
 class Data(ABC):    
     
     def __init__(self):
+        self.instance_id = uuid.uuid4().hex
+        register_data(self)
+        
         self.sequence_dependency_matrix = None
         self.job_operation_index_matrix = None
         self.required_machine_matrix = None
@@ -29,6 +75,115 @@ class Data(ABC):
         
         self.max_operations_for_a_job = 0
         
+        # index arrays derived from job_operation_index_matrix, built on first use
+        self._job_precedence_pairs = None
+        self._job_last_operation_indices = None
+        self._job_due_dates = None
+        
+        # schedule in execution when rescheduling (see solution.baseline)
+        self.baseline_schedule = None
+        
+        # shared memory blocks of the matrices in shared memory, by attribute name
+        self._shared_memory = {}
+        
+    
+    def __getstate__(self):
+        # matrices in shared memory are attached by the receiving process instead of being copied
+        state = self.__dict__.copy()
+        state['_shared_memory'] = {}
+        for name, block in self._shared_memory.items():
+            matrix = state.pop(name)
+            state['_shared_memory'][name] = (block.name, matrix.shape, matrix.dtype.str)
+        return state
+    
+    
+    def __setstate__(self, state):
+        # data received from another process becomes available to the solutions of this process
+        shared_matrices = state.pop('_shared_memory', {})
+        self.__dict__.update(state)
+        self._shared_memory = {}
+        for name, (block_name, shape, dtype) in shared_matrices.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            self._shared_memory[name] = block
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+        register_data(self)
+    
+    
+    def to_shared_memory(self):
+        """
+        Places the matrices of the instance (see SHARED_MATRICES) in shared memory. Processes which receive
+        this data object afterwards attach the matrices instead of getting a copy of them, so the data sent
+        to a worker process does not grow with the size of the instance.
+        Returns True if the matrices were placed by this call, False if they already were in shared memory
+        (only the caller which placed them should release them, see release_shared_memory) or if shared memory
+        is not available (Python < 3.8)
+        """
+        if self._shared_memory or shared_memory is None:
+            return False
+        
+        for name in SHARED_MATRICES:
+            matrix = getattr(self, name, None)
+            if not isinstance(matrix, np.ndarray) or matrix.nbytes == 0:
+                continue
+            block = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+            shared_matrix = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=block.buf)
+            shared_matrix[...] = matrix
+            self._shared_memory[name] = block
+            setattr(self, name, shared_matrix)
+        return True
+    
+    
+    def release_shared_memory(self):
+        """
+        Moves the matrices back to the memory of this process and frees the shared memory blocks, worker
+        processes must not receive or use this data object anymore afterwards
+        """
+        shared_memory_blocks, self._shared_memory = self._shared_memory, {}
+        for name, block in shared_memory_blocks.items():
+            setattr(self, name, np.array(getattr(self, name)))
+            try:
+                block.close()
+            except BufferError:
+                # a view of the shared matrix is still referenced, only the name of the block is removed
+                pass
+            block.unlink()
+    
+    
+    def get_job_precedence_pairs(self):
+        """
+        Returns two arrays (predecessor, successor) of operation indices, one entry for each pair of
+        consecutive operations (operation_id j, j + 1) of every job
+        """
+        if self._job_precedence_pairs is None:
+            predecessors = []
+            successors = []
+            for job_index in self.job_operation_index_matrix:
+                operation_indices = job_index[job_index != -1]
+                predecessors.extend(operation_indices[:-1])
+                successors.extend(operation_indices[1:])
+            self._job_precedence_pairs = (np.array(predecessors, dtype=np.intp), np.array(successors, dtype=np.intp))
+        return self._job_precedence_pairs
+    
+    
+    def get_job_last_operation_indices(self):
+        """
+        Returns the operation index of the last operation of every job
+        """
+        if self._job_last_operation_indices is None:
+            self._job_last_operation_indices = np.array([job_index[job_index != -1][-1] for job_index in self.job_operation_index_matrix],
+                                                        dtype=np.intp)
+        return self._job_last_operation_indices
+    
+    
+    def get_job_due_dates(self):
+        """
+        Returns the due date of every job in minutes, i.e. the sum of the shortest process time of its operations
+        """
+        if self._job_due_dates is None:
+            processing_times = np.where(self.operation_processing_times_matrix >= 0, self.operation_processing_times_matrix, np.inf).min(axis=1)
+            self._job_due_dates = np.array([processing_times[job_index[job_index != -1]].sum() for job_index in self.job_operation_index_matrix])
+        return self._job_due_dates
+    
     
     def get_setup_time(self, job1_id, job1_operation_id, job2_id, job2_operation_id):
         
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Feb 20 18:59:06 2021
+
+@author: chandan
+"""
+import numpy as np
+import pandas as pd
+
+from ._non_dominated_sort import non_dominated_sort
+from .solution.solution import OBJECTIVES
+
+
+class ParetoArchive:
+
+    def __init__(self, objective_params, reschedule, max_rank=0, solutions=None):
+        """
+        Constructor of ParetoArchive class, memory of the solutions whose Pareto rank is at most max_rank.
+        Objective values are kept in a numpy array next to the solution objects so that a new solution is
+        checked against the archive in one vectorized pass instead of ranking a dataframe of all solutions.
+
+        Paramters
+        --------------------------
+        objective_params : objective functions with weights
+        reschedule : reschedule flag (stability is only an objective when rescheduling)
+        max_rank : highest Pareto rank kept in the archive (0 keeps only the Pareto front)
+        solutions : initial solutions of the archive
+
+        Returns
+        ---------------
+        None
+        """
+
+        objective_list = list(objective_params.keys())
+        if not reschedule:
+            objective_list = objective_list[:-1]
+
+        self.objective_list = objective_list
+        self.objective_indices = np.array([OBJECTIVES.index(objective) for objective in objective_list], dtype=np.intp)
+        self.max_rank = max_rank
+
+        self.size = 0
+        self.solutions = []
+        self.fingerprints = set()
+        self._objective_values = np.empty((16, len(objective_list)))
+        self._ranks = np.empty(16, dtype=np.intp)
+
+        if solutions is not None:
+            self.merge(solutions)
+
+
+    @property
+    def objective_values(self):
+        return self._objective_values[:self.size]
+
+    @property
+    def ranks(self):
+        return self._ranks[:self.size]
+
+
+    def insert(self, solution):
+        """
+        function to insert a solution if its Pareto rank within the archive is at most max_rank, solutions
+        whose rank rises above max_rank because of the new solution are evicted
+
+        Paramters
+        --------------------------
+        solution : solution object
+
+        Returns
+        ---------------
+        flag : whether the solution was inserted or not
+        """
+
+        if solution.fingerprint in self.fingerprints:
+            return False
+
+        values = solution.objectives[self.objective_indices]
+        objective_values = self.objective_values
+
+        # rank of the new solution is one more than the highest rank of the solutions dominating it
+        dominators = np.all(objective_values <= values, axis=1) & np.any(objective_values < values, axis=1)
+        rank = self.ranks[dominators].max() + 1 if dominators.any() else 0
+        if rank > self.max_rank:
+            return False
+
+        dominated = np.all(values <= objective_values, axis=1) & np.any(values < objective_values, axis=1)
+        self._append(solution, values, rank)
+
+        # only the solutions behind the new one can change their rank
+        if dominated.any():
+            self._ranks[:self.size] = non_dominated_sort(self.objective_values)
+            self._keep(self.ranks <= self.max_rank)
+        return True
+
+
+    def merge(self, solutions):
+        """
+        function to merge many solutions into the archive with a single Pareto ranking
+
+        Paramters
+        --------------------------
+        solutions : iterable of solution objects
+
+        Returns
+        ---------------
+        num_inserted : number of solutions of 'solutions' which are kept in the archive
+        """
+
+        new_solutions = []
+        for solution in solutions:
+            if solution.fingerprint not in self.fingerprints:
+                self.fingerprints.add(solution.fingerprint)
+                new_solutions.append(solution)
+
+        if not new_solutions:
+            return 0
+
+        num_old = self.size
+        for solution in new_solutions:
+            self._append(solution, solution.objectives[self.objective_indices], 0)
+
+        self._ranks[:self.size] = non_dominated_sort(self.objective_values)
+        keep = self.ranks <= self.max_rank
+        self._keep(keep)
+        return int(np.count_nonzero(keep[num_old:]))
+
+
+    def get_front(self, rank=0):
+        """
+        Returns the solutions of the archive with Pareto rank 'rank'
+        """
+        return [self.solutions[i] for i in np.flatnonzero(self.ranks == rank)]
+
+
+    def to_dataframe(self):
+        """
+        Returns the archive as a solution dataframe with 'rank' column (see get_multi_objective_optimal_sol)
+        """
+        archive_df = pd.DataFrame([solution.as_dict() for solution in self.solutions])
+        archive_df['rank'] = self.ranks
+        return archive_df
+
+
+    def _append(self, solution, values, rank):
+        if self.size == self._ranks.shape[0]:
+            self._objective_values = np.concatenate([self._objective_values, np.empty_like(self._objective_values)])
+            self._ranks = np.concatenate([self._ranks, np.empty_like(self._ranks)])
+
+        self._objective_values[self.size] = values
+        self._ranks[self.size] = rank
+        self.solutions.append(solution)
+        self.fingerprints.add(solution.fingerprint)
+        self.size += 1
+
+
+    def _keep(self, mask):
+        if mask.all():
+            return
+
+        for i in np.flatnonzero(~mask):
+            self.fingerprints.discard(self.solutions[i].fingerprint)
+
+        kept = np.flatnonzero(mask)
+        self.solutions = [self.solutions[i] for i in kept]
+        self._objective_values[:len(kept)] = self._objective_values[kept]
+        self._ranks[:len(kept)] = self._ranks[kept]
+        self.size = len(kept)
+
+
+    def __contains__(self, solution):
+        return solution.fingerprint in self.fingerprints
+
+    def __iter__(self):
+        return iter(self.solutions)
+
+    def __len__(self):
+        return self.size
@@ -9,7 +9,8 @@ import random
 import string
 import numpy as np
 import pandas as pd
-from pymoo.factory import get_visualization, get_decision_making, get_decomposition
+from ._non_dominated_sort import non_dominated_sort
+from .solution.solution import OBJECTIVES
 
 def get_random_string(length):
     """
@@ -22,7 +23,7 @@ def get_random_string(length):
 
 def calc_fronts_with_rank(M):
     """
-    function to evaluate Pareto rankings 
+    function to evaluate Pareto rankings (see _non_dominated_sort, no n x n dominance matrix is built)
     
     Paramerters
     -----------------------------
@@ -33,16 +34,7 @@ def calc_fronts_with_rank(M):
     fronts : All solutions array with ranking
     """    
     
-    i_dominates_j = np.all(M[:,None] <= M, axis=-1) & np.any(M[:,None] < M, axis=-1)
-    remaining = np.arange(len(M))
-    fronts = np.empty(len(M), int)
-    frontier_index = 0
-    while remaining.size > 0:
-        dominated = np.any(i_dominates_j[remaining[:,None], remaining], axis=0)
-        fronts[remaining[~dominated]] = frontier_index
-        remaining = remaining[dominated]
-        frontier_index += 1
-    return fronts
+    return non_dominated_sort(M)
 
 ## only for 2 objective values at the time
 def visualize_sol(pareto_front_sol, objective_list, alg_type, rank=0, reschedule=None): 
@@ -64,6 +56,9 @@ def visualize_sol(pareto_front_sol, objective_list, alg_type, rank=0, reschedule
     fronts = pareto_front_sol.loc[pareto_front_sol['rank'] == 0]
 
     pareto = fronts[objective_list].to_numpy()
+    
+    # pymoo is only needed for the plots
+    from pymoo.factory import get_visualization
     plot = get_visualization("scatter")
     plot.add(sol_space, color="green", marker="x")
     plot.add(pareto, color="red", marker="*")
@@ -90,6 +85,82 @@ def normalize_objective_values(fronts, objective_list):
 
 
 
+def get_pseudo_weights(F):
+    """
+    function to evaluate the pseudo weights of the solutions of a Pareto front, i.e. the normalized
+    distance of every objective value to the worst value of the front (same as pymoo's PseudoWeights)
+    
+    Parameters
+    ------------------------
+    F : 2d array of objective values of the Pareto front
+    
+    Returns
+    ------------------------
+    pseudo_weights : 2d array of pseudo weights, every row sums up to one
+    """
+    
+    ideal = F.min(axis=0)
+    nadir = F.max(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pseudo_weights = (nadir - F) / (nadir - ideal)
+        return pseudo_weights / np.sum(pseudo_weights, axis=1)[:, None]
+
+
+def get_asf_values(F, weights, utopian_point=None, eps=1e-10):
+    """
+    function to evaluate the achievement scalarization function (ASF) of the solutions of a Pareto front
+    (same as pymoo's ASF decomposition)
+    
+    Parameters
+    ------------------------
+    F : 2d array of objective values of the Pareto front
+    weights: weights for objective functions
+    utopian_point : reference point (origin when not given, all objectives are costs)
+    eps : replaces weights of zero
+    
+    Returns
+    ------------------------
+    asf_values : ASF value of every solution (lower is better)
+    """
+    
+    weights = np.array(weights, dtype=float)
+    weights[weights == 0] = eps
+    if utopian_point is None:
+        utopian_point = np.zeros(F.shape[1])
+    return np.max((F - utopian_point) / weights, axis=1)
+
+
+def get_best_solution_index(F, weights, decision_making_method="pseudo-weights"):
+    """
+    function to find out the index of the best solution from the objective values of a Pareto front
+    
+    Parameters
+    ------------------------
+    F : 2d array of objective values of the Pareto front
+    weights: weights for objective functions
+    decision_making_method : decision making method ("pseudo-weights" or "asf")
+    
+    Returns
+    ------------------------
+    best_sol_index : row of F of the best solution (0 for an empty front)
+    """
+    
+    F = np.asarray(F, dtype=float)
+    if len(F) == 0:
+        return 0
+    
+    weights = np.array(weights, dtype=float)
+    if decision_making_method == "pseudo-weights":
+        # solution whose pseudo weights are closest to the weights
+        pseudo_weights = get_pseudo_weights(F)
+        best_sol_index = np.argmin(np.sum(np.abs(pseudo_weights - weights), axis=1))
+    else:
+        ################ compromise programming #########################
+        ################### Achievement Scalarization Function ################################
+        best_sol_index = np.argmin(get_asf_values(F, weights))
+    return int(best_sol_index)
+
+
 def get_best_solution(fronts, objective_list, weights, decision_making_method="pseudo-weights"):
     """
     function to find out best solution from Pareto front
@@ -106,22 +177,175 @@ def get_best_solution(fronts, objective_list, weights, decision_making_method="p
     best_solution
     """
     
-    weights = np.array(weights)
-    pareto_fronts_top = fronts[objective_list]
-    F = pareto_fronts_top.to_numpy()
-    try:
-        if decision_making_method == "pseudo-weights":
-            best_sol_index, pseudo_weights = get_decision_making("pseudo-weights", weights).do(F, return_pseudo_weights=True)
-        else:
-            ################ compromise programming #########################
-            ################### Achievement Scalarization Function ################################
-            best_sol_index = get_decomposition("asf").do(F, weights).min()
-            
-        best_solution = fronts.loc[fronts.index==best_sol_index]
-    except Exception as e:
-        #print(str(e))
-        best_solution = fronts.loc[fronts.index==0]
-    return best_solution
+    F = fronts[objective_list].to_numpy()
+    best_sol_index = get_best_solution_index(F, weights, decision_making_method)
+    return fronts.loc[fronts.index==best_sol_index]
+
+
+def get_objective_list(objective_params, reschedule):
+    """
+    helper function to get the objective functions and their weights (stability is only an objective
+    when rescheduling)
+    """
+    objective_list = list(objective_params.keys())
+    weights = list(objective_params.values())
+    
+    if not reschedule:
+        objective_list = objective_list[:-1]
+        weights = weights[:-1]
+    return objective_list, weights
+
+
+def get_crowding_distances(F, ranks):
+    """
+    function to evaluate the crowding distance of every solution within its Pareto front (NSGA-II), all
+    fronts are handled together: per objective the solutions are sorted by rank and objective value
+
+    Parameters
+    ------------------------
+    F : 2d array of objective values
+    ranks : Pareto ranks of the solutions
+
+    Returns
+    ------------------------
+    crowding_distances : crowding distance of every solution (infinite for the boundaries of a front)
+    """
+
+    F = np.asarray(F, dtype=float)
+    ranks = np.asarray(ranks)
+    n = len(F)
+    crowding_distances = np.zeros(n)
+    if n == 0:
+        return crowding_distances
+
+    positions = np.arange(n)
+    for k in range(F.shape[1]):
+        order = np.lexsort((F[:, k], ranks))
+        values = F[order, k]
+        sorted_ranks = ranks[order]
+
+        # first and last position of the front of every position
+        front_change = sorted_ranks[1:] != sorted_ranks[:-1]
+        first = np.maximum.accumulate(np.where(np.r_[True, front_change], positions, 0))
+        last = np.minimum.accumulate(np.where(np.r_[front_change, True], positions, n)[::-1])[::-1]
+
+        span = values[last] - values[first]
+        gaps = np.zeros(n)
+        interior = (positions != first) & (positions != last)
+        gaps[interior] = values[positions[interior] + 1] - values[positions[interior] - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distances = np.where(span > 0, gaps / span, 0.0)
+        distances[~interior] = np.inf
+        crowding_distances[order] += distances
+    return crowding_distances
+
+
+class Population:
+
+    def __init__(self, solutions, objective_params, reschedule, ranks=None):
+        """
+        Constructor of Population class, numeric view of a list of solutions for the optimizer core:
+        objective matrix and Pareto ranks next to the solution objects (dataframes are only built for
+        reporting, see to_dataframe)
+        
+        Parameters
+        ---------------------------
+        solutions : list of solutions
+        objective_params : objective functions with weights
+        reschedule : reschedule flag
+        ranks : Pareto ranks of the solutions (evaluated when not given)
+        
+        Returns
+        ---------------------------
+        None
+        """
+        
+        self.objective_params = objective_params
+        self.reschedule = reschedule
+        self.objective_list, self.weights = get_objective_list(objective_params, reschedule)
+        
+        objective_indices = [OBJECTIVES.index(objective) for objective in self.objective_list]
+        self.solutions = list(solutions)
+        self.objective_values = np.array([solution.objectives[objective_indices] for solution in self.solutions],
+                                         dtype=float).reshape(len(self.solutions), len(objective_indices))
+        self.ranks = calc_fronts_with_rank(self.objective_values) if ranks is None else ranks
+        
+        # fronts and best solution are evaluated once per population
+        self._fronts = {}
+        self._best_index = {}
+    
+    
+    def get_fronts(self, rank=0, non_negative=True):
+        """
+        function to get the Pareto fronts up to 'rank' (front 0 first) of the solutions with non negative
+        objective values
+        
+        Parameters
+        ---------------------------
+        rank : highest Pareto rank
+        non_negative : flag to drop the solutions with negative objective values
+        
+        Returns
+        ---------------------------
+        fronts : population of the solutions of the fronts, ranks are kept from this population
+        """
+        
+        key = (rank, non_negative)
+        if key not in self._fronts:
+            indices = np.flatnonzero(self.ranks <= rank)
+            if non_negative:
+                indices = indices[np.all(self.objective_values[indices] >= 0, axis=1)]
+            indices = indices[np.argsort(self.ranks[indices], kind='stable')]
+            self._fronts[key] = Population([self.solutions[i] for i in indices], self.objective_params,
+                                           self.reschedule, ranks=self.ranks[indices])
+        return self._fronts[key]
+    
+    
+    def get_front(self, rank=0):
+        """
+        Returns the solutions with Pareto rank 'rank'
+        """
+        return [self.solutions[i] for i in np.flatnonzero(self.ranks == rank)]
+    
+    
+    def get_best_index(self, decision_making_method="pseudo-weights"):
+        """
+        Returns the index of the best solution of the population (see get_best_solution_index)
+        """
+        if decision_making_method not in self._best_index:
+            self._best_index[decision_making_method] = get_best_solution_index(self.objective_values, self.weights,
+                                                                               decision_making_method)
+        return self._best_index[decision_making_method]
+    
+    
+    def get_best_solution(self, decision_making_method="pseudo-weights"):
+        """
+        Returns the best solution of the population, None for an empty population
+        """
+        if not self.solutions:
+            return None
+        return self.solutions[self.get_best_index(decision_making_method)]
+    
+    
+    def visualize(self, alg_type, rank=0):
+        """
+        function to plot the solutions with non negative objective values (see visualize_sol)
+        """
+        solutions = self.get_fronts(rank=self.ranks.max(initial=0))
+        visualize_sol(solutions.to_dataframe(), self.objective_list, alg_type, rank, self.reschedule)
+    
+    
+    def to_dataframe(self):
+        """
+        Returns the population as a solution dataframe with 'rank' column (reporting)
+        """
+        population_df = pd.DataFrame([solution.as_dict() for solution in self.solutions])
+        population_df['rank'] = self.ranks
+        return population_df
+    
+    
+    def __len__(self):
+        return len(self.solutions)
 
 
 
@@ -146,17 +370,8 @@ def dominates_2(new_solution, best_solution, objective_params, reschedule):
     """
     function to find if a new solution dominates best solution
     """
-    objective_list = list(objective_params.keys())
-    if not reschedule:
-        objective_list = objective_list[:-1]
-    
-    new_solution_df = pd.DataFrame([new_solution.as_dict()])
-    best_solution_df =  pd.DataFrame([best_solution.as_dict()])
-    df = pd.concat([new_solution_df, best_solution_df])
-    objective_values = df[objective_list].to_numpy()
-
-    fronts = pd.DataFrame(calc_fronts_with_rank(objective_values))
-    return (fronts.iloc[0][0] < fronts.iloc[0][0]) # if new solution dominates current best
+    ranks = Population([new_solution, best_solution], objective_params, reschedule).ranks
+    return (ranks[0] < ranks[1]) # if new solution dominates current best
     
     
     
@@ -178,29 +393,13 @@ def get_multi_objective_optimal_sol(population, objective_params, reschedule, al
     best_solution
     """
     
-    objective_list = list(objective_params.keys())
-    weights = list(objective_params.values())
-    
-    if not reschedule:
-        objective_list = objective_list[:-1]
-        weights = weights[:-1]
-    
-    population_df = pd.DataFrame([x.as_dict() for x in population])
-    objective_values = population_df[objective_list].to_numpy()
-    pareto_fronts = pd.DataFrame(calc_fronts_with_rank(objective_values))
-    pareto_fronts = pareto_fronts.rename(columns={0: 'rank'})
-    pareto_front_sol = pd.concat([population_df, pareto_fronts], axis=1)
-    
-    for column in objective_list:
-        pareto_front_sol = pareto_front_sol.loc[pareto_front_sol[column] >= 0]
+    population = Population(population, objective_params, reschedule)
     
     if visualize:
-        visualize_sol(pareto_front_sol, objective_list, alg_type, rank, reschedule)
-    fronts = pareto_front_sol.loc[pareto_front_sol['rank'] == 0]
+        population.visualize(alg_type, rank)
     
-    for i in range(1, rank+1):
-        fronts = pd.concat([fronts, pareto_front_sol.loc[pareto_front_sol['rank'] == i]])
-
-    fronts.reset_index(drop=True, inplace=True)
-    best_solution = get_best_solution(fronts, objective_list, weights)
-    return fronts, best_solution
\ No newline at end of file
+    fronts = population.get_fronts(rank)
+    best_sol_index = fronts.get_best_index()
+    fronts = fronts.to_dataframe()
+    best_solution = fronts.loc[fronts.index==best_sol_index]
+    return fronts, best_solution
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Long-lived worker processes shared by the optimizers (GA islands, TS agents, offspring evaluation) and by
+the reschedules of a simulation run
+"""
+import time
+import queue
+import atexit
+import pickle
+import itertools
+import traceback
+import multiprocessing as mp
+from collections import OrderedDict
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    # Python < 3.8, no shared memory (see Data.to_shared_memory)
+    resource_tracker = None
+
+from .data import register_data, unregister_data
+from .solution.evaluation import _evaluate
+
+
+# migration queues, progress queue and stop event of the worker processes, set when a worker starts (queues
+# and events are inherited by the workers)
+_channels = None
+_progress = None
+_stop_event = None
+
+# process wide scheduler service, see get_scheduler_service
+_scheduler_service = None
+
+
+def get_scheduler_service():
+    """
+    Returns the scheduler service of this process, it is created on the first call and its worker processes
+    are started on the first task, so every later schedule or reschedule reuses warm workers
+    """
+    global _scheduler_service
+    if _scheduler_service is None:
+        _scheduler_service = SchedulerService()
+        atexit.register(_scheduler_service.close)
+    return _scheduler_service
+
+
+class _AgentResult:
+    """
+    stands in for the multi process queue of an agent, the agent puts itself into it at the end of its search
+    """
+    def __init__(self):
+        self.agent = None
+
+    def put(self, agent):
+        self.agent = agent
+
+
+def _start_agent(agent, channel_indices=None, stream=False, elite_pool=None):
+    """
+    worker function, runs the search of a GA, NSGA-II or TS agent and returns the pickled agent (a TS agent
+    streams its archive deltas to the progress queue and stops on the stop event of the service if stream)
+    """
+    result = _AgentResult()
+    if stream:
+        agent.start(result, result_channel=_progress, stop_event=_stop_event, elite_pool=elite_pool)
+        if elite_pool is not None:
+            elite_pool.close()
+    elif channel_indices is None:
+        agent.start(result)
+    else:
+        agent.start(result, migration_channel=tuple(_channels[i] for i in channel_indices))
+    return result.agent
+
+
+def _evaluate_batch(instance_id, operation_2d_arrays, reschedule, preschedule_idle):
+    """
+    worker function, decodes and costs a batch of chromosomes of the instance registered in the worker
+    """
+    return [_evaluate((instance_id, operation_2d_array, reschedule, preschedule_idle))
+            for operation_2d_array in operation_2d_arrays]
+
+
+def _run_worker(tasks, results, registrations, channels, progress, stop_event, max_instances):
+    """
+    main loop of a worker process. The pickled data of every instance used by the service is put once into
+    the registration queue of every worker, a worker unpickles and registers it when it gets the first task
+    of the registration and keeps the data of the last max_instances registrations (the service keeps the
+    same ones). Registrations the worker got no task for are skipped without unpickling them, the service may
+    already have released their shared memory.
+    """
+    global _channels, _progress, _stop_event
+    _channels = channels
+    _progress = progress
+    _stop_event = stop_event
+    registered = OrderedDict() # registration id -> instance id of the data registered in this worker
+    payloads = OrderedDict()   # registration id -> pickled data read from the registration queue
+
+    for task_id, registration_id, function, args in iter(tasks.get, None):
+        try:
+            while registration_id not in registered and registration_id not in payloads:
+                read_id, data_payload = registrations.get()
+                payloads[read_id] = data_payload
+                while len(payloads) > max_instances:
+                    payloads.popitem(last=False)
+            if registration_id not in registered:
+                data = pickle.loads(payloads.pop(registration_id))
+                # a new registration of an instance replaces the data of its previous registration
+                for previous_id in [i for i, instance_id in registered.items() if instance_id == data.instance_id]:
+                    del registered[previous_id]
+                unregister_data(data.instance_id)
+                register_data(data)
+                registered[registration_id] = data.instance_id
+                while len(registered) > max_instances:
+                    unregister_data(registered.popitem(last=False)[1])
+            results.put((task_id, True, function(*args)))
+        except Exception:
+            results.put((task_id, False, traceback.format_exc()))
+
+
+class SchedulerService:
+
+    def __init__(self, num_workers=None, max_instances=2):
+        """
+        Constructor of SchedulerService class, pool of worker processes which stay alive between the
+        optimization runs. Workers keep their imports and the data of the last max_instances instances,
+        the matrices of an instance are placed in shared memory once (see Data.to_shared_memory), its data
+        object is sent once to every worker (tasks only carry the registration id of the instance) and the
+        migration queues of the GA islands, the progress queue and the stop event of the streamed runs are
+        created once with the workers and reused by every run. The worker processes are started on the first
+        task.
+
+        Paramters
+        --------------------------
+        num_workers : number of worker processes (number of cpus if None)
+        max_instances : number of instances whose data is kept by the service and the workers
+
+        Returns
+        ---------------
+        None
+        """
+
+        self.num_workers = num_workers or mp.cpu_count()
+        self.max_instances = max_instances
+        self.workers = []
+        self.tasks = None
+        self.results = None
+        self.registrations = None
+        self.channels = None
+        self.progress = None
+        self.stop_event = None
+        self._task_ids = itertools.count()
+        self._registration_ids = itertools.count()
+        self._instances = OrderedDict() # instance id -> (data, flag shared by the service, registration id)
+
+
+    def start(self):
+        """
+        function to start the worker processes (done by the first task if it was not called before)
+        """
+        if self.workers:
+            return
+        # workers share the resource tracker of this process, so shared memory is only freed by its owner
+        if resource_tracker is not None:
+            resource_tracker.ensure_running()
+        self.tasks = mp.Queue()
+        self.results = mp.Queue()
+        self.registrations = [mp.Queue() for _ in range(self.num_workers)]
+        self.channels = [mp.Queue() for _ in range(self.num_workers)]
+        self.progress = mp.Queue()
+        self.stop_event = mp.Event()
+        self.workers = [mp.Process(target=_run_worker,
+                                   args=(self.tasks, self.results, registrations, self.channels, self.progress,
+                                         self.stop_event, self.max_instances),
+                                   daemon=True)
+                        for registrations in self.registrations]
+        for worker in self.workers:
+            worker.start()
+
+
+    def run_agents(self, agents, data, migration=False, stream=False, on_progress=None, deadline=None,
+                   elite_pool=None):
+        """
+        function to run the searches of agents in the worker processes, the agents run concurrently when there
+        are enough workers
+
+        Paramters
+        --------------------------
+        agents : list of GA, NSGA-II or TS agents
+        data : data object of the instance
+        migration : flag to connect the agents in a ring of migration queues (GA island model)
+        stream : flag to let TS agents stream their archive deltas and stop on the stop event of the service
+        on_progress : function called with the progress queue while waiting for the agents (see map)
+        deadline : time (time.time()) at which the stop event is set, see map
+        elite_pool : ElitePool of a cooperative tabu search (streamed TS agents only)
+
+        Returns
+        ---------------
+        agents : list of agents after their search (same order as agents)
+        """
+
+        if migration and len(agents) > self.num_workers:
+            raise ValueError(f"{len(agents)} islands need at least as many workers, the service has {self.num_workers}")
+
+        self.start()
+        if migration:
+            self._clear_channels(len(agents))
+            args = [(agent, (i, (i + 1) % len(agents))) for i, agent in enumerate(agents)]
+        else:
+            args = [(agent, None, stream, elite_pool) for agent in agents]
+        return [pickle.loads(agent) for agent in self.map(_start_agent, args, data, on_progress, deadline)]
+
+
+    def map(self, function, args, data, on_progress=None, deadline=None):
+        """
+        function to run function(*arguments) in the worker processes for every arguments of args
+
+        Paramters
+        --------------------------
+        function : worker function (must be importable by the workers)
+        args : list of argument tuples
+        data : data object of the instance used by the tasks
+        on_progress : function called with the progress queue of the service while waiting for the results
+        deadline : time (time.time()) at which the stop event of the service is set, the streamed TS agents
+                   then return after their current iteration
+
+        Returns
+        ---------------
+        results : list of results (same order as args)
+        """
+
+        self.start()
+        self.stop_event.clear()
+        registration_id = self._register_data(data)
+        task_ids = []
+        for arguments in args:
+            task_ids.append(next(self._task_ids))
+            self.tasks.put((task_ids[-1], registration_id, function, arguments))
+
+        results = {}
+        errors = []
+        while len(results) < len(task_ids):
+            if on_progress is not None:
+                on_progress(self.progress)
+            if deadline is not None and time.time() >= deadline:
+                self.stop_event.set()
+            try:
+                task_id, success, result = self.results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            results[task_id] = result
+            if not success:
+                errors.append(result)
+        if on_progress is not None:
+            on_progress(self.progress)
+        if errors:
+            raise RuntimeError("Task failed in a worker process of the scheduler service:\n" + errors[0])
+        return [results[task_id] for task_id in task_ids]
+
+
+    def get_evaluation_pool(self, data):
+        """
+        Returns an evaluation pool of the instance which evaluates in the workers of the service (see
+        EvaluationPool)
+        """
+        return _ServiceEvaluationPool(self, data)
+
+
+    def close(self):
+        """
+        function to stop the worker processes and to release the shared memory of the instances
+        """
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        while self._instances:
+            self._release_data(next(iter(self._instances)))
+
+
+    def _register_data(self, data):
+        # the workers get the data of a new instance in the order the service registers the instances, an
+        # instance which was released is registered again
+        if data.instance_id not in self._instances:
+            register_data(data)
+            shared = data.to_shared_memory()
+            registration_id = next(self._registration_ids)
+            data_payload = pickle.dumps(data, protocol=-1)
+            for registrations in self.registrations:
+                registrations.put((registration_id, data_payload))
+            self._instances[data.instance_id] = (data, shared, registration_id)
+            while len(self._instances) > self.max_instances:
+                self._release_data(next(iter(self._instances)))
+        return self._instances[data.instance_id][2]
+
+
+    def _release_data(self, instance_id):
+        data, shared, _ = self._instances.pop(instance_id)
+        if shared:
+            data.release_shared_memory()
+        unregister_data(instance_id)
+
+
+    def _clear_channels(self, num_channels):
+        # emigrants which were not received in the previous run are dropped
+        for channel in self.channels[:num_channels]:
+            try:
+                while True:
+                    channel.get(timeout=0.05)
+            except queue.Empty:
+                pass
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ServiceEvaluationPool:
+
+    def __init__(self, scheduler_service, data):
+        """
+        evaluation pool of one instance in the workers of a scheduler service, same interface as EvaluationPool
+        """
+        self.scheduler_service = scheduler_service
+        self.data = data
+        self.num_processes = scheduler_service.num_workers
+
+
+    def evaluate(self, operation_2d_arrays, reschedule=0, preschedule_idle=0):
+        chunksize = max(1, -(-len(operation_2d_arrays) // self.num_processes))
+        args = [(self.data.instance_id, operation_2d_arrays[i:i + chunksize], reschedule, preschedule_idle)
+                for i in range(0, len(operation_2d_arrays), chunksize)]
+        return [solution for solutions in self.scheduler_service.map(_evaluate_batch, args, self.data)
+                for solution in solutions]
+
+
+    def close(self):
+        # the workers belong to the scheduler service
+        pass
@@ -1,2 +1,4 @@
 from .factory import SolutionFactory
-from .solution import Solution
+from .solution import Solution, DeltaEvaluator
+from .baseline import BaselineSchedule
+from .evaluation import EvaluationPool, EvaluationCache
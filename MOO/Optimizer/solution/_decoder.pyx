@@ -0,0 +1,271 @@
+from .utility import get_idle_time_for_machine_breakdown
+cimport cython
+from libc.math cimport floor, fmod
+import numpy as np
+cimport numpy as np
+
+
+cpdef Py_ssize_t get_checkpoint_size(const int num_jobs, const int num_machines):
+    """
+    size of one decoder checkpoint (4 values per machine and 3 values per job)
+    """
+    return 4 * num_machines + 3 * num_jobs
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _save_state(double[::1] checkpoint, double[::1] machine_makespan_memory, double[::1] machine_clock_memory,
+                      double[::1] machine_last_repair_time, double[::1] machine_no_idle_time_introduced,
+                      int[::1] job_seq_memory, double[::1] prev_job_seq_end_memory, double[::1] job_end_memory):
+    cdef Py_ssize_t i
+    cdef Py_ssize_t num_machines = machine_makespan_memory.shape[0]
+    cdef Py_ssize_t num_jobs = job_seq_memory.shape[0]
+    for i in range(num_machines):
+        checkpoint[i] = machine_makespan_memory[i]
+        checkpoint[num_machines + i] = machine_clock_memory[i]
+        checkpoint[2 * num_machines + i] = machine_last_repair_time[i]
+        checkpoint[3 * num_machines + i] = machine_no_idle_time_introduced[i]
+    for i in range(num_jobs):
+        checkpoint[4 * num_machines + i] = job_seq_memory[i]
+        checkpoint[4 * num_machines + num_jobs + i] = prev_job_seq_end_memory[i]
+        checkpoint[4 * num_machines + 2 * num_jobs + i] = job_end_memory[i]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _restore_state(double[::1] checkpoint, double[::1] machine_makespan_memory, double[::1] machine_clock_memory,
+                         double[::1] machine_last_repair_time, double[::1] machine_no_idle_time_introduced,
+                         int[::1] job_seq_memory, double[::1] prev_job_seq_end_memory, double[::1] job_end_memory):
+    cdef Py_ssize_t i
+    cdef Py_ssize_t num_machines = machine_makespan_memory.shape[0]
+    cdef Py_ssize_t num_jobs = job_seq_memory.shape[0]
+    for i in range(num_machines):
+        machine_makespan_memory[i] = checkpoint[i]
+        machine_clock_memory[i] = checkpoint[num_machines + i]
+        machine_last_repair_time[i] = checkpoint[2 * num_machines + i]
+        machine_no_idle_time_introduced[i] = checkpoint[3 * num_machines + i]
+    for i in range(num_jobs):
+        job_seq_memory[i] = <int> checkpoint[4 * num_machines + i]
+        prev_job_seq_end_memory[i] = checkpoint[4 * num_machines + num_jobs + i]
+        job_end_memory[i] = checkpoint[4 * num_machines + 2 * num_jobs + i]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef int _decode_rows(const int[:, ::1] operation_2d_array,
+                      const double[:, ::1] operation_processing_times_matrix,
+                      const int[:, ::1] job_operation_index_matrix,
+                      machine_threshold_list,
+                      machine_avg_process_list,
+                      machine_repair_duration_list,
+                      const double day_start,
+                      const double day_end,
+                      const int continuous,
+                      const int preschedule_idle,
+                      double[::1] start_times,
+                      double[::1] end_times,
+                      double[::1] wait_times,
+                      double[::1] buffer_times,
+                      Py_ssize_t first_row,
+                      double[:, ::1] checkpoints,
+                      Py_ssize_t checkpoint_interval,
+                      int save_checkpoints,
+                      double[::1] machine_makespan_memory,
+                      double[::1] machine_clock_memory,
+                      double[::1] machine_last_repair_time,
+                      double[::1] machine_no_idle_time_introduced,
+                      int[::1] job_seq_memory,
+                      double[::1] prev_job_seq_end_memory,
+                      double[::1] job_end_memory) except -1:
+    """
+    decoder loop of decode_operations on preallocated state arrays, the state is reset (or restored from the
+    last checkpoint before first_row) first, the machine makespans are left in machine_makespan_memory
+    """
+    cdef Py_ssize_t row, start_row = 0
+    cdef int job_id, operation_id, sequence, machine
+    cdef double wait, runtime, buffer_time, clock, tmp_clock
+
+    if first_row > 0:
+        start_row = (first_row // checkpoint_interval) * checkpoint_interval
+        _restore_state(checkpoints[first_row // checkpoint_interval], machine_makespan_memory, machine_clock_memory,
+                       machine_last_repair_time, machine_no_idle_time_introduced, job_seq_memory,
+                       prev_job_seq_end_memory, job_end_memory)
+    else:
+        machine_makespan_memory[:] = 0
+        machine_clock_memory[:] = 0
+        machine_last_repair_time[:] = 0
+        machine_no_idle_time_introduced[:] = 0
+        job_seq_memory[:] = 0
+        prev_job_seq_end_memory[:] = 0
+        job_end_memory[:] = 0
+
+    for row in range(start_row, operation_2d_array.shape[0]):
+        if save_checkpoints and row % checkpoint_interval == 0:
+            _save_state(checkpoints[row // checkpoint_interval], machine_makespan_memory, machine_clock_memory,
+                        machine_last_repair_time, machine_no_idle_time_introduced, job_seq_memory,
+                        prev_job_seq_end_memory, job_end_memory)
+
+        job_id = operation_2d_array[row, 0]
+        operation_id = operation_2d_array[row, 1]
+        sequence = operation_2d_array[row, 2]
+        machine = operation_2d_array[row, 3]
+        buffer_time = 0
+
+        if preschedule_idle:
+            buffer_time, machine_last_repair_time[machine], machine_no_idle_time_introduced[machine] = get_idle_time_for_machine_breakdown(machine_threshold_list,
+                                                                                                                    machine_avg_process_list,
+                                                                                                                    machine_repair_duration_list,
+                                                                                                                    machine,
+                                                                                                                    machine_makespan_memory[machine],
+                                                                                                                    machine_last_repair_time[machine],
+                                                                                                                    machine_no_idle_time_introduced[machine])
+
+        if job_seq_memory[job_id] < sequence:
+            prev_job_seq_end_memory[job_id] = job_end_memory[job_id]
+
+        if prev_job_seq_end_memory[job_id] <= machine_makespan_memory[machine]:
+            wait = 0
+        else:
+            wait = prev_job_seq_end_memory[job_id] - machine_makespan_memory[machine]
+
+        runtime = operation_processing_times_matrix[job_operation_index_matrix[job_id, operation_id], machine]
+
+        # shift basis schedule: move the machine to the next day if the operation would end after the shift
+        clock = day_start + machine_clock_memory[machine]
+        tmp_clock = clock + buffer_time + runtime
+        if not continuous and (fmod(tmp_clock, 1440) > day_end or floor(tmp_clock / 1440) != floor(clock / 1440)):
+            machine_clock_memory[machine] += 1440
+        else:
+            machine_clock_memory[machine] += wait
+
+        if runtime == 0:
+            buffer_time = 0
+
+        start_times[row] = machine_clock_memory[machine] + buffer_time
+        end_times[row] = start_times[row] + runtime
+        wait_times[row] = wait
+        buffer_times[row] = buffer_time
+
+        machine_makespan_memory[machine] += runtime + wait + buffer_time
+        job_end_memory[job_id] = machine_makespan_memory[machine]
+        job_seq_memory[job_id] = sequence
+
+    return 0
+
+
+cpdef double[::1] decode_operations(const int[:, ::1] operation_2d_array,
+                                    const double[:, ::1] operation_processing_times_matrix,
+                                    const int[:, ::1] job_operation_index_matrix,
+                                    machine_threshold_list,
+                                    machine_avg_process_list,
+                                    machine_repair_duration_list,
+                                    const int num_jobs,
+                                    const double day_start,
+                                    const double day_end,
+                                    const int continuous,
+                                    const int preschedule_idle,
+                                    double[::1] start_times,
+                                    double[::1] end_times,
+                                    double[::1] wait_times,
+                                    double[::1] buffer_times,
+                                    Py_ssize_t first_row=0,
+                                    double[:, ::1] checkpoints=None,
+                                    Py_ssize_t checkpoint_interval=0,
+                                    int save_checkpoints=0):
+    """
+    decodes the chromosome into minute offsets from the schedule start
+
+    start_times, end_times, wait_times and buffer_times are preallocated by the caller (one entry per row)
+    and are filled in place. start_times holds the setup start of every operation (after the buffer time),
+    day_start / day_end are the shift start and end as minutes of the day.
+
+    Checkpoints hold the decoder state before every checkpoint_interval-th row (one row of 'checkpoints' per
+    checkpoint, see get_checkpoint_size). With save_checkpoints they are recorded while decoding, with
+    first_row > 0 the state is restored from the last checkpoint before first_row and only the remaining rows
+    are decoded, the output arrays must then already hold the rows before that checkpoint.
+
+    Returns
+    ---------------
+    machine_makespan_memory : makespan of every machine
+    """
+
+    cdef int num_machines = operation_processing_times_matrix.shape[1]
+
+    # memory for keeping track of all machine's make span time
+    cdef double[::1] machine_makespan_memory = np.zeros(num_machines)
+
+    # memory for keeping track of every machine's position on the calendar (minutes from schedule start)
+    cdef double[::1] machine_clock_memory = np.zeros(num_machines)
+
+    # memory for the breakdown based buffer time (robust pro-active schedule)
+    cdef double[::1] machine_last_repair_time = np.zeros(num_machines)
+    cdef double[::1] machine_no_idle_time_introduced = np.zeros(num_machines)
+
+    # memory for keeping track of all job's latest sequence, end time of previous sequence and end time
+    cdef int[::1] job_seq_memory = np.zeros(num_jobs, dtype=np.intc)
+    cdef double[::1] prev_job_seq_end_memory = np.zeros(num_jobs)
+    cdef double[::1] job_end_memory = np.zeros(num_jobs)
+
+    _decode_rows(operation_2d_array, operation_processing_times_matrix, job_operation_index_matrix,
+                 machine_threshold_list, machine_avg_process_list, machine_repair_duration_list, day_start, day_end,
+                 continuous, preschedule_idle, start_times, end_times, wait_times, buffer_times, first_row,
+                 checkpoints, checkpoint_interval, save_checkpoints, machine_makespan_memory, machine_clock_memory,
+                 machine_last_repair_time, machine_no_idle_time_introduced, job_seq_memory, prev_job_seq_end_memory,
+                 job_end_memory)
+    return machine_makespan_memory
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef void decode_block(const int[:, :, ::1] operation_3d_array,
+                        const Py_ssize_t[::1] first_rows,
+                        const double[:, ::1] operation_processing_times_matrix,
+                        const int[:, ::1] job_operation_index_matrix,
+                        machine_threshold_list,
+                        machine_avg_process_list,
+                        machine_repair_duration_list,
+                        const int num_jobs,
+                        const double day_start,
+                        const double day_end,
+                        const int continuous,
+                        const int preschedule_idle,
+                        double[:, :, ::1] timelines,
+                        double[:, ::1] machine_makespans,
+                        double[:, ::1] checkpoints,
+                        Py_ssize_t checkpoint_interval) except *:
+    """
+    decodes a block of chromosomes which differ from one seed chromosome from first_rows[k] onwards
+
+    timelines holds start, end, wait and buffer times of every chromosome (shape (k, 4, num_rows)) and must
+    be filled with the timeline of the seed, checkpoints are the checkpoints recorded while decoding the seed
+    (see decode_operations). The makespan of every machine is written to machine_makespans.
+    The decoder state is allocated once for the whole block.
+    """
+    cdef Py_ssize_t num_neighbors = operation_3d_array.shape[0]
+    cdef Py_ssize_t num_machines = operation_processing_times_matrix.shape[1]
+    if first_rows.shape[0] != num_neighbors or timelines.shape[0] != num_neighbors or timelines.shape[1] != 4 or \
+            timelines.shape[2] != operation_3d_array.shape[1]:
+        raise ValueError(f"first_rows and timelines do not match a block of {num_neighbors} chromosomes of "
+                         f"{operation_3d_array.shape[1]} rows")
+    if machine_makespans.shape[0] != num_neighbors or machine_makespans.shape[1] != num_machines:
+        raise ValueError(f"machine_makespans do not match a block of {num_neighbors} chromosomes on "
+                         f"{num_machines} machines")
+
+    cdef double[::1] machine_clock_memory = np.empty(num_machines)
+    cdef double[::1] machine_last_repair_time = np.empty(num_machines)
+    cdef double[::1] machine_no_idle_time_introduced = np.empty(num_machines)
+    cdef int[::1] job_seq_memory = np.empty(num_jobs, dtype=np.intc)
+    cdef double[::1] prev_job_seq_end_memory = np.empty(num_jobs)
+    cdef double[::1] job_end_memory = np.empty(num_jobs)
+
+    cdef Py_ssize_t k
+    for k in range(num_neighbors):
+        # the makespans of the neighbor are decoded directly into its row of machine_makespans
+        _decode_rows(operation_3d_array[k], operation_processing_times_matrix, job_operation_index_matrix,
+                     machine_threshold_list, machine_avg_process_list, machine_repair_duration_list, day_start,
+                     day_end, continuous, preschedule_idle, timelines[k, 0], timelines[k, 1], timelines[k, 2],
+                     timelines[k, 3], first_rows[k], checkpoints, checkpoint_interval, 0, machine_makespans[k],
+                     machine_clock_memory, machine_last_repair_time, machine_no_idle_time_introduced,
+                     job_seq_memory, prev_job_seq_end_memory, job_end_memory)
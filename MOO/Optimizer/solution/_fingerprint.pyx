@@ -0,0 +1,69 @@
+cimport cython
+import numpy as np
+
+
+# 64-bit fingerprint of a chromosome: XOR of one mixed key per (row, job, operation, machine), so a move
+# which only changes the rows first_row..last_row is hashed again in O(last_row - first_row)
+
+
+@cython.cdivision(True)
+cdef inline unsigned long long _row_key(Py_ssize_t row, const int[::1] operation) nogil:
+    cdef unsigned long long key = (<unsigned long long> row) * 0x9E3779B97F4A7C15ULL
+    key ^= (<unsigned long long> operation[0]) * 0xC2B2AE3D27D4EB4FULL
+    key ^= (<unsigned long long> operation[1]) * 0x165667B19E3779F9ULL
+    key ^= (<unsigned long long> operation[3]) * 0x27D4EB2F165667C5ULL
+
+    # splitmix64 finalizer
+    key = (key ^ (key >> 30)) * 0xBF58476D1CE4E5B9ULL
+    key = (key ^ (key >> 27)) * 0x94D049BB133111EBULL
+    return key ^ (key >> 31)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef unsigned long long get_fingerprint(const int[:, ::1] operation_2d_array):
+    """
+    fingerprint of the whole chromosome
+    """
+    cdef unsigned long long fingerprint = 0
+    cdef Py_ssize_t row
+    for row in range(operation_2d_array.shape[0]):
+        fingerprint ^= _row_key(row, operation_2d_array[row])
+    return fingerprint
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef unsigned long long update_fingerprint(unsigned long long fingerprint,
+                                            const int[:, ::1] old_operation_2d_array,
+                                            const int[:, ::1] new_operation_2d_array,
+                                            Py_ssize_t first_row, Py_ssize_t last_row):
+    """
+    fingerprint of new_operation_2d_array from the fingerprint of old_operation_2d_array when both only
+    differ in the rows first_row..last_row (inclusive)
+    """
+    cdef Py_ssize_t row
+    for row in range(first_row, last_row + 1):
+        fingerprint ^= _row_key(row, old_operation_2d_array[row]) ^ _row_key(row, new_operation_2d_array[row])
+    return fingerprint
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def update_fingerprints(unsigned long long fingerprint, const int[:, ::1] old_operation_2d_array,
+                        const int[:, :, ::1] new_operation_3d_array, const Py_ssize_t[::1] first_rows,
+                        const Py_ssize_t[::1] last_rows):
+    """
+    fingerprints of a block of chromosomes which differ from old_operation_2d_array in the rows
+    first_rows[k]..last_rows[k] (see update_fingerprint)
+    """
+    fingerprints = np.empty(new_operation_3d_array.shape[0], dtype=np.uint64)
+    cdef unsigned long long[::1] fingerprints_view = fingerprints
+    cdef unsigned long long new_fingerprint
+    cdef Py_ssize_t k, row
+    for k in range(new_operation_3d_array.shape[0]):
+        new_fingerprint = fingerprint
+        for row in range(first_rows[k], last_rows[k] + 1):
+            new_fingerprint ^= _row_key(row, old_operation_2d_array[row]) ^ _row_key(row, new_operation_3d_array[k, row])
+        fingerprints_view[k] = new_fingerprint
+    return fingerprints
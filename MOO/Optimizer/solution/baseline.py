@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Mar 22 10:12:31 2021
+
+@author: chandan
+"""
+
+import numpy as np
+import pandas as pd
+
+BASELINE_SCHEDULE_PATH = 'Schedule_output/schedule_df.h5'
+_EPOCH = pd.Timestamp(0)
+_MINUTE = pd.Timedelta(minutes=1)
+
+
+def to_epoch_minutes(date_time):
+    """
+    helper function to convert datetimes (scalar or array like) into minutes since the unix epoch
+    """
+    return (pd.to_datetime(date_time) - _EPOCH) / _MINUTE
+
+
+class BaselineSchedule:
+
+    def __init__(self, schedule_df, data):
+        """
+        Constructor of BaselineSchedule class, the schedule which is executed when a disruption occurs.
+        Every operation of the schedule is mapped onto the operation index (job_operation_index_matrix) of the
+        rescheduling instance so that the stability cost of a solution is a vectorized difference.
+
+        Parameters
+        ---------------------------
+        schedule_df : dataframe of the initial schedule (see create_schedule_xlsx_file)
+        data : data object of the rescheduling instance
+
+        Returns
+        ---------------------------
+        None
+        """
+
+        num_operations = data.total_number_of_operations
+        self.start_times = np.zeros(num_operations)    # setup start in minutes since the unix epoch
+        self.end_times = np.zeros(num_operations)      # runtime end in minutes since the unix epoch
+        self.machines = np.full(num_operations, -1, dtype=np.intc)
+        self.scheduled = np.zeros(num_operations, dtype=bool)
+
+        schedule_df = schedule_df.drop_duplicates(subset=['job', 'operation'], keep='first')
+        jobs = schedule_df['job'].to_numpy(dtype=np.intp)
+        operations = schedule_df['operation'].to_numpy(dtype=np.intp)
+
+        # operations of the old schedule which are part of the rescheduling instance
+        known = (jobs >= 0) & (jobs < data.job_operation_index_matrix.shape[0]) & \
+                (operations >= 0) & (operations < data.job_operation_index_matrix.shape[1])
+        operation_indices = np.full(len(jobs), -1, dtype=np.intp)
+        operation_indices[known] = data.job_operation_index_matrix[jobs[known], operations[known]]
+        known = operation_indices != -1
+
+        strftime = "%Y-%m-%d %H:%M:%S"
+        operation_indices = operation_indices[known]
+        self.start_times[operation_indices] = to_epoch_minutes(pd.to_datetime(schedule_df['setup_start'], format=strftime)).to_numpy()[known]
+        self.end_times[operation_indices] = to_epoch_minutes(pd.to_datetime(schedule_df['runtime_end'], format=strftime)).to_numpy()[known]
+        self.machines[operation_indices] = schedule_df['machine'].to_numpy(dtype=np.intc)[known]
+        self.scheduled[operation_indices] = True
+
+
+    @classmethod
+    def from_hdf(cls, data, path=BASELINE_SCHEDULE_PATH):
+        """
+        function to load the baseline schedule which was stored by create_schedule_xlsx_file
+        """
+        return cls(pd.read_hdf(path, key='schedule'), data)
+
+
+def get_baseline_schedule(data):
+    """
+    Returns the baseline schedule of the instance 'data', it is read from disk only once and then kept
+    on the data object (and therefore shared with every solution, agent and worker process using it)
+    """
+    if data.baseline_schedule is None:
+        data.baseline_schedule = BaselineSchedule.from_hdf(data)
+    return data.baseline_schedule
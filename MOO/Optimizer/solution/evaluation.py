@@ -0,0 +1,219 @@
+import multiprocessing as mp
+from collections import OrderedDict
+
+import numpy as np
+
+from ..data import register_data, unregister_data, get_registered_data
+from .solution import Solution
+from ._fingerprint import get_fingerprint
+
+
+def _evaluate(args):
+    """
+    worker function, decodes and costs one chromosome of the instance registered in the worker
+    """
+    instance_id, operation_2d_array, reschedule, preschedule_idle = args
+    return Solution(get_registered_data(instance_id), operation_2d_array, reschedule=reschedule,
+                    preschedule_idle=preschedule_idle)
+
+
+def evaluate_operation_2d_arrays(data, operation_2d_arrays, reschedule=0, preschedule_idle=0, evaluation_pool=None,
+                                 evaluation_cache=None):
+    """
+    function to evaluate a batch of chromosomes, in the evaluation pool if one is given
+
+    Paramters
+    --------------------------
+    data : data object of the instance
+    operation_2d_arrays : list of 2d arrays of operations
+    reschedule : reschedule flag
+    preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
+    evaluation_pool : EvaluationPool of the instance or None (evaluation in this process)
+    evaluation_cache : EvaluationCache of the instance or None, only chromosomes which are not in the cache
+                       are evaluated
+
+    Returns
+    ---------------
+    solutions : list of solution objects (same order as operation_2d_arrays)
+    """
+    if evaluation_cache is None:
+        return _evaluate_operation_2d_arrays(data, operation_2d_arrays, reschedule, preschedule_idle, evaluation_pool)
+
+    # chromosomes which occur several times in the batch are looked up and evaluated once
+    positions = {}
+    for i, operation_2d_array in enumerate(operation_2d_arrays):
+        positions.setdefault(get_fingerprint(operation_2d_array), []).append(i)
+
+    solutions = [None] * len(operation_2d_arrays)
+    missing = []
+    for fingerprint, indices in positions.items():
+        solution = evaluation_cache.get(fingerprint, operation_2d_arrays[indices[0]], reschedule, preschedule_idle)
+        if solution is None:
+            missing.append(fingerprint)
+        for i in indices:
+            solutions[i] = solution
+
+    evaluated = _evaluate_operation_2d_arrays(data, [operation_2d_arrays[positions[fingerprint][0]]
+                                                     for fingerprint in missing],
+                                              reschedule, preschedule_idle, evaluation_pool)
+    for fingerprint, solution in zip(missing, evaluated):
+        solution.fingerprint = fingerprint
+        evaluation_cache.put(solution, reschedule, preschedule_idle)
+        for i in positions[fingerprint]:
+            solutions[i] = solution
+    return solutions
+
+
+def _evaluate_operation_2d_arrays(data, operation_2d_arrays, reschedule, preschedule_idle, evaluation_pool):
+    if evaluation_pool is None:
+        return [Solution(data, operation_2d_array, reschedule=reschedule, preschedule_idle=preschedule_idle)
+                for operation_2d_array in operation_2d_arrays]
+    return evaluation_pool.evaluate(operation_2d_arrays, reschedule, preschedule_idle)
+
+
+class EvaluationCache:
+
+    def __init__(self, max_size=4096):
+        """
+        Constructor of EvaluationCache class, memory of the evaluated solutions of one instance keyed by the
+        fingerprint of the chromosome and the evaluation context (reschedule, preschedule_idle). When the cache
+        is full the least recently used solution is evicted. Only the size and the counters are pickled, the
+        cached solutions stay in the process which evaluated them.
+
+        Paramters
+        --------------------------
+        max_size : maximum number of cached solutions
+
+        Returns
+        ---------------
+        None
+        """
+
+        self.max_size = max_size
+        self.solutions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def get(self, fingerprint, operation_2d_array, reschedule=0, preschedule_idle=0):
+        """
+        function to look up an evaluated chromosome
+
+        Paramters
+        --------------------------
+        fingerprint : fingerprint of the chromosome (see _fingerprint)
+        operation_2d_array : 2d array of operations (compared with the cached chromosome)
+        reschedule : reschedule flag
+        preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
+
+        Returns
+        ---------------
+        solution : cached solution object or None
+        """
+
+        key = (fingerprint, int(reschedule), int(preschedule_idle))
+        solution = self.solutions.get(key)
+        if solution is None or not np.array_equal(solution.operation_2d_array, operation_2d_array):
+            self.misses += 1
+            return None
+
+        self.solutions.move_to_end(key)
+        self.hits += 1
+        return solution
+
+
+    def put(self, solution, reschedule=0, preschedule_idle=0):
+        """
+        function to store an evaluated solution, the least recently used solution is evicted when the cache
+        is full
+        """
+        if self.max_size <= 0:
+            return
+        key = (solution.fingerprint, int(reschedule), int(preschedule_idle))
+        self.solutions[key] = solution
+        self.solutions.move_to_end(key)
+        if len(self.solutions) > self.max_size:
+            self.solutions.popitem(last=False)
+
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+    def clear(self):
+        self.solutions.clear()
+
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def __getstate__(self):
+        return {'max_size': self.max_size, 'solutions': OrderedDict(), 'hits': self.hits, 'misses': self.misses}
+
+
+class EvaluationPool:
+
+    def __init__(self, data, num_processes=None):
+        """
+        Constructor of EvaluationPool class, persistent process pool which decodes and costs chromosomes
+        of one instance. The data object is sent to every worker once when the pool starts (its matrices
+        are attached from shared memory, see Data.to_shared_memory), afterwards only chromosomes are sent
+        and solutions come back with their objective values (the timeline is decoded again in this process
+        when it is needed, see Solution.__getstate__).
+
+        Paramters
+        --------------------------
+        data : data object of the instance
+        num_processes : number of worker processes (number of cpus if None)
+
+        Returns
+        ---------------
+        None
+        """
+
+        self.data = data
+        register_data(data)
+        self.num_processes = num_processes or mp.cpu_count()
+        self.shared_data = data.to_shared_memory()
+        self.pool = mp.Pool(self.num_processes, initializer=register_data, initargs=(data,))
+
+
+    def evaluate(self, operation_2d_arrays, reschedule=0, preschedule_idle=0):
+        """
+        function to evaluate a batch of chromosomes in the worker processes
+
+        Paramters
+        --------------------------
+        operation_2d_arrays : list of 2d arrays of operations
+        reschedule : reschedule flag
+        preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
+
+        Returns
+        ---------------
+        solutions : list of solution objects (same order as operation_2d_arrays)
+        """
+
+        args = [(self.data.instance_id, operation_2d_array, reschedule, preschedule_idle)
+                for operation_2d_array in operation_2d_arrays]
+        chunksize = max(1, len(args) // (4 * self.num_processes))
+        return self.pool.map(_evaluate, args, chunksize)
+
+
+    def close(self):
+        """
+        function to stop the worker processes and to release the data of the instance
+        """
+        self.pool.close()
+        self.pool.join()
+        if self.shared_data:
+            self.data.release_shared_memory()
+        unregister_data(self.data.instance_id)
+
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -10,11 +10,55 @@ import datetime
 import numpy as np
 import pandas as pd
 
-from .utility import get_idle_time_for_machine_breakdown
+from ._decoder import decode_operations, decode_block, get_checkpoint_size
+from ._fingerprint import get_fingerprint
+from .baseline import get_baseline_schedule, to_epoch_minutes
+from ..data import get_registered_data
 from ..exception import IncompleteSolutionException
 from ._schedule_creator import create_schedule_xlsx_file, create_gantt_chart
 
 
+# end of the shift for shift basis schedules
+SHIFT_END_TIME = datetime.time(hour=18, minute=0)
+
+
+def _minute_of_day(time):
+    """
+    helper function to convert a datetime.time into minutes of the day
+    """
+    return time.hour * 60 + time.minute + time.second / 60
+
+
+def _get_instance_arrays(data):
+    """
+    helper function to get the arguments of the decoder kernels which describe the instance 'data'
+    """
+    return (data.operation_processing_times_matrix,
+            data.job_operation_index_matrix,
+            getattr(data, 'machine_threshold_list', None),
+            getattr(data, 'machine_avg_process_list', None),
+            getattr(data, 'machine_repair_duration_list', None),
+            data.total_number_of_jobs)
+
+
+def _decode(data, operation_2d_array, start_time, end_time, continuous, preschedule_idle,
+            start_times, end_times, wait_times, buffer_times, **checkpoint_args):
+    """
+    helper function to run the decoder kernel on the instance 'data' (see decode_operations)
+    """
+    return np.asarray(decode_operations(operation_2d_array,
+                                        *_get_instance_arrays(data),
+                                        _minute_of_day(start_time),
+                                        _minute_of_day(end_time),
+                                        int(continuous),
+                                        int(preschedule_idle),
+                                        start_times,
+                                        end_times,
+                                        wait_times,
+                                        buffer_times,
+                                        **checkpoint_args))
+
+
 class OperationHandler:
     def __init__(self, job_id, operation_id, machine, wait, setup, runtime, start_time, buffer_time):
         """    
@@ -62,11 +106,20 @@ class OperationHandler:
                f"wait={self.wait}, setup={self.setup}, runtime={self.runtime}\n"
 
 
+# order of the objective values in Solution.objectives
+OBJECTIVES = ('makespan', 'stock_cost', 'tardiness_cost', 'stability')
+
+
 class Solution:
+    
+    __slots__ = ('instance_id', '_data', 'operation_2d_array', 'objectives', 'machine_makespans', '_due_date',
+                 'start_datetime', 'start_times', 'end_times', 'wait_times', 'buffer_times',
+                 '_operations', '_job_operation_runtime_matrix', '_fingerprint')
+    
     def __init__(self, data, operation_2d_array, dict_to_obj=False, makespan=0, 
                  stock_cost=0, machine_makespans=None, tardiness_cost=0, 
                  due_date=None, stability=0, reschedule=None, preschedule_idle=0,
-                 job_operation_runtime_matrix=None, operations=None):
+                 job_operation_runtime_matrix=None, operations=None, decoded_schedule=None):
         
         """    
        constructor of Solution  class
@@ -86,24 +139,33 @@ class Solution:
         preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
         job_operation_runtime_matrix : job operation runtime matrix (dataframe)
         operations : list of all operations 
+        decoded_schedule : numeric timeline of the solution (see get_decoded_schedule), together with
+                           machine_makespans it replaces the decoding of a new solution (delta evaluation)
     
         Returns
         ---------------
         result : None
         """  
         
+        self.data = data
+        self.operation_2d_array = np.ascontiguousarray(operation_2d_array, dtype=np.intc)
+        self.objectives = np.zeros(len(OBJECTIVES))
         
+        # detailed schedule (operation list and runtime dataframe) is only built on first access
+        self._operations = None
+        self._job_operation_runtime_matrix = None
+        self._fingerprint = None
         
         if not dict_to_obj:
             if operation_2d_array.shape[0] != data.total_number_of_operations:
                 raise IncompleteSolutionException(f"Incomplete Solution of size {operation_2d_array.shape[0]}. "
                                                   f"Should be {data.total_number_of_operations}")
-                       
-            self.operation_2d_array = operation_2d_array
-            self.data = data
-            self.job_operation_runtime_matrix = None
             
-            self.operations, self.job_operation_runtime_matrix, self.machine_makespans = self.decode_chromosome_representation(preschedule_idle=preschedule_idle)
+            if decoded_schedule is None:
+                self.machine_makespans = self.decode_chromosome_representation(preschedule_idle=preschedule_idle)
+            else:
+                self.set_decoded_schedule(decoded_schedule)
+                self.machine_makespans = machine_makespans
             
             self.makespan = max(self.machine_makespans)  # calculating makespan cost of the solution
             
@@ -111,38 +173,161 @@ class Solution:
             self.due_date = self.get_due_date()
             self.tardiness_cost = self.get_tardiness_cost()
             
-            
-            self.start_datetime = None
-            self.stability = 0
-            self.initial_schedule_df = None
-            
             if reschedule == 1:             
-                self.initial_schedule_df = pd.read_hdf('Schedule_output/schedule_df.h5', key='schedule')  # retrieving old schedule information 
                 self.stability = self.get_stability_cost()
                 
         else:
             self.makespan = makespan
             self.stock_cost = stock_cost
-            self.data = data
             self.machine_makespans = machine_makespans
-            self.operation_2d_array = operation_2d_array
             self.job_operation_runtime_matrix = job_operation_runtime_matrix
             self.due_date = due_date
             self.tardiness_cost = tardiness_cost
             self.stability = stability
             self.operations = operations
+            self.set_decoded_schedule(decoded_schedule)
             
         
     def as_dict(self):
         return {'makespan': self.makespan, 'stock_cost': self.stock_cost, 'operation_2d_array': self.operation_2d_array, 
                 'machine_makespans': self.machine_makespans, 'data': self.data,
                 'due_date':self.due_date, 'tardiness_cost': self.tardiness_cost,
-                'stability': self.stability, 'job_operation_runtime_matrix': self.job_operation_runtime_matrix,
-                'operations': self.operations}
+                'stability': self.stability, 'job_operation_runtime_matrix': self._job_operation_runtime_matrix,
+                'operations': self._operations, 'decoded_schedule': self.get_decoded_schedule(),
+                'fingerprint': self.fingerprint}
+
+
+    @property
+    def data(self):
+        """
+        instance data of the solution, resolved from the registry of the current process after unpickling
+        """
+        if self._data is None:
+            self._data = get_registered_data(self.instance_id)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self.instance_id = data.instance_id
+
+    @property
+    def makespan(self):
+        return self.objectives[0]
+
+    @makespan.setter
+    def makespan(self, makespan):
+        self.objectives[0] = makespan
+
+    @property
+    def stock_cost(self):
+        return self.objectives[1]
+
+    @stock_cost.setter
+    def stock_cost(self, stock_cost):
+        self.objectives[1] = stock_cost
+
+    @property
+    def tardiness_cost(self):
+        return self.objectives[2]
+
+    @tardiness_cost.setter
+    def tardiness_cost(self, tardiness_cost):
+        self.objectives[2] = tardiness_cost
+
+    @property
+    def stability(self):
+        return self.objectives[3]
+
+    @stability.setter
+    def stability(self, stability):
+        self.objectives[3] = stability
+
+    @property
+    def due_date(self):
+        """
+        due date of every job, shared by all solutions of the instance unless given explicitly
+        """
+        if self._due_date is None:
+            return self.get_due_date()
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, due_date):
+        self._due_date = due_date
+
+    @property
+    def operations(self):
+        """
+        list of OperationHandler objects, built from the decoded schedule on first access
+        """
+        if self._operations is None and self.get_decoded_schedule() is not None:
+            self._operations = self.get_operations()
+        return self._operations
+
+    @operations.setter
+    def operations(self, operations):
+        self._operations = operations
+
+    @property
+    def job_operation_runtime_matrix(self):
+        """
+        job operation runtime matrix (dataframe), built from the decoded schedule on first access
+        """
+        if self._job_operation_runtime_matrix is None and self.get_decoded_schedule() is not None:
+            self._job_operation_runtime_matrix = self.get_job_operation_runtime_matrix()
+        return self._job_operation_runtime_matrix
+
+    @job_operation_runtime_matrix.setter
+    def job_operation_runtime_matrix(self, job_operation_runtime_matrix):
+        self._job_operation_runtime_matrix = job_operation_runtime_matrix
+
+
+    def get_decoded_schedule(self):
+        """
+        Returns the numeric timeline of the solution as a tuple
+        (start_datetime, start_times, end_times, wait_times, buffer_times).
+        A solution received from another process only knows its start_datetime, the timeline is then
+        decoded again from the chromosome.
+        """
+        if self.start_times is None and self.start_datetime is not None:
+            self.decode_chromosome_representation(start_date=self.start_datetime.date(), start_time=self.start_datetime.time())
+        if self.start_times is None:
+            return None
+        return self.start_datetime, self.start_times, self.end_times, self.wait_times, self.buffer_times
+
+
+    def set_decoded_schedule(self, decoded_schedule):
+        """
+        Restores the numeric timeline returned by get_decoded_schedule
+        """
+        if decoded_schedule is None:
+            decoded_schedule = (None, None, None, None, None)
+        self.start_datetime, self.start_times, self.end_times, self.wait_times, self.buffer_times = decoded_schedule
+
+
+    @property
+    def fingerprint(self):
+        """
+        64-bit fingerprint of the chromosome (see _fingerprint), solutions with different fingerprints are
+        never equal
+        """
+        if self._fingerprint is None:
+            self._fingerprint = get_fingerprint(self.operation_2d_array)
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, fingerprint):
+        self._fingerprint = fingerprint
+
+
+    def __hash__(self):
+        return hash(self.fingerprint)
 
 
     def __eq__(self, other_solution):
-        return np.array_equal(self.operation_2d_array, other_solution.operation_2d_array)
+        return self.fingerprint == other_solution.fingerprint and \
+               np.array_equal(self.operation_2d_array, other_solution.operation_2d_array)
 
 
     def __ne__(self, other_solution):
@@ -202,40 +387,52 @@ class Solution:
                f"{ self.stability}" 
 
     def __getstate__(self):
-        self.machine_makespans = np.asarray(self.machine_makespans) 
-        return {'operation_2d_array': self.operation_2d_array,
-                'machine_makespans': self.machine_makespans,
-                'makespan': self.makespan,
-                'data': self.data,
-                'stock_cost': self.stock_cost,
-                'due_date': self.due_date,
-                'tardiness_cost': self.tardiness_cost,
-                'stability': self.stability,
-                'job_operation_runtime_matrix': self.job_operation_runtime_matrix,
-                'operations': self.operations}
+        """
+        only the chromosome, the objectives and the instance id are pickled, the data is resolved from the
+        registry of the receiving process and the timeline is decoded again when needed.
+        Buffer times of a robust pro-active schedule are random, so such a timeline is pickled as it is.
+        """
+        decoded_schedule = None
+        if self.buffer_times is not None and np.any(self.buffer_times):
+            decoded_schedule = self.get_decoded_schedule()
+        return {'instance_id': self.instance_id,
+                'operation_2d_array': self.operation_2d_array,
+                'objectives': self.objectives,
+                'machine_makespans': np.asarray(self.machine_makespans),
+                'start_datetime': self.start_datetime,
+                'decoded_schedule': decoded_schedule,
+                'fingerprint': self._fingerprint}
 
 
     def __setstate__(self, state):
+        self.instance_id = state['instance_id']
+        try:
+            # the solution keeps its data when the instance is unregistered later (see unregister_data)
+            self._data = get_registered_data(self.instance_id)
+        except KeyError:
+            # resolved on first access, e.g. when the data is unpickled after the solution
+            self._data = None
         self.operation_2d_array = state['operation_2d_array']
+        self.objectives = state['objectives']
         self.machine_makespans = state['machine_makespans']
-        self.makespan = state['makespan']
-        self.data = state['data']
-        self.stock_cost = state['stock_cost']
-        self.tardiness_cost = state['tardiness_cost']
-        self.due_date = state['due_date']
-        self.stability = state['stability']
-        self.job_operation_runtime_matrix = state['job_operation_runtime_matrix']
-        self.operations = state['operations']
+        self._due_date = None
+        self._operations = None
+        self._job_operation_runtime_matrix = None
+        self._fingerprint = state['fingerprint']
+        self.set_decoded_schedule(state['decoded_schedule'])
+        self.start_datetime = state['start_datetime']
 
 
 
 
     def decode_chromosome_representation(self, start_date=datetime.date.today(), start_time=datetime.time(hour=datetime.datetime.now().hour, minute=(datetime.datetime.now().minute + 2)%60),
-                                       end_time=datetime.time(hour=18,  minute=00), continuous=False, machines=None,
+                                       end_time=SHIFT_END_TIME, continuous=False, machines=None,
                                        preschedule_idle=0):
        
         """    
-        Used to decode the chromosome representation into time-framed schedule
+        Used to decode the chromosome representation into time-framed schedule.
+        All times are kept as minute offsets from the schedule start in numpy arrays (one entry per row of
+        operation_2d_array), they are converted to datetimes only when the schedule is exported.
         
         Paramters
         --------------------------
@@ -250,101 +447,85 @@ class Solution:
     
         Returns
         ---------------
-        result : decoded operations data
-        job_operation_runtime_matrix : dataframe of job operation runtime matrix
-        machine_makespans_memory : dictionary of machine makespan data
+        machine_makespans : makespan of every machine
         """  
         
-        result = []
-        job_operation_runtime_matrix = list()
-        num_jobs = self.data.total_number_of_jobs
-        num_machines = self.data.total_number_of_machines
-        
+        num_operations = self.operation_2d_array.shape[0]
         self.start_datetime = datetime.datetime(year=start_date.year, month=start_date.month, day=start_date.day,
                                            hour=start_time.hour, minute=start_time.minute, second=start_time.second)
         
-        machine_datetime_dict = {machine_id: self.start_datetime for machine_id in range(num_machines)} # machine makespan data in date time format
-        machine_makespan_memory = [0] * num_machines
-        last_repair_time = [0] * num_machines
-        no_idle_time_introduced = [0] * num_machines
-        job_seq_memory = [0] * num_jobs
-        prev_job_seq_end_memory = [0] * num_jobs
-        job_end_memory = [0] * num_jobs
+        self.start_times = np.empty(num_operations)   # setup start of the operation
+        self.end_times = np.empty(num_operations)     # runtime end of the operation
+        self.wait_times = np.empty(num_operations)
+        self.buffer_times = np.empty(num_operations)
+        
+        return _decode(self.data, self.operation_2d_array, start_time, end_time, continuous, preschedule_idle,
+                       self.start_times, self.end_times, self.wait_times, self.buffer_times)
+    
+    
+    def get_operations(self):
+        """    
+        Converts the decoded schedule into a list of OperationHandler objects (datetime based)
         
+        Paramters
+        --------------------------
+        self :  class instance
+    
+        Returns
+        ---------------
+        operations : list of OperationHandler objects in chromosome order
+        """  
         
+        runtimes = self.get_runtimes()
+        operations = []
         for row in range(self.operation_2d_array.shape[0]):
-            job_id = self.operation_2d_array[row, 0]
-            operation_id = self.operation_2d_array[row, 1]
-            sequence = self.operation_2d_array[row, 2] # for ease of coding operation sequence is included
-            machine = self.operation_2d_array[row, 3]
-            buffer_time = 0
-            
-            if preschedule_idle: # when robust pro-active reschedule method is enabled
-                buffer_time, last_repair_time[machine], no_idle_time_introduced[machine] = get_idle_time_for_machine_breakdown(self.data.machine_threshold_list,
-                                             self.data.machine_avg_process_list,
-                                             self.data.machine_repair_duration_list,
-                                             machine,
-                                             machine_makespan_memory[machine],
-                                             last_repair_time[machine], 
-                                             no_idle_time_introduced[machine])
-            
-            setup = 0
-            if job_seq_memory[job_id] < sequence:
-                prev_job_seq_end_memory[job_id] = job_end_memory[job_id]
-
-            
-            if prev_job_seq_end_memory[job_id] <= machine_makespan_memory[machine]: # if completion time of previous operation of the job 'job_id' is less than machine makespan
-                wait = 0
-            else:
-                wait = prev_job_seq_end_memory[job_id] - machine_makespan_memory[machine]
-
-            runtime = self.data.get_runtime(job_id, operation_id, machine) #process time of operation
-            tmp_dt = machine_datetime_dict[machine] + datetime.timedelta(minutes=buffer_time + setup + runtime)
-            
-            if not continuous and (tmp_dt.time() > end_time or tmp_dt.day != machine_datetime_dict[machine].day): # for sift basis schedule
-                machine_datetime_dict[machine] += datetime.timedelta(days=1)
-                machine_datetime_dict[machine].replace(hour=start_time.hour, minute=start_time.minute,
-                                                       second=start_time.second)
-            else:
-                machine_datetime_dict[machine] += datetime.timedelta(minutes=wait)
-
-            
-            if runtime == 0:
-                setup = 0
-                buffer_time = 0
-
-            operation_data = OperationHandler(job_id,
-                                    operation_id,
-                                    machine,
-                                    float(wait),
-                                    float(setup),
-                                    float(runtime),
-                                    machine_datetime_dict[machine],
-                                    buffer_time)
-            
-            result.append(operation_data) 
-            
-            job_runtime_matrix = dict()
-            job_runtime_matrix['job_id'] = operation_data.job_id
-            job_runtime_matrix['operation_id'] = operation_data.operation_id
-            job_runtime_matrix['start_time'] = operation_data.setup_start_time
-            job_runtime_matrix['end_time'] = operation_data.runtime_end_time    
-            job_runtime_matrix['buffer_time'] = buffer_time
-            job_operation_runtime_matrix.append(job_runtime_matrix)                
-
-           # machine_makespan_memory[machine] += runtime + wait + setup 
-
-            machine_makespan_memory[machine] += runtime + wait + setup + buffer_time
-            job_end_memory[job_id] = machine_makespan_memory[machine]
-            job_seq_memory[job_id] = sequence
-            
-        return result, pd.DataFrame(job_operation_runtime_matrix), machine_makespan_memory
+            job_id, operation_id, _, machine = self.operation_2d_array[row]
+            start_time = self.start_datetime + datetime.timedelta(minutes=self.start_times[row] - self.buffer_times[row])
+            operations.append(OperationHandler(job_id,
+                                               operation_id,
+                                               machine,
+                                               float(self.wait_times[row]),
+                                               0.0,
+                                               float(runtimes[row]),
+                                               start_time,
+                                               self.buffer_times[row]))
+        return operations
+    
+    
+    def get_job_operation_runtime_matrix(self):
+        """    
+        Converts the decoded schedule into the job operation runtime matrix (dataframe)
+        
+        Paramters
+        --------------------------
+        self :  class instance
+    
+        Returns
+        ---------------
+        job_operation_runtime_matrix : dataframe with job_id, operation_id, start_time, end_time and buffer_time
+        """  
+        
+        start_datetime = pd.Timestamp(self.start_datetime)
+        return pd.DataFrame({'job_id': self.operation_2d_array[:, 0],
+                             'operation_id': self.operation_2d_array[:, 1],
+                             'start_time': start_datetime + pd.to_timedelta(self.start_times, unit='m'),
+                             'end_time': start_datetime + pd.to_timedelta(self.end_times, unit='m'),
+                             'buffer_time': self.buffer_times})
+    
+    
+    def get_runtimes(self):
+        """    
+        Returns the process time of every row of operation_2d_array on its assigned machine
+        """  
+        operation_indices = self.data.job_operation_index_matrix[self.operation_2d_array[:, 0], self.operation_2d_array[:, 1]]
+        return self.data.operation_processing_times_matrix[operation_indices, self.operation_2d_array[:, 3]]
 
 
         
     def get_stock_cost(self):
         """    
-        Evaluates stock cost of the solution
+        Evaluates stock cost of the solution, i.e. the total time (in minutes) every job waits between
+        two consecutive operations
         
         Paramters
         --------------------------
@@ -355,29 +536,14 @@ class Solution:
         stock_cost : calculated stock cost
         """  
         
-        
-        number_of_jobs = self.data.total_number_of_jobs        
-        stock_cost = 0
-        
-        for i in range(number_of_jobs):
-            job_df = self.job_operation_runtime_matrix.loc[self.job_operation_runtime_matrix['job_id'] == i]
-            tot_operations = job_df.shape[0]
-            
-            for j in range(tot_operations - 1):
-                operation_a = job_df.loc[(job_df['job_id']==i) & (job_df['operation_id']==j)]
-                operation_b = job_df.loc[(job_df['job_id']==i) & (job_df['operation_id']==j+1)]  
-                operation_b_start_time = operation_b.iloc[0]['start_time']
-                operation_a_end_time = operation_a.iloc[0]['end_time']
-                stock_cost += (operation_b_start_time - operation_a_end_time).total_seconds() 
-                
-        if stock_cost == 0:
-            return stock_cost
-        return stock_cost/60 # stock cost from seconds -> minutes
+        predecessors, successors = self.data.get_job_precedence_pairs()
+        start_times, end_times = self.get_operation_times()
+        return float(np.sum(start_times[successors] - end_times[predecessors]))
     
     
     def get_due_date(self):
         
-         """    
+        """    
         Evaluates due date for each job in the solution
         
         Paramters
@@ -386,26 +552,15 @@ class Solution:
     
         Returns
         ---------------
-        job_due_date_dict : dictionary that contains due date value of each job
+        job_due_dates : array that contains due date value of each job (shared by all solutions of the instance)
         """  
         
-         operation_processing_matrix = [list(j) for j in self.data.operation_processing_times_matrix]
-         job_due_date_matrix = dict()
-         count = 0
-         for job_index in self.data.job_operation_index_matrix:
-             total_time = 0
-             for operation_index in job_index:
-                 if operation_index != -1:
-                     processing_time = operation_processing_matrix[operation_index] 
-                     total_time += processing_time
-             job_due_date_matrix[count] = total_time 
-             count +=1   
-         return job_due_date_matrix
+        return self.data.get_job_due_dates()
      
         
     def get_tardiness_cost(self):
         
-         """    
+        """    
         Evaluates tardiness cost of the solution
         
         Paramters
@@ -417,25 +572,29 @@ class Solution:
         tardiness_cost : tardiness cost of the solution
         """  
         
-         tardiness_cost = 0         
-         number_of_jobs = self.data.total_number_of_jobs
-         for i in range(number_of_jobs):
-            job_df = self.job_operation_runtime_matrix.loc[self.job_operation_runtime_matrix['job_id'] == i]
-            tot_operations = job_df.shape[0]
-            final_op = job_df.loc[(job_df['job_id']==i) & (job_df['operation_id']==tot_operations-1)]   # last operation of job (final completion time)
-            final_op.reset_index(drop=True, inplace=True)
-            cost = ((final_op.end_time - self.start_datetime).dt.total_seconds())[0]  # start_datetime is subtracted because  starttime is not 0  whereas specific time like (9 am)
-            
-            cost = (cost/60) - self.due_date[i]
-            tardiness_cost += cost 
-         return tardiness_cost
+        _, end_times = self.get_operation_times()
+        completion_times = end_times[self.data.get_job_last_operation_indices()]   # final completion time of every job
+        return float(np.sum(completion_times - self.due_date))
+    
+    
+    def get_operation_times(self):
+        """    
+        Returns the start and end times of the decoded schedule indexed by operation index
+        (job_operation_index_matrix) instead of chromosome row
+        """  
+        operation_indices = self.data.job_operation_index_matrix[self.operation_2d_array[:, 0], self.operation_2d_array[:, 1]]
+        start_times = np.empty_like(self.start_times)
+        end_times = np.empty_like(self.end_times)
+        start_times[operation_indices] = self.start_times
+        end_times[operation_indices] = self.end_times
+        return start_times, end_times
     
     
     
     def get_stability_cost(self):    
         
         """    
-        Evaluates stability cost of the solution
+        Evaluates stability cost of the solution with respect to the baseline schedule (old schedule)
         
         Paramters
         --------------------------
@@ -445,40 +604,26 @@ class Solution:
         ---------------
         stability_cost : stability cost of the solution
         """  
-        early_start_deviation = 0
-        late_start_deviation = 0
-        machine_change_cost = 0
-        completion_time_deviation_cost = 0
-        strftime = "%Y-%m-%d %H:%M:%S"
-        
-        for operation in self.operations:
-            job_id = operation.job_id 
-            operation_id = operation.operation_id
-            machine = operation.machine
-            runtime = operation.runtime
-            operation_start_time = operation.setup_start_time
-            operation_end_time = operation.runtime_end_time
-            
-            if runtime != 0: # only unprcessed operations are considered
-                init_operation_data = self.initial_schedule_df.loc[(self.initial_schedule_df.job == job_id) & (self.initial_schedule_df.operation == operation_id)] # select operation 'operation_id' from previous schedule
-                
-                if not init_operation_data.empty:
-                    i_start_time = datetime.datetime.strptime(init_operation_data.iloc[0]['setup_start'], strftime)
-                    i_completion_time = datetime.datetime.strptime(init_operation_data.iloc[0]['runtime_end'], strftime)
-                    start_time_deviation = (operation_start_time - i_start_time).total_seconds()
-                    if start_time_deviation < 0:
-                        early_start_deviation += (abs(start_time_deviation)/60)
-                    else:
-                        late_start_deviation += (start_time_deviation/60)
-                    
-                    completion_time_deviation_cost += abs((operation_end_time - i_completion_time).total_seconds())
-                    
-                    if init_operation_data.iloc[0]['machine'] != machine:
-                        machine_change_cost += 100
+        
+        baseline = get_baseline_schedule(self.data)
+        operation_indices = self.data.job_operation_index_matrix[self.operation_2d_array[:, 0], self.operation_2d_array[:, 1]]
+        
+        # only unprocessed operations which are part of the old schedule are considered
+        considered = (self.get_runtimes() != 0) & baseline.scheduled[operation_indices]
+        operation_indices = operation_indices[considered]
+        
+        start_offset = to_epoch_minutes(self.start_datetime)
+        start_time_deviation = self.start_times[considered] + start_offset - baseline.start_times[operation_indices]
+        completion_time_deviation = self.end_times[considered] + start_offset - baseline.end_times[operation_indices]
+        
+        early_start_deviation = -np.sum(start_time_deviation[start_time_deviation < 0])
+        late_start_deviation = np.sum(start_time_deviation[start_time_deviation >= 0])
+        completion_time_deviation_cost = np.sum(np.abs(completion_time_deviation)) * 60
+        machine_change_cost = 100 * np.count_nonzero(self.operation_2d_array[considered, 3] != baseline.machines[operation_indices])
         
         '''More penalty for ealry start -> where complexity will be high, and also for change of machine'''
         stability_cost = 0.3 * early_start_deviation + 0.15 * late_start_deviation + 0.4 * machine_change_cost + 0.15 * completion_time_deviation_cost       
-        return stability_cost
+        return float(stability_cost)
     
     
     
@@ -518,4 +663,152 @@ class Solution:
         """  
         create_gantt_chart(self, output_path, title=title, start_date=start_date, start_time=start_time,
                            end_time=end_time, iplot_bool=False, auto_open=auto_open,
-                           continuous=continuous, preschedule_idle=preschedule_idle)
\ No newline at end of file
+                           continuous=continuous, preschedule_idle=preschedule_idle)
+
+
+
+class DeltaEvaluator:
+    
+    def __init__(self, seed_solution, checkpoint_interval=16, reschedule=0, preschedule_idle=0):
+        """    
+        Constructor of DeltaEvaluator class, evaluates neighbors of a seed solution which differ from the seed
+        only from a given row of operation_2d_array onwards (insertion and machine change moves).
+        The seed is decoded once while recording the decoder state every 'checkpoint_interval' rows, a
+        neighbor reuses the decoded prefix and only the rows after the last checkpoint before its first
+        changed row are simulated again.
+        
+        Paramters
+        --------------------------
+        seed_solution : solution whose neighbors are evaluated
+        checkpoint_interval : number of rows between two checkpoints
+        reschedule : reschedule flag 
+        preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
+    
+        Returns
+        ---------------
+        None
+        """  
+        
+        self.data = seed_solution.data
+        self.start_datetime = seed_solution.get_decoded_schedule()[0]
+        self.checkpoint_interval = checkpoint_interval
+        self.reschedule = reschedule
+        self.preschedule_idle = preschedule_idle
+        
+        num_operations = seed_solution.operation_2d_array.shape[0]
+        num_checkpoints = (num_operations - 1) // checkpoint_interval + 1
+        self.checkpoints = np.empty((num_checkpoints, get_checkpoint_size(self.data.total_number_of_jobs,
+                                                                          self.data.total_number_of_machines)))
+        self.timeline = np.empty((4, num_operations))  # start, end, wait and buffer times of the seed
+        self._scratch_timeline = np.empty((4, num_operations))
+        self.set_seed(seed_solution.operation_2d_array)
+    
+    
+    def set_seed(self, operation_2d_array, first_changed_row=0):
+        """    
+        Makes a neighbor the new seed (e.g. an accepted move of SA), only the rows and checkpoints after
+        first_changed_row are decoded and recorded again
+        
+        Paramters
+        --------------------------
+        operation_2d_array : 2d array of operations of the new seed
+        first_changed_row : first row in which operation_2d_array differs from the current seed's chromosome
+    
+        Returns
+        ---------------
+        machine_makespans : machine makespans of the new seed
+        """  
+        
+        self.operation_2d_array = np.ascontiguousarray(operation_2d_array, dtype=np.intc)
+        return _decode(self.data, self.operation_2d_array, self.start_datetime.time(), SHIFT_END_TIME, False,
+                       self.preschedule_idle, *self.timeline, first_row=first_changed_row,
+                       checkpoints=self.checkpoints, checkpoint_interval=self.checkpoint_interval,
+                       save_checkpoints=1)
+    
+    
+    def get_machine_makespans(self, operation_2d_array, first_changed_row):
+        """    
+        Computes the machine makespans of a neighbor of the seed solution without building a solution (the
+        timeline of the neighbor is not kept)
+        
+        Paramters
+        --------------------------
+        operation_2d_array : 2d array of operations of the neighbor
+        first_changed_row : first row in which operation_2d_array differs from the seed's chromosome
+    
+        Returns
+        ---------------
+        machine_makespans : machine makespans of the neighbor
+        """  
+        
+        operation_2d_array = np.ascontiguousarray(operation_2d_array, dtype=np.intc)
+        if operation_2d_array.shape[0] != self.data.total_number_of_operations:
+            raise IncompleteSolutionException(f"Incomplete Solution of size {operation_2d_array.shape[0]}. "
+                                              f"Should be {self.data.total_number_of_operations}")
+        
+        return _decode(self.data, operation_2d_array, self.start_datetime.time(), SHIFT_END_TIME, False,
+                       self.preschedule_idle, *self._scratch_timeline, first_row=first_changed_row,
+                       checkpoints=self.checkpoints, checkpoint_interval=self.checkpoint_interval)
+    
+    
+    def get_neighbor(self, operation_2d_array, first_changed_row):
+        """    
+        Evaluates a neighbor of the seed solution
+        
+        Paramters
+        --------------------------
+        operation_2d_array : 2d array of operations of the neighbor
+        first_changed_row : first row in which operation_2d_array differs from the seed's chromosome
+    
+        Returns
+        ---------------
+        neighbor : solution object
+        """  
+        
+        operation_2d_array = np.ascontiguousarray(operation_2d_array, dtype=np.intc)
+        if operation_2d_array.shape[0] != self.data.total_number_of_operations:
+            raise IncompleteSolutionException(f"Incomplete Solution of size {operation_2d_array.shape[0]}. "
+                                              f"Should be {self.data.total_number_of_operations}")
+        
+        timeline = self.timeline.copy()
+        machine_makespans = _decode(self.data, operation_2d_array, self.start_datetime.time(), SHIFT_END_TIME, False,
+                                    self.preschedule_idle, *timeline, first_row=first_changed_row,
+                                    checkpoints=self.checkpoints, checkpoint_interval=self.checkpoint_interval)
+        
+        return Solution(self.data, operation_2d_array, machine_makespans=machine_makespans,
+                        decoded_schedule=(self.start_datetime, *timeline), reschedule=self.reschedule,
+                        preschedule_idle=self.preschedule_idle)
+    
+    
+    def get_neighbors(self, operation_3d_array, first_changed_rows):
+        """    
+        Evaluates a block of neighbors of the seed solution in one call of the decoder (see decode_block)
+        
+        Paramters
+        --------------------------
+        operation_3d_array : 3d array of the operations of the neighbors (one 2d array of operations per neighbor)
+        first_changed_rows : first row in which each neighbor differs from the seed's chromosome
+    
+        Returns
+        ---------------
+        neighbors : list of solution objects
+        """  
+        
+        operation_3d_array = np.ascontiguousarray(operation_3d_array, dtype=np.intc)
+        if operation_3d_array.shape[1] != self.data.total_number_of_operations:
+            raise IncompleteSolutionException(f"Incomplete Solution of size {operation_3d_array.shape[1]}. "
+                                              f"Should be {self.data.total_number_of_operations}")
+        
+        num_neighbors = operation_3d_array.shape[0]
+        timelines = np.repeat(self.timeline[None], num_neighbors, axis=0)
+        machine_makespans = np.empty((num_neighbors, self.data.operation_processing_times_matrix.shape[1]))
+        decode_block(operation_3d_array, np.ascontiguousarray(first_changed_rows, dtype=np.intp),
+                     *_get_instance_arrays(self.data), _minute_of_day(self.start_datetime.time()),
+                     _minute_of_day(SHIFT_END_TIME), 0, int(self.preschedule_idle), timelines, machine_makespans,
+                     self.checkpoints, self.checkpoint_interval)
+        
+        # every neighbor gets its own arrays, the block is released once the neighbors are built
+        return [Solution(self.data, operation_3d_array[k].copy(), machine_makespans=machine_makespans[k].copy(),
+                         decoded_schedule=(self.start_datetime, *timelines[k].copy()), reschedule=self.reschedule,
+                         preschedule_idle=self.preschedule_idle)
+                for k in range(num_neighbors)]
@@ -134,7 +134,7 @@ def get_initial_population(co_ordinator_agent, agent_type):
             
             # Solution dataframe to list of solution objects
             for index, row in population.iterrows():
-                sol_obj = Solution(row.data, row.operation_2d_array, dict_to_obj=True, makespan=row.makespan, stock_cost=row.stock_cost, machine_makespans=row.machine_makespans)
+                sol_obj = Solution(row.data, row.operation_2d_array, dict_to_obj=True, makespan=row.makespan, stock_cost=row.stock_cost, machine_makespans=row.machine_makespans, decoded_schedule=row.decoded_schedule)
                 result_population.append(sol_obj)
                 
             population = result_population
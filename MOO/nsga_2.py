@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NSGA-II baseline for the practical problems and rescheduling experiments
+"""
+import time
+from Optimizer.coordinator import CoOrdinator
+from Optimizer.scheduler_service import get_scheduler_service
+from Optimizer.data_fjs import Data_Flexible_Job_Shop
+from Rescheduling.utility import get_machine_data
+from algorithms import generate_output
+
+benchmark = True
+verbose = True
+progress_bar = False
+
+
+def perform_NSGA_II(co_ordinator_agent):
+    """
+    Starting point of NSGA-II
+
+    Paramters
+    --------------------------
+    co_ordinator_agent : object of CoOrdinator class
+
+    Returns
+    ---------------
+    best_solution from NSGA-II
+    """
+
+    runtime = 15 # in seconds
+    population_size = 100
+    mutation_probability = 0.8
+    probability_change_machine = 0.25
+    evaluation_processes = 4 # offspring are evaluated by the workers of the scheduler service
+
+    return co_ordinator_agent.nsga_2_time(runtime=runtime,
+                                          population_size=population_size,
+                                          mutation_probability=mutation_probability,
+                                          probability_change_machine=probability_change_machine,
+                                          benchmark=benchmark,
+                                          verbose=verbose,
+                                          progress_bar=progress_bar,
+                                          evaluation_processes=evaluation_processes)
+
+
+def nsga(machine_df, job_operation_df, objective_params, reschedule=False,
+         preschedule_idle=False, schedule_alg="nsga"):
+    """
+    Schedules the jobs with NSGA-II
+
+    Paramters
+    --------------------------
+    machine_df : machine information
+    job_operation_df : job operation information
+    objective_params : objective functions with weights
+    reschedule : reschedule flag
+    preschedule_idle : flag for preschedule_idle flag (robust pro-active schedule)
+    schedule_alg : algorithm name in the outputs
+
+    Returns
+    ---------------
+    schedule : schedule of the best solution
+    best_solution : best solution from NSGA-II
+    """
+
+    while True:
+        try:
+            data_agent = Data_Flexible_Job_Shop('data/seq_dep_matrix_2.xlsx',
+                                                machine_df,
+                                                job_operation_df)
+            break
+        except Exception as e:
+            print(str(e))
+            print('Waiting for machine to get fixed')
+            time.sleep(60)
+            machine_df = get_machine_data()
+            machine_df['machine_id'] = machine_df['machine_id'].replace({'M':''}, regex=True)
+            machine_df['machine_id'] = machine_df['machine_id'].astype(int)
+
+    job_mapping = data_agent.job_mapping.drop_duplicates(subset=['prod_name'], keep='last')
+    # reschedules reuse the worker processes of the first schedule
+    co_ordinator_agent = CoOrdinator(data_agent, objective_params, reschedule, preschedule_idle,
+                                     get_scheduler_service())
+    best_solution = perform_NSGA_II(co_ordinator_agent)
+    schedule_type = 'initial'
+    if reschedule:
+        schedule_type = 'reschedule'
+    schedule = generate_output(co_ordinator_agent, job_mapping,
+                               schedule_type, preschedule_idle,
+                               schedule_alg)
+    # every reschedule builds a new data object, the registry of this process only keeps the running ones
+    co_ordinator_agent.close()
+    return schedule, best_solution
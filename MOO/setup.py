@@ -17,10 +17,16 @@ class NumpyExtension(Extension):
         super()._convert_pyx_sources_to_lang()
 
 
-ext_modules = [NumpyExtension('Optimizer.Genetic_alg._ga_helpers',
+ext_modules = [NumpyExtension('Optimizer._non_dominated_sort',
+                              ['Optimizer/_non_dominated_sort.pyx']),
+               NumpyExtension('Optimizer.Genetic_alg._ga_helpers',
                               ['Optimizer/Genetic_alg/_ga_helpers.pyx']),
                NumpyExtension('Optimizer.solution._makespan',
                               ['Optimizer/solution/_makespan.pyx']),
+               NumpyExtension('Optimizer.solution._decoder',
+                              ['Optimizer/solution/_decoder.pyx']),
+               NumpyExtension('Optimizer.solution._fingerprint',
+                              ['Optimizer/solution/_fingerprint.pyx']),
                NumpyExtension('Optimizer.Tabu_Search._generate_neighbor',
                               ['Optimizer/Tabu_Search/_generate_neighbor.pyx']),
                NumpyExtension('Optimizer.Simulated_Annealing._generate_neighbor',
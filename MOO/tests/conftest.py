@@ -0,0 +1,38 @@
+import datetime
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+MOO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, MOO_DIR)
+
+from Optimizer.data_normal_job_shop import Data_Normal_Job_Shop
+from Optimizer.solution import SolutionFactory
+
+# fixed start of the decoded schedules, shift basis schedules depend on the time of the day
+START_DATE = datetime.date(2021, 3, 1)
+START_TIME = datetime.time(hour=8, minute=0)
+
+
+@pytest.fixture(scope='session')
+def data():
+    """
+    bundled instance of algorithms.py (20 jobs, 5 machines)
+    """
+    return Data_Normal_Job_Shop(os.path.join(MOO_DIR, 'a.txt'))
+
+
+@pytest.fixture
+def solutions(data):
+    """
+    a few random solutions of the bundled instance, decoded from START_DATE and START_TIME
+    """
+    random.seed(0)
+    np.random.seed(0)
+    solutions = SolutionFactory(data).get_n_solutions(5)
+    for solution in solutions:
+        solution.decode_chromosome_representation(start_date=START_DATE, start_time=START_TIME)
+    return solutions
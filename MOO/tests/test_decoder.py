@@ -0,0 +1,72 @@
+import datetime
+
+import numpy as np
+
+from conftest import START_DATE, START_TIME
+from Optimizer.solution.solution import SHIFT_END_TIME
+
+
+def reference_decode(data, operation_2d_array, continuous):
+    """
+    datetime based decoder the kernel replaced (without buffer times), returns the machine makespans and the
+    start and end time of every row in minutes from the schedule start
+    """
+    start_datetime = datetime.datetime.combine(START_DATE, START_TIME)
+    machine_datetimes = [start_datetime] * data.total_number_of_machines
+    machine_makespans = [0] * data.total_number_of_machines
+    job_seq_memory = [0] * data.total_number_of_jobs
+    prev_job_seq_end_memory = [0] * data.total_number_of_jobs
+    job_end_memory = [0] * data.total_number_of_jobs
+    start_times = []
+    end_times = []
+
+    for job_id, operation_id, sequence, machine in operation_2d_array:
+        if job_seq_memory[job_id] < sequence:
+            prev_job_seq_end_memory[job_id] = job_end_memory[job_id]
+        wait = max(0, prev_job_seq_end_memory[job_id] - machine_makespans[machine])
+
+        runtime = data.get_runtime(job_id, operation_id, machine)
+        tmp_dt = machine_datetimes[machine] + datetime.timedelta(minutes=runtime)
+        if not continuous and (tmp_dt.time() > SHIFT_END_TIME or tmp_dt.day != machine_datetimes[machine].day):
+            machine_datetimes[machine] += datetime.timedelta(days=1)
+        else:
+            machine_datetimes[machine] += datetime.timedelta(minutes=wait)
+
+        start = (machine_datetimes[machine] - start_datetime).total_seconds() / 60
+        start_times.append(start)
+        end_times.append(start + runtime)
+
+        machine_makespans[machine] += runtime + wait
+        job_end_memory[job_id] = machine_makespans[machine]
+        job_seq_memory[job_id] = sequence
+
+    return np.array(machine_makespans), np.array(start_times), np.array(end_times)
+
+
+def reference_stock_cost(operation_2d_array, start_times, end_times):
+    """
+    stock cost as the total time between the end of an operation and the start of the next operation of its job
+    """
+    rows = {(job_id, operation_id): row for row, (job_id, operation_id, _, _) in enumerate(operation_2d_array)}
+    return sum(start_times[rows[job_id, operation_id + 1]] - end_times[row]
+               for (job_id, operation_id), row in rows.items() if (job_id, operation_id + 1) in rows)
+
+
+def test_decode_matches_reference(data, solutions):
+    for solution in solutions:
+        for continuous in (False, True):
+            machine_makespans = solution.decode_chromosome_representation(start_date=START_DATE, start_time=START_TIME,
+                                                                          continuous=continuous)
+            expected_makespans, expected_start_times, expected_end_times = reference_decode(
+                data, solution.operation_2d_array, continuous)
+
+            np.testing.assert_allclose(machine_makespans, expected_makespans)
+            np.testing.assert_allclose(solution.start_times, expected_start_times)
+            np.testing.assert_allclose(solution.end_times, expected_end_times)
+
+
+def test_stock_cost_matches_reference(data, solutions):
+    for solution in solutions:
+        _, start_times, end_times = reference_decode(data, solution.operation_2d_array, False)
+        expected = reference_stock_cost(solution.operation_2d_array, start_times, end_times)
+        np.testing.assert_allclose(solution.get_stock_cost(), expected)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from conftest import START_DATE, START_TIME
+from Optimizer.Simulated_Annealing._generate_neighbor import generate_neighbor_operation_2d_array
+from Optimizer.Tabu_Search._generate_neighbor import generate_neighborhood_block
+from Optimizer.solution import DeltaEvaluator, Solution
+
+
+def random_neighbor(data, operation_2d_array):
+    """
+    insertion move of simulated annealing, returns the neighbor and its first changed row
+    """
+    neighbor, random_index, placement_index = generate_neighbor_operation_2d_array(operation_2d_array, 0.5,
+                                                                                   data.job_operation_index_matrix,
+                                                                                   data.required_machine_matrix)
+    return np.asarray(neighbor), min(random_index, placement_index)
+
+
+def full_decode(data, operation_2d_array):
+    """
+    solution of operation_2d_array decoded from scratch
+    """
+    solution = Solution(data, operation_2d_array)
+    solution.machine_makespans = solution.decode_chromosome_representation(start_date=START_DATE, start_time=START_TIME)
+    solution.makespan = max(solution.machine_makespans)
+    solution.stock_cost = solution.get_stock_cost()
+    solution.tardiness_cost = solution.get_tardiness_cost()
+    return solution
+
+
+def assert_same_schedule(neighbor, expected):
+    np.testing.assert_allclose(neighbor.machine_makespans, expected.machine_makespans)
+    for name in ('start_times', 'end_times', 'wait_times'):
+        np.testing.assert_allclose(getattr(neighbor, name), getattr(expected, name))
+    np.testing.assert_allclose(neighbor.objectives[:3], expected.objectives[:3])
+
+
+def test_get_neighbor_matches_full_decode(data, solutions):
+    for solution in solutions:
+        delta_evaluator = DeltaEvaluator(solution, checkpoint_interval=4)
+        for _ in range(10):
+            operation_2d_array, first_changed_row = random_neighbor(data, solution.operation_2d_array)
+            expected = full_decode(data, operation_2d_array)
+
+            assert_same_schedule(delta_evaluator.get_neighbor(operation_2d_array, first_changed_row), expected)
+            np.testing.assert_allclose(delta_evaluator.get_machine_makespans(operation_2d_array, first_changed_row),
+                                       expected.machine_makespans)
+
+
+def test_set_seed_matches_full_decode(data, solutions):
+    delta_evaluator = DeltaEvaluator(solutions[0], checkpoint_interval=4)
+    operation_2d_array = solutions[0].operation_2d_array
+    for _ in range(10):
+        # walk of accepted moves, every neighbor becomes the new seed
+        operation_2d_array, first_changed_row = random_neighbor(data, operation_2d_array)
+        machine_makespans = delta_evaluator.set_seed(operation_2d_array, first_changed_row)
+        np.testing.assert_allclose(machine_makespans, full_decode(data, operation_2d_array).machine_makespans)
+
+        neighbor, first_changed_row = random_neighbor(data, operation_2d_array)
+        assert_same_schedule(delta_evaluator.get_neighbor(neighbor, first_changed_row), full_decode(data, neighbor))
+
+
+def test_get_neighbors_matches_full_decode(data, solutions):
+    for solution in solutions:
+        delta_evaluator = DeltaEvaluator(solution, checkpoint_interval=4)
+        neighborhood_block, first_rows, _ = generate_neighborhood_block(solution.operation_2d_array, 20, 0.5,
+                                                                        data.job_operation_index_matrix,
+                                                                        data.required_machine_matrix)
+        neighbors = delta_evaluator.get_neighbors(neighborhood_block, first_rows)
+
+        assert len(neighbors) == len(neighborhood_block)
+        for neighbor, operation_2d_array in zip(neighbors, neighborhood_block):
+            np.testing.assert_array_equal(neighbor.operation_2d_array, operation_2d_array)
+            assert_same_schedule(neighbor, full_decode(data, operation_2d_array))
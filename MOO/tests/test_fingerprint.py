@@ -0,0 +1,27 @@
+from Optimizer.solution._fingerprint import get_fingerprint, update_fingerprint, update_fingerprints
+from Optimizer.Tabu_Search._generate_neighbor import generate_neighborhood_block
+
+
+def test_update_fingerprint_matches_full_fingerprint(data, solutions):
+    for solution in solutions:
+        seed_fingerprint = get_fingerprint(solution.operation_2d_array)
+        neighborhood_block, first_rows, last_rows = generate_neighborhood_block(solution.operation_2d_array, 20, 0.5,
+                                                                                data.job_operation_index_matrix,
+                                                                                data.required_machine_matrix)
+        expected = [get_fingerprint(operation_2d_array) for operation_2d_array in neighborhood_block]
+
+        assert [update_fingerprint(seed_fingerprint, solution.operation_2d_array, neighborhood_block[k],
+                                   first_rows[k], last_rows[k]) for k in range(len(neighborhood_block))] == expected
+        assert update_fingerprints(seed_fingerprint, solution.operation_2d_array, neighborhood_block,
+                                   first_rows, last_rows).tolist() == expected
+
+
+def test_fingerprint_distinguishes_neighbors(data, solutions):
+    solution = solutions[0]
+    neighborhood_block, _, _ = generate_neighborhood_block(solution.operation_2d_array, 20, 0.5,
+                                                           data.job_operation_index_matrix,
+                                                           data.required_machine_matrix)
+    operation_2d_arrays = [solution.operation_2d_array, *neighborhood_block]
+    chromosomes = {operation_2d_array.tobytes() for operation_2d_array in operation_2d_arrays}
+    fingerprints = {get_fingerprint(operation_2d_array) for operation_2d_array in operation_2d_arrays}
+    assert len(fingerprints) == len(chromosomes)
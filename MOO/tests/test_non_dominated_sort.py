@@ -0,0 +1,38 @@
+import random
+
+import numpy as np
+
+from Optimizer._non_dominated_sort import non_dominated_sort
+from Optimizer.solution import SolutionFactory
+
+
+def brute_force_ranks(objective_values):
+    """
+    Pareto ranks by removing the non-dominated solutions front by front
+    """
+    ranks = np.full(len(objective_values), -1)
+    rank = 0
+    while np.any(ranks == -1):
+        remaining = np.flatnonzero(ranks == -1)
+        for i in remaining:
+            if not any(np.all(objective_values[j] <= objective_values[i]) and
+                       np.any(objective_values[j] < objective_values[i]) for j in remaining):
+                ranks[i] = rank
+        rank += 1
+    return ranks
+
+
+def test_non_dominated_sort_of_solutions(data):
+    random.seed(1)
+    np.random.seed(1)
+    objective_values = np.array([solution.objectives[:3] for solution in SolutionFactory(data).get_n_solutions(40)])
+    for num_objectives in (2, 3):
+        np.testing.assert_array_equal(non_dominated_sort(objective_values[:, :num_objectives]),
+                                      brute_force_ranks(objective_values[:, :num_objectives]))
+
+
+def test_non_dominated_sort_with_ties():
+    rng = np.random.RandomState(0)
+    for num_objectives in (2, 3, 4):
+        objective_values = rng.randint(0, 5, size=(60, num_objectives)).astype(float)
+        np.testing.assert_array_equal(non_dominated_sort(objective_values), brute_force_ranks(objective_values))
@@ -6,6 +6,8 @@ Created on Mon Dec 21 09:20:33 2020
 @author: chandan
 """
 
+import os
+import queue
 import pickle
 import random
 import time
@@ -13,15 +15,17 @@ import math
 
 import numpy as np
 
-from ._generate_neighbor import generate_neighbor
+from ._generate_neighbor import generate_neighbor_operation_2d_array
 from ..exception import InfeasibleSolutionException
+from ..solution import Solution, DeltaEvaluator
 from ..utility import get_stop_condition, Heap
 
 
 class SimulatedAnnealingAgent:
     def __init__(self, stopping_condition, time_condition, initial_solution, num_solutions_to_find=1,
                  neighborhood_size=200, neighborhood_wait=0.1, probability_change_machine=0.8, T = 200,
-                 termination = 10, halting = 10,mode = 'random', shrink = 0.8, benchmark=False):
+                 termination = 10, halting = 10,mode = 'random', shrink = 0.8, benchmark=False, replica_index=0,
+                 swap_interval=10):
         """    
        constructor for SA 
         
@@ -31,14 +35,19 @@ class SimulatedAnnealingAgent:
         time_condition : flag for time based search
         initial_solution : initial solution candidate for the search
         num_solutions_to_find : number of best solutions to obtain
-        neighbourhood_size : size of the nieghbourhood
-        neighbourhood_wait : waiting period 
+        neighbourhood_size : number of moves proposed per round
+        neighbourhood_wait : maximum duration of a round (seconds)
         probability_change_machine : probability of machine change (FJSSP)
-        T : temperature 
-        termination : termination value for SA
-        halting : halting value for SA
-        mode : search mode 
-        shrink : shrink value for SA
+        T : initial temperature (in minutes of makespan, a move which increases the makespan by T is accepted
+            with probability 1/e)
+        termination : number of rounds per temperature level
+        halting : number of temperature levels without a new best solution after which the search continues
+                  from the best solution
+        mode : search mode (not used)
+        shrink : cooling factor applied to the temperature after every temperature level
+        benchmark : benchmark flag
+        replica_index : index of the replica in a parallel tempering search (see CoOrdinator._simulated_annealing)
+        swap_interval : number of temperature levels between two state exchanges of the replicas
         
         
         Returns
@@ -66,110 +75,153 @@ class SimulatedAnnealingAgent:
         self.mode = mode
         self.shrink = shrink
         self.benchmark = benchmark
+        self.replica_index = replica_index
+        self.swap_interval = swap_interval
 
         self.all_solutions = []
         self.best_solution = None
 
+        # acceptance statistics of the last search
+        self.temperature = T
+        self.proposed_moves = 0
+        self.accepted_moves = 0
+        self.improving_moves = 0
+        self.acceptance_rate = 0
+
         if benchmark:
             self.benchmark_iterations = 0
             self.neighborhood_size_v_iter = []
             self.seed_solution_makespan_v_iter = []
+            self.temperature_v_iter = []
+            self.acceptance_rate_v_iter = []
             self.min_makespan_coordinates = (0, 0)
     
     
-    def _generate_neighborhood(self, seed_solution, dependency_matrix_index_encoding, required_machine_matrix):
-        """
-        function to generate neighbourhood of seed solution
-        
-        Parameter
-        --------------------------------------------
-        seed_solution :  solution candidate whom's neighbourhood has to be found
-        dependency_matrix_index_encoding : job operation matrix
-        required_machine_matrix : required machine matrix of all operations of all jobs
-        
-        Returns
-        ------------------------------
-        neighborhood : neighbourhood of seed solution        
-        
-        """
-        stop_time = time.time() + self.neighborhood_wait
-        neighborhood = _SolutionSet()
-        while neighborhood.size < self.neighborhood_size and time.time() < stop_time:
-            try:
-                neighbor = generate_neighbor(seed_solution, self.probability_change_machine,
-                                             dependency_matrix_index_encoding, required_machine_matrix)
-
-                if neighbor not in neighborhood:
-                    neighborhood.add(neighbor)
-
-            except InfeasibleSolutionException:
-                pass
-        return neighborhood
-    
-    
-    def start(self, multi_process_queue=None):
+    def start(self, multi_process_queue=None, exchange_channel=None):
         """
-        function to execute simulated annealing
+        function to execute simulated annealing. Moves are proposed one at a time, a move is evaluated from the
+        first row it changed on (see DeltaEvaluator) and accepted with the Metropolis criterion: always if it
+        does not increase the makespan, else with probability exp(-increase / temperature). Every iteration is a
+        temperature level of termination rounds of neighborhood_size moves, the temperature is multiplied by
+        shrink after every level. A replica of a parallel tempering search offers its state to the coordinator
+        every swap_interval levels and continues with the state it gets back.
         
         Parameter
         --------------------------------------------
         multi_process_queue : multi process queue object to store the best solution of the current process
+        exchange_channel : (exchange queue of the coordinator, queue of the replica) of a parallel tempering search
         
         Returns
         ------------------------------
         best solution of SA
         
         """
-        dependency_matrix_index_encoding = self.initial_solution.data.job_operation_index_matrix
-        required_machine_matrix = self.initial_solution.data.required_machine_matrix
-        seed_solution = self.initial_solution
+        if exchange_channel is not None:
+            # forked replicas would otherwise draw the same moves
+            np.random.seed()
+            random.seed()
+            coordinator_pid = os.getppid()
 
+        seed_solution = self.initial_solution
         if isinstance(self.initial_solution, list):
             seed_solution = self.initial_solution[0]
+
+        data = seed_solution.data
+        dependency_matrix_index_encoding = data.job_operation_index_matrix
+        required_machine_matrix = data.required_machine_matrix
+        evaluator = DeltaEvaluator(seed_solution)
+        operation_2d_array = evaluator.operation_2d_array
+        makespan = seed_solution.makespan
             
         best_solutions_heap = Heap(max_heap=True)
         
         for _ in range(self.num_solutions_to_find):
-            best_solutions_heap.push(self.initial_solution)
+            best_solutions_heap.push(seed_solution)
         
         iterations = 0
+        levels_without_improvement = 0
+        best_operation_2d_array = operation_2d_array
+        best_makespan = makespan
         neighborhood_size_v_iter = []
         seed_solution_makespan_v_iter = []
-        absolute_best_solution_makespan = seed_solution.makespan
+        temperature_v_iter = []
+        acceptance_rate_v_iter = []
         absolute_best_solution_iteration = 0
+        self.temperature = float(self.T)
+        self.proposed_moves = self.accepted_moves = self.improving_moves = 0
         stop_condition = get_stop_condition(self.time_condition, self.runtime, self.iterations)
         
         while not stop_condition(iterations):
-            self.T = self.shrink * float(self.T)
-            for j in range(self.termination):
-                neighborhood = self._generate_neighborhood(seed_solution,
-                                                   dependency_matrix_index_encoding,
-                                                   required_machine_matrix)
-
-                sorted_neighborhood = sorted(neighborhood.solutions.items())
-                for makespan, lst in sorted_neighborhood:  
-                    for neighbor in sorted(lst):  
-                        probability = math.exp(-neighbor.makespan / self.T)
-                        if (neighbor < seed_solution) or (random.random() < probability):
-                            seed_solution = neighbor
-                neighborhood_size_v_iter.append(neighborhood.size)
-                                
-            if seed_solution < best_solutions_heap[0]:
+            level_best_makespan = math.inf
+            level_proposed_moves = level_accepted_moves = 0
+            for _ in range(self.termination):
+                stop_time = time.time() + self.neighborhood_wait
+                moves = 0
+                while moves < self.neighborhood_size and time.time() < stop_time:
+                    moves += 1
+                    try:
+                        neighbor_operation_2d_array, random_index, placement_index = \
+                            generate_neighbor_operation_2d_array(operation_2d_array, self.probability_change_machine,
+                                                                 dependency_matrix_index_encoding,
+                                                                 required_machine_matrix)
+                        first_changed_row = min(random_index, placement_index)
+                        neighbor_machine_makespans = evaluator.get_machine_makespans(neighbor_operation_2d_array,
+                                                                                     first_changed_row)
+                    except InfeasibleSolutionException:
+                        continue
+
+                    level_proposed_moves += 1
+                    neighbor_makespan = neighbor_machine_makespans.max()
+                    delta = neighbor_makespan - makespan
+                    if delta <= 0 or (self.temperature > 0 and random.random() < math.exp(-delta / self.temperature)):
+                        evaluator.set_seed(neighbor_operation_2d_array, first_changed_row)
+                        operation_2d_array = evaluator.operation_2d_array
+                        makespan = neighbor_makespan
+                        level_accepted_moves += 1
+                        if delta < 0:
+                            self.improving_moves += 1
+                        if makespan < level_best_makespan:
+                            level_best_makespan = makespan
+                            level_best = (operation_2d_array, neighbor_machine_makespans)
+
+            self.proposed_moves += level_proposed_moves
+            self.accepted_moves += level_accepted_moves
+
+            if level_best_makespan < best_solutions_heap[0].makespan:
                 best_solutions_heap.pop()  
-                best_solutions_heap.push(seed_solution)  
-                
-                if self.benchmark and seed_solution.makespan < absolute_best_solution_makespan:
-                    absolute_best_solution_makespan = seed_solution.makespan
-                    absolute_best_solution_iteration = iterations
+                best_solutions_heap.push(Solution(data, *level_best))  
 
+            if level_best_makespan < best_makespan:
+                best_operation_2d_array = level_best[0]
+                best_makespan = level_best_makespan
+                absolute_best_solution_iteration = iterations
+                levels_without_improvement = 0
+            else:
+                levels_without_improvement += 1
+                if levels_without_improvement >= self.halting:
+                    # the search continues from the best solution at the current temperature
+                    evaluator.set_seed(best_operation_2d_array)
+                    operation_2d_array = evaluator.operation_2d_array
+                    makespan = best_makespan
+                    levels_without_improvement = 0
 
             if self.benchmark:
-                iterations += 1
-                neighborhood_size_v_iter.append(neighborhood.size)
-                seed_solution_makespan_v_iter.append(seed_solution.makespan)
+                neighborhood_size_v_iter.append(level_proposed_moves)
+                seed_solution_makespan_v_iter.append(makespan)
+                temperature_v_iter.append(self.temperature)
+                acceptance_rate_v_iter.append(level_accepted_moves / max(level_proposed_moves, 1))
+
+            if exchange_channel is not None and (iterations + 1) % self.swap_interval == 0:
+                exchange_queue, replica_queue = exchange_channel
+                exchange_queue.put((self.replica_index, iterations // self.swap_interval,
+                                    (makespan, self.temperature, operation_2d_array)))
+                exchanged_operation_2d_array = self._get_exchanged_state(replica_queue, coordinator_pid)
+                if exchanged_operation_2d_array is not None:
+                    makespan = evaluator.set_seed(exchanged_operation_2d_array).max()
+                    operation_2d_array = evaluator.operation_2d_array
 
-            elif not self.time_condition:
-                iterations += 1
+            self.temperature *= self.shrink
+            iterations += 1
         
         best_solutions_list = []
         while len(best_solutions_heap) > 0:
@@ -179,40 +231,31 @@ class SimulatedAnnealingAgent:
 
         self.all_solutions = best_solutions_list
         self.best_solution = min(best_solutions_list)
+        self.acceptance_rate = self.accepted_moves / max(self.proposed_moves, 1)
 
         if self.benchmark:
             self.benchmark_iterations = iterations
             self.neighborhood_size_v_iter = neighborhood_size_v_iter
             self.seed_solution_makespan_v_iter = seed_solution_makespan_v_iter
-            self.min_makespan_coordinates = (absolute_best_solution_iteration, absolute_best_solution_makespan)
+            self.temperature_v_iter = temperature_v_iter
+            self.acceptance_rate_v_iter = acceptance_rate_v_iter
+            self.min_makespan_coordinates = (absolute_best_solution_iteration, best_makespan)
 
         if multi_process_queue is not None:
-            self.initial_solution.machine_makespans = np.asarray(self.initial_solution.machine_makespans)
+            seed_solution.machine_makespans = np.asarray(seed_solution.machine_makespans)
             multi_process_queue.put(pickle.dumps(self, protocol=-1))
 
         return self.best_solution
     
     
-class _SolutionSet:
-    def __init__(self):
-        self.size = 0
-        self.solutions = {}
-
-    def add(self, solution):
-        if solution.makespan not in self.solutions:
-            self.solutions[solution.makespan] = [solution]
-        else:
-            self.solutions[solution.makespan].append(solution)
-
-        self.size += 1
-
-    def remove(self, solution):
-        if len(self.solutions[solution.makespan]) == 1:
-            del self.solutions[solution.makespan]
-        else:
-            self.solutions[solution.makespan].remove(solution)
-
-        self.size -= 1
-
-    def __contains__(self, solution):
-        return solution.makespan in self.solutions and solution in self.solutions[solution.makespan]
\ No newline at end of file
+    def _get_exchanged_state(self, replica_queue, coordinator_pid):
+        """
+        function to wait for the answer of the coordinator to an offered state (chromosome of another replica
+        or None), raises a RuntimeError if the coordinator process is gone
+        """
+        while True:
+            try:
+                return replica_queue.get(timeout=1)
+            except queue.Empty:
+                if os.getppid() != coordinator_pid:
+                    raise RuntimeError(f"Coordinator of SA replica {self.replica_index} is gone")
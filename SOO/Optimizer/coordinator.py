@@ -4,7 +4,10 @@
 Created on Thu Dec 17 08:45:00 2020
 @author: chandan
 """
+import math
+import queue
 import pickle
+import random
 import datetime
 import multiprocessing as mp
 
@@ -37,10 +40,11 @@ class CoOrdinator:
         self.ts_agent_list = None
         self.ga_agent = None
         self.sa_agent = None
+        self.sa_agent_list = None
         self.solution_factory = SolutionFactory(data)
 
     
-    def simulated_annealing_search_time(self, runtime, initial_solution, num_solutions_to_find=1, neighborhood_size=100, neighborhood_wait=0.1, probability_change_machine=0.8, T = 200, termination = 10, halting = 10, mode = 'random', shrink = 0.8, benchmark=False, verbose=False, progress_bar=False):
+    def simulated_annealing_search_time(self, runtime, initial_solution, num_solutions_to_find=1, neighborhood_size=100, neighborhood_wait=0.1, probability_change_machine=0.8, T = 200, termination = 10, halting = 10, mode = 'random', shrink = 0.8, benchmark=False, verbose=False, progress_bar=False, num_processes=1, swap_interval=10):
         """    
         simulated_annealing search (time as a constraint)
         """        
@@ -49,11 +53,11 @@ class CoOrdinator:
             runtime_seconds = runtime.total_seconds()
         else:
             runtime_seconds = runtime       
-        return self._simulated_annealing(runtime_seconds, time_condition=True, initial_solution=initial_solution, num_solutions_to_find=1, neighborhood_size=neighborhood_size, neighborhood_wait=neighborhood_wait, probability_change_machine=probability_change_machine, T=T, termination=termination, halting=halting, mode=mode, shrink=shrink, benchmark=benchmark, verbose=verbose, progress_bar=progress_bar)
+        return self._simulated_annealing(runtime_seconds, time_condition=True, initial_solution=initial_solution, num_solutions_to_find=1, neighborhood_size=neighborhood_size, neighborhood_wait=neighborhood_wait, probability_change_machine=probability_change_machine, T=T, termination=termination, halting=halting, mode=mode, shrink=shrink, benchmark=benchmark, verbose=verbose, progress_bar=progress_bar, num_processes=num_processes, swap_interval=swap_interval)
         
     
     
-    def _simulated_annealing(self, stopping_condition, time_condition, initial_solution, num_solutions_to_find, neighborhood_size, neighborhood_wait, probability_change_machine, T, termination, halting, mode, shrink, benchmark, verbose, progress_bar):
+    def _simulated_annealing(self, stopping_condition, time_condition, initial_solution, num_solutions_to_find, neighborhood_size, neighborhood_wait, probability_change_machine, T, termination, halting, mode, shrink, benchmark, verbose, progress_bar, num_processes=1, swap_interval=10):
         """    
         simulated_annealing search builder function
         
@@ -71,33 +75,44 @@ class CoOrdinator:
         halting : halting value for SA
         mode : search mode 
         shrink : shrink value for SA
+        num_processes : number of replicas of a parallel tempering search, every replica runs in its own
+                        process, replica k starts at temperature T * shrink**k (one SA agent in this process if 1)
+        swap_interval : number of temperature levels between two state exchanges of the replicas
         
         
         Returns
         ------------------------------
-        best solution from SA
+        best solution from SA (best solution of all replicas)
         """               
         
         
         if initial_solution is None:
-            initial_solution = self.solution_factory.get_solution()
-        
-        if isinstance(initial_solution, list):
-            initial_solution = initial_solution[0]
+            initial_solutions = []
+        elif isinstance(initial_solution, list):
+            initial_solutions = initial_solution[:num_processes]
+        else:
+            initial_solutions = [initial_solution]
+        initial_solutions += [self.solution_factory.get_solution() for _ in
+                              range(max(0, num_processes - len(initial_solutions)))]
+        initial_solution = initial_solutions[0]
         
-        self.sa_agent = Simulated_Annealing.SimulatedAnnealingAgent(stopping_condition, 
-                                                                    time_condition, 
-                                                                    initial_solution, 
-                                                                    num_solutions_to_find,
-                                                                    neighborhood_size, 
-                                                                    neighborhood_wait, 
-                                                                    probability_change_machine,
-                                                                    T,
-                                                                    termination,
-                                                                    halting,
-                                                                    mode,
-                                                                    shrink, 
-                                                                    benchmark)
+        self.sa_agent_list = [Simulated_Annealing.SimulatedAnnealingAgent(stopping_condition, 
+                                                                          time_condition, 
+                                                                          replica_initial_solution, 
+                                                                          num_solutions_to_find,
+                                                                          neighborhood_size, 
+                                                                          neighborhood_wait, 
+                                                                          probability_change_machine,
+                                                                          T * shrink ** replica_index,
+                                                                          termination,
+                                                                          halting,
+                                                                          mode,
+                                                                          shrink, 
+                                                                          benchmark,
+                                                                          replica_index,
+                                                                          swap_interval)
+                              for replica_index, replica_initial_solution in enumerate(initial_solutions)]
+        self.sa_agent = self.sa_agent_list[0]
         if verbose:
             if benchmark:
                 print("Running benchmark of SA")
@@ -109,19 +124,133 @@ class CoOrdinator:
             print("neighborhood_size =", neighborhood_size)
             print("neighborhood_wait =", neighborhood_wait)
             print("probability_change_machine =", probability_change_machine)
+            print("num_processes =", num_processes)
             print()
             print("Initial Solution's makespans:")
             
-            print(round(initial_solution.makespan))
+            print([round(x.makespan) for x in initial_solutions])
             print()
 
         if progress_bar and time_condition:
             mp.Process(target=_run_progress_bar, args=[stopping_condition]).start()
 
-        self.solution = self.sa_agent.start() 
+        if num_processes == 1:
+            self.solution = self.sa_agent.start() 
+        else:
+            self._run_sa_replicas(verbose)
+            # agent of the best replica for the benchmark results
+            self.sa_agent = min(self.sa_agent_list, key=lambda sa_agent: sa_agent.best_solution)
+            self.solution = self.sa_agent.best_solution
         
         print(self.solution)
         return self.solution
+    
+    
+    def _run_sa_replicas(self, verbose):
+        """    
+        runs the replicas of a parallel tempering search in parallel processes. Every swap_interval temperature
+        levels a replica offers its state (makespan, temperature, chromosome) on the exchange queue and waits
+        for its next state, once every running replica offered its state of an exchange round neighboring
+        replicas swap their states (see _swap_replica_states)
+        
+        Parameters
+        -----------------------------
+        verbose : verbose flag
+        
+        Returns
+        ------------------------------
+        None (self.sa_agent_list holds the replicas which finished their search, replicas whose process
+        died are dropped)
+        """               
+        
+        results_queue = mp.Queue()
+        exchange_queue = mp.Queue()
+        replica_queues = [mp.Queue() for _ in self.sa_agent_list]
+        processes = [mp.Process(target=sa_agent.start,
+                                args=[results_queue, (exchange_queue, replica_queues[sa_agent.replica_index])],
+                                daemon=True)
+                     for sa_agent in self.sa_agent_list]
+
+        for p in processes:
+            p.start()
+            if verbose:
+                print(f"child SA process started. pid = {p.pid}")
+
+        try:
+            self._exchange_replica_states(processes, results_queue, exchange_queue, replica_queues, verbose)
+        except BaseException:
+            for p in processes:
+                p.terminate()
+            raise
+
+        for p in processes:
+            p.join()
+
+        failed_replicas = [i for i, p in enumerate(processes) if p.exitcode != 0]
+        if len(failed_replicas) == len(processes):
+            raise RuntimeError("All SA replica processes died")
+        self.sa_agent_list = [sa_agent for i, sa_agent in enumerate(self.sa_agent_list) if i not in failed_replicas]
+
+
+    def _exchange_replica_states(self, processes, results_queue, exchange_queue, replica_queues, verbose):
+        """    
+        answers the offers of the replicas until every replica sent its result or died
+        """               
+        
+        running_replicas = set(range(len(processes)))
+        exchange_rounds = {} # exchange round -> {replica index: offered state}
+        while running_replicas:
+            try:
+                replica_index, exchange_round, state = exchange_queue.get(timeout=0.1)
+                exchange_rounds.setdefault(exchange_round, {})[replica_index] = state
+            except queue.Empty:
+                pass
+
+            try:
+                while True:
+                    sa_agent = pickle.loads(results_queue.get_nowait())
+                    self.sa_agent_list[sa_agent.replica_index] = sa_agent
+                    running_replicas.discard(sa_agent.replica_index)
+                    if verbose:
+                        print(f"child SA process finished. pid = {processes[sa_agent.replica_index].pid}")
+            except queue.Empty:
+                pass
+
+            # a replica which died without result does not take part in the following rounds
+            for replica_index in list(running_replicas):
+                if processes[replica_index].exitcode not in (None, 0):
+                    running_replicas.discard(replica_index)
+                    if verbose:
+                        print(f"child SA process died. pid = {processes[replica_index].pid}")
+
+            # a replica only finishes after the answer to its last offer, a round is complete once every
+            # running replica offered its state
+            for exchange_round in sorted(exchange_rounds):
+                if running_replicas <= exchange_rounds[exchange_round].keys():
+                    self._swap_replica_states(exchange_round, exchange_rounds.pop(exchange_round), replica_queues)
+
+
+    def _swap_replica_states(self, exchange_round, states, replica_queues):
+        """    
+        swaps the states of neighboring replicas (even and odd pairs in alternate rounds) with the parallel
+        tempering criterion min(1, exp((makespan_i - makespan_j) * (1 / T_i - 1 / T_j))) and answers every
+        offer of the round with the chromosome of the other replica or None (the replica keeps its state)
+        """               
+        
+        replicas = sorted(states)
+        answers = dict.fromkeys(replicas)
+        first = exchange_round % 2
+        for i, j in zip(replicas[first::2], replicas[first + 1::2]):
+            makespan_i, temperature_i, operation_2d_array_i = states[i]
+            makespan_j, temperature_j, operation_2d_array_j = states[j]
+            if temperature_i > 0 and temperature_j > 0:
+                exponent = (makespan_i - makespan_j) * (1 / temperature_i - 1 / temperature_j)
+                if exponent >= 0 or random.random() < math.exp(exponent):
+                    answers[i] = operation_2d_array_j
+                    answers[j] = operation_2d_array_i
+
+        for replica_index, operation_2d_array in answers.items():
+            replica_queues[replica_index].put(operation_2d_array)
         
  ################################ Tabu Search Algorithm ###########################
    
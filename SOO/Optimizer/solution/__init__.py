@@ -1,2 +1,2 @@
 from .factory import SolutionFactory
-from .solution import Solution
+from .solution import Solution, DeltaEvaluator
@@ -96,3 +96,87 @@ cpdef double[::1] compute_machine_makespans(int[:, ::1] operation_2d_array,
     free(prev_job_end_memory)
 
     return machine_makespan_memory
+
+
+cpdef Py_ssize_t get_checkpoint_size(const int num_jobs, const int num_machines):
+    """
+    size of one decoder checkpoint (1 value per machine and 3 values per job)
+    """
+    return num_machines + 3 * num_jobs
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cpdef double[::1] decode_machine_makespans(const int[:, ::1] operation_2d_array,
+                                           const double[:, ::1] operation_processing_times_matrix,
+                                           const int[:, ::1] job_operation_index_matrix,
+                                           double[::1] machine_makespan_memory,
+                                           Py_ssize_t first_row=0,
+                                           double[:, ::1] checkpoints=None,
+                                           Py_ssize_t checkpoint_interval=0,
+                                           int save_checkpoints=0):
+    """
+    computes the machine makespans of a chromosome like Solution.decode_chromosome_representation (no setup
+    times) into machine_makespan_memory.
+    Checkpoints hold the decoder state before every checkpoint_interval-th row (one row of 'checkpoints' per
+    checkpoint, see get_checkpoint_size). With save_checkpoints they are recorded while decoding, with
+    first_row > 0 the state is restored from the last checkpoint before first_row and only the remaining rows
+    are decoded.
+    """
+
+    cdef Py_ssize_t num_jobs = job_operation_index_matrix.shape[0]
+    cdef Py_ssize_t num_machines = machine_makespan_memory.shape[0]
+    cdef int[::1] job_seq_memory = np.zeros(num_jobs, dtype=np.intc)
+    cdef double[::1] prev_job_seq_end_memory = np.zeros(num_jobs)
+    cdef double[::1] job_end_memory = np.zeros(num_jobs)
+
+    cdef Py_ssize_t row, i, start_row = 0
+    cdef int job_id, operation_id, sequence, machine
+    cdef double wait, runtime
+    cdef double[::1] checkpoint
+
+    if first_row > 0:
+        start_row = (first_row // checkpoint_interval) * checkpoint_interval
+        checkpoint = checkpoints[first_row // checkpoint_interval]
+        for i in range(num_machines):
+            machine_makespan_memory[i] = checkpoint[i]
+        for i in range(num_jobs):
+            job_seq_memory[i] = <int> checkpoint[num_machines + i]
+            prev_job_seq_end_memory[i] = checkpoint[num_machines + num_jobs + i]
+            job_end_memory[i] = checkpoint[num_machines + 2 * num_jobs + i]
+    else:
+        for i in range(num_machines):
+            machine_makespan_memory[i] = 0
+
+    for row in range(start_row, operation_2d_array.shape[0]):
+        if save_checkpoints and row % checkpoint_interval == 0:
+            checkpoint = checkpoints[row // checkpoint_interval]
+            for i in range(num_machines):
+                checkpoint[i] = machine_makespan_memory[i]
+            for i in range(num_jobs):
+                checkpoint[num_machines + i] = job_seq_memory[i]
+                checkpoint[num_machines + num_jobs + i] = prev_job_seq_end_memory[i]
+                checkpoint[num_machines + 2 * num_jobs + i] = job_end_memory[i]
+
+        job_id = operation_2d_array[row, 0]
+        operation_id = operation_2d_array[row, 1]
+        sequence = operation_2d_array[row, 2]
+        machine = operation_2d_array[row, 3]
+
+        if job_seq_memory[job_id] < sequence:
+            prev_job_seq_end_memory[job_id] = job_end_memory[job_id]
+
+        if prev_job_seq_end_memory[job_id] <= machine_makespan_memory[machine]:
+            wait = 0
+        else:
+            wait = prev_job_seq_end_memory[job_id] - machine_makespan_memory[machine]
+
+        runtime = operation_processing_times_matrix[job_operation_index_matrix[job_id, operation_id], machine]
+
+        machine_makespan_memory[machine] += runtime + wait
+        job_end_memory[job_id] = machine_makespan_memory[machine]
+        job_seq_memory[job_id] = sequence
+
+    return machine_makespan_memory
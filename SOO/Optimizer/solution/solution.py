@@ -14,6 +14,7 @@ import numpy as np
 from ..exception import IncompleteSolutionException
 from ._schedule_creator import create_schedule_xlsx_file, create_gantt_chart
 #from ._makespan import compute_machine_makespans
+from ._makespan import decode_machine_makespans, get_checkpoint_size
 
 
 class OperationHandler:
@@ -52,7 +53,7 @@ class OperationHandler:
 
 
 class Solution:
-    def __init__(self, data, operation_2d_array):
+    def __init__(self, data, operation_2d_array, machine_makespans=None):
         """    
        constructor of Solution  class
         
@@ -60,6 +61,8 @@ class Solution:
         --------------------------
         data : data object contains information of demand, jobs, machines
         operation_2d_array : 2d array of operations
+        machine_makespans : machine makespans of operation_2d_array if they are already known (delta
+                            evaluation), the chromosome is decoded if None
 
     
         Returns
@@ -80,7 +83,9 @@ class Solution:
 # =============================================================================
         self.operation_2d_array = operation_2d_array
         self.data = data
-        _, self.machine_makespans = self.decode_chromosome_representation()
+        if machine_makespans is None:
+            _, machine_makespans = self.decode_chromosome_representation()
+        self.machine_makespans = machine_makespans
         self.makespan = max(self.machine_makespans)
         
 
@@ -267,4 +272,87 @@ class Solution:
         """  
         create_gantt_chart(self, output_path, title=title, start_date=start_date, start_time=start_time,
                            end_time=end_time, iplot_bool=False, auto_open=auto_open,
-                           continuous=continuous)
\ No newline at end of file
+                           continuous=continuous)
+
+
+
+
+class DeltaEvaluator:
+
+    def __init__(self, seed_solution, checkpoint_interval=16):
+        """    
+        Constructor of DeltaEvaluator class, computes the machine makespans of neighbors of a seed solution which
+        differ from the seed only from a given row of operation_2d_array onwards (insertion and machine change
+        moves). The seed is decoded once while recording the decoder state every 'checkpoint_interval' rows, a
+        neighbor reuses the decoded prefix and only the rows after the last checkpoint before its first changed
+        row are decoded again.
+        
+        Paramters
+        --------------------------
+        seed_solution : solution whose neighbors are evaluated
+        checkpoint_interval : number of rows between two checkpoints
+    
+        Returns
+        ---------------
+        None
+        """  
+        
+        self.data = seed_solution.data
+        self.checkpoint_interval = checkpoint_interval
+        self.operation_processing_times_matrix = np.ascontiguousarray(self.data.operation_processing_times_matrix,
+                                                                      dtype=np.float64)
+        self.job_operation_index_matrix = np.ascontiguousarray(self.data.job_operation_index_matrix, dtype=np.intc)
+        
+        num_operations = seed_solution.operation_2d_array.shape[0]
+        num_checkpoints = (num_operations - 1) // checkpoint_interval + 1
+        self.checkpoints = np.empty((num_checkpoints, get_checkpoint_size(self.data.total_number_of_jobs,
+                                                                          self.data.total_number_of_machines)))
+        self.machine_makespans = np.empty(self.data.total_number_of_machines)
+        self.set_seed(seed_solution.operation_2d_array)
+    
+    
+    def set_seed(self, operation_2d_array, first_changed_row=0):
+        """    
+        function to make a neighbor the new seed (e.g. an accepted move of SA), only the checkpoints after
+        first_changed_row are recorded again
+        
+        Paramters
+        --------------------------
+        operation_2d_array : 2d array of operations of the new seed
+        first_changed_row : first row in which operation_2d_array differs from the current seed's chromosome
+    
+        Returns
+        ---------------
+        machine_makespans : machine makespans of the new seed (array of the evaluator, overwritten by the next seed)
+        """  
+        
+        self.operation_2d_array = np.ascontiguousarray(operation_2d_array, dtype=np.intc)
+        decode_machine_makespans(self.operation_2d_array, self.operation_processing_times_matrix,
+                                 self.job_operation_index_matrix, self.machine_makespans, first_changed_row,
+                                 self.checkpoints, self.checkpoint_interval, 1)
+        return self.machine_makespans
+    
+    
+    def get_machine_makespans(self, operation_2d_array, first_changed_row):
+        """    
+        function to compute the machine makespans of a neighbor of the seed solution
+        
+        Paramters
+        --------------------------
+        operation_2d_array : 2d array of operations of the neighbor
+        first_changed_row : first row in which operation_2d_array differs from the seed's chromosome
+    
+        Returns
+        ---------------
+        machine_makespans : machine makespans of the neighbor
+        """  
+        
+        if operation_2d_array.shape[0] != self.data.total_number_of_operations:
+            raise IncompleteSolutionException(f"Incomplete Solution of size {operation_2d_array.shape[0]}. "
+                                              f"Should be {self.data.total_number_of_operations}")
+        
+        return np.asarray(decode_machine_makespans(np.ascontiguousarray(operation_2d_array, dtype=np.intc),
+                                                   self.operation_processing_times_matrix,
+                                                   self.job_operation_index_matrix,
+                                                   np.empty(self.data.total_number_of_machines), first_changed_row,
+                                                   self.checkpoints, self.checkpoint_interval))
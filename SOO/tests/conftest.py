@@ -0,0 +1,30 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+SOO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, SOO_DIR)
+
+from Optimizer.data_normal_job_shop import Data_Normal_Job_Shop
+from Optimizer.solution import SolutionFactory
+
+
+@pytest.fixture(scope='session')
+def data():
+    """
+    bundled instance of main.py (10 jobs, 10 machines)
+    """
+    return Data_Normal_Job_Shop(os.path.join(SOO_DIR, 'Output.txt'))
+
+
+@pytest.fixture
+def solutions(data):
+    """
+    a few random solutions of the bundled instance
+    """
+    random.seed(0)
+    np.random.seed(0)
+    return SolutionFactory(data).get_n_solutions(5)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from Optimizer.Simulated_Annealing._generate_neighbor import generate_neighbor_operation_2d_array
+from Optimizer.solution import DeltaEvaluator, Solution
+from Optimizer.solution._makespan import decode_machine_makespans
+
+
+def random_neighbor(data, operation_2d_array):
+    """
+    insertion move of simulated annealing, returns the neighbor and its first changed row
+    """
+    neighbor, random_index, placement_index = generate_neighbor_operation_2d_array(operation_2d_array, 0.5,
+                                                                                   data.job_operation_index_matrix,
+                                                                                   data.required_machine_matrix)
+    return np.asarray(neighbor), min(random_index, placement_index)
+
+
+def reference_machine_makespans(data, operation_2d_array):
+    """
+    machine makespans of the datetime based decoder of Solution
+    """
+    solution = Solution(data, operation_2d_array, machine_makespans=np.zeros(data.total_number_of_machines))
+    return solution.decode_chromosome_representation()[1]
+
+
+def test_decode_machine_makespans_matches_reference(data, solutions):
+    for solution in solutions:
+        machine_makespans = decode_machine_makespans(solution.operation_2d_array,
+                                                     np.ascontiguousarray(data.operation_processing_times_matrix),
+                                                     np.ascontiguousarray(data.job_operation_index_matrix, dtype=np.intc),
+                                                     np.empty(data.total_number_of_machines))
+        np.testing.assert_allclose(machine_makespans, reference_machine_makespans(data, solution.operation_2d_array))
+
+
+def test_get_machine_makespans_matches_reference(data, solutions):
+    for solution in solutions:
+        delta_evaluator = DeltaEvaluator(solution, checkpoint_interval=4)
+        for _ in range(10):
+            operation_2d_array, first_changed_row = random_neighbor(data, solution.operation_2d_array)
+            np.testing.assert_allclose(delta_evaluator.get_machine_makespans(operation_2d_array, first_changed_row),
+                                       reference_machine_makespans(data, operation_2d_array))
+
+
+def test_set_seed_matches_reference(data, solutions):
+    delta_evaluator = DeltaEvaluator(solutions[0], checkpoint_interval=4)
+    operation_2d_array = solutions[0].operation_2d_array
+    for _ in range(10):
+        # walk of accepted moves, every neighbor becomes the new seed
+        operation_2d_array, first_changed_row = random_neighbor(data, operation_2d_array)
+        np.testing.assert_allclose(delta_evaluator.set_seed(operation_2d_array, first_changed_row),
+                                   reference_machine_makespans(data, operation_2d_array))
+
+        neighbor, first_changed_row = random_neighbor(data, operation_2d_array)
+        np.testing.assert_allclose(delta_evaluator.get_machine_makespans(neighbor, first_changed_row),
+                                   reference_machine_makespans(data, neighbor))